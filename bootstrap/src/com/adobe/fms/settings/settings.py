@@ -11,14 +11,205 @@ server_name = 'localhost'
 # MLM URL
 mlm_url = 'http://' + server_name + '/vod/liveevent1' #excluding .f4m
 
+# Multi-event mode: the MLMs (excluding .f4m) in mlm_urls, and those
+# listed one per line in the file mlm_list, are load tested together
+# instead of mlm_url. All events share the worker pools and metrics
+mlm_urls = []
+mlm_list = None
+
+# Threads fetching and parsing the MLMs, and polling the first
+# bootstrap of every stream before the bootstrap consumers take over
+discovery_threads = 32
+prime_threads = 64
+
+# Redundant packagers or edges serving the same live event: each
+# stream's bootstrap is polled from every server listed (name/port) and
+# the load test follows the union of their timelines, as
+# tools/merge.pl builds it, with fragments still requested from
+# server_name. Empty to follow server_name's bootstrap alone
+merge_origins = []
+
 # Number of requests for AB
 num_req = 100
 # Concurrent requests for AB
 concurrency = 10
 
+# Fragment load generator: 'ab' shells out to ApacheBench for every
+# fragment, 'builtin' uses the in-process LoadEngine with keep-alive
+# connections shared across the fragments of a stream. Both are closed
+# loop (num_req requests, concurrency at a time); 'open' sends requests
+# on a fixed schedule instead, see below
+load_engine = 'ab'
+
+# Open-loop workload: open_loop_rate requests/sec per stream over each
+# fragment's duration, 'poisson' or 'uniform' arrivals, however slowly
+# the origin answers, starting when the fragment test was scheduled for.
+# Latency is measured from the intended send time, with the raw latency
+# kept alongside; a request sent more than open_loop_late_ms after its
+# intended time is behind schedule, which happens when the test waited
+# in the fragment queue or open_loop_max_outstanding requests of the
+# fragment are waiting
+open_loop_rate = 10
+open_loop_arrivals = 'poisson'
+open_loop_late_ms = 10
+open_loop_max_outstanding = 256
+
+# Most threads the builtin and open-loop engines make their requests
+# on. They are started as needed and reused across fragments
+load_threads = 2000
+
+# With the builtin engine, check every fragment response box by box as
+# it arrives: a well formed F4F fragment whose abst names the fragment
+# and duration the bootstrap promised
+validate_fragments = True
+
+# Fragment test results are appended to results_file, a fixed-width
+# binary log read by results_report.py, each run marked in results_file
+# + '.runs'. results_csv also writes the per-stream <stream>.csv lines
+# under bootstrap_dir
+results_csv = False
+
+# Pipeline queues. At most fragment_queue_size fragment tests wait for
+# a fragment consumer; when it is full fragment_queue_policy 'block'
+# holds up the scheduler (and with it the bootstrap polls) until there
+# is room, 'drop-oldest' drops the oldest waiting test and 'live-edge'
+# drops the waiting tests of the new test's stream so it skips to the
+# live edge. A test that waited more than fragment_max_lag seconds is
+# dropped rather than run, 0 runs it however late. The bootstrap queue
+# holds at least one poll per stream and always blocks
+fragment_queue_size = 1000
+fragment_queue_policy = 'block'
+fragment_max_lag = 0
+bootstrap_queue_size = 10000
+
+# Time each pipeline stage (bootstrap fetch, parse, disk write,
+# packager, fragment extraction, queue waits, load test...) into
+# per-stage histograms, written to stage_percentiles.csv with the other
+# percentiles and served as the stage_ms metric
+stage_timing = True
+
+# Sampling profiler: on SIGUSR2 (with profile_signal), or from the start
+# with profile_at_start, the stacks of every thread are sampled every
+# profile_interval seconds for profile_seconds and written next to the
+# log as profile.<pid>.<time>.folded, collapsed stacks for flamegraph.pl.
+# A sharded parent passes the signal on to its workers
+profile_signal = True
+profile_at_start = False
+profile_seconds = 30
+profile_interval = 0.005
+
+# Seconds between writes of the latency percentiles
+histogram_interval = 60
+
+# Log and result writer: records buffered in memory, flushed once
+# log_flush_records are waiting or every log_flush_interval seconds.
+# With a full buffer log_overflow 'block' makes producers wait, 'drop'
+# discards the record
+log_buffer_records = 10000
+log_flush_records = 500
+log_flush_interval = 1.0
+log_overflow = 'block'
+
 # Write a plain text version of bootstrap to disk
 WRITE_TO_DISK = True
 
+# Run f4fpackager --inspect-bootstrap alongside the native bootstrap
+# parser and log any bootstrap where the two disagree
+CHECK_WITH_PACKAGER = False
+
+# Seconds between bootstrap polls of a live stream (polls are made at
+# least twice per fragment duration)
+bootstrap_poll_interval = 1.0
+
+# Adaptive bootstrap polling: once a stream's fragment cadence is known,
+# sleep until bootstrap_poll_window seconds before the next fragment is
+# due, then poll every bootstrap_poll_tight seconds until it appears
+adaptive_polling = True
+bootstrap_poll_window = 0.25
+bootstrap_poll_tight = 0.05
+
+# Measure fragment availability: the newest fragment of a bootstrap is
+# requested as soon as it is seen, every availability_retry seconds while
+# it 404s, and the time until the first 200 is recorded per stream. The
+# probes run on their own availability_threads threads, not the fragment
+# queue
+measure_availability = True
+availability_retry = 0.02
+availability_threads = 32
+
+# Bootstrap consumer threads. They only fetch and parse, the scheduler
+# does the waiting, so a handful serve thousands of streams
+bootstrap_threads = 8
+
+# Worker processes the streams are sharded across. 1 runs everything in
+# this process, 0 starts one worker per CPU core
+worker_processes = 1
+
+# Local endpoint with the live counters, gauges and latency summaries:
+# Prometheus text on /metrics, a JSON snapshot on /metrics.json.
+# metrics_port = None (or 0) disables it
+metrics_address = '127.0.0.1'
+metrics_port = 9410
+
+# Seconds between latency snapshots sent from workers to the parent
+shard_report_interval = 10
+
+# Number of most recent fragments tracked per live stream
+fragment_retention = 300
+
+# Parsed bootstraps kept, keyed by content
+bootstrap_cache_entries = 1024
+
+# Append every distinct bootstrap polled to this archive for replay with
+# replay_bootstraps.py, None to disable. Worker processes and agents
+# write to <archive>.<worker>
+bootstrap_archive = None
+
+# Virtual player mode (player_hds_live.py): players emulated, seconds
+# over which they join, and fetch threads their fragment downloads share
+player_count = 1000
+player_ramp = 60
+player_threads = 100
+
+# Fragments behind the live edge a player joins at, seconds it buffers
+# before playback starts and at most
+player_live_offset = 3
+player_startup_buffer = 4.0
+player_max_buffer = 30.0
+
+# Bitrate switching: a rendition may use this fraction of the measured
+# download rate, and switching up needs this many seconds buffered
+player_safety = 0.8
+player_up_buffer = 8.0
+
+# Seconds between player summaries
+player_report_interval = 10
+
+# VOD mode (threaded_hds_vod.py): file with one manifest URL per line
+# (excluding .f4m), most popular title first, the playback sessions run
+# concurrently and the threads loading the manifests
+vod_catalogue = None
+vod_sessions = 100
+vod_manifest_threads = 16
+
+# VOD access pattern: 'sequential' sessions play from the start, 'seek'
+# sessions jump to a random position every vod_seek_run fragments. A
+# session ends after vod_session_fragments fragments (0 plays the title
+# to the end) and the next picks another title
+vod_pattern = 'sequential'
+vod_session_fragments = 150
+vod_seek_run = 5
+
+# Title popularity: the n-th title of the catalogue is picked with
+# weight 1/n^vod_zipf_exponent, 0 picks uniformly
+vod_zipf_exponent = 1.0
+
+# Request VOD fragments at playback speed rather than back to back
+vod_realtime = False
+
+# Seconds between VOD summaries
+vod_report_interval = 10
+
 apache_bench = (os.name == 'nt' and os.path.normpath('../../../../../apache_bench/ab.exe') or 'ab')             
 
 bootstrap_dir = os.path.normpath('../../../../../bootstrap/')
@@ -26,3 +217,5 @@ bootstrap_dir = os.path.normpath('../../../../../bootstrap/')
 packager = (os.name == 'nt' and os.path.normpath('../../../../../f4fpackager/win/f4fpackager.exe') or os.path.normpath('../../../../../f4fpackager/linux/f4fpackager'))
 
 log = os.path.normpath('../../../../../logs/debug.log')      
+
+results_file = os.path.normpath('../../../../../logs/results.hrl')
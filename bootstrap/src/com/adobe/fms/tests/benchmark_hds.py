@@ -0,0 +1,304 @@
+'''
+Created on 18 Oct 2026
+
+@author: wallace
+
+Micro-benchmarks for the hds parsing hot paths, driven by the reference
+bootstraps in bootstrap/ref and synthetic run tables of 10k to 1M
+fragments. Reports ops/sec, per-call latency and peak memory growth, and
+saves or compares against a JSON baseline:
+
+    benchmark_hds.py --save baseline.json
+    benchmark_hds.py --compare baseline.json
+
+The f4fpackager text cases copy the inspect output on every call because
+extract_segment_section/extract_fragment_section consume their input;
+they only run up to 10k fragments unless --large is given.
+'''
+
+import sys
+import os
+sys.path.append(os.path.normpath(os.environ['HDS_LT_PATH']))
+import argparse
+import gc
+import glob
+import json
+import platform
+import time
+from base64 import encodestring
+from com.adobe.fms.utilities.hds import hds
+from com.adobe.fms.utilities.BootstrapWriter import BootstrapWriter
+from com.adobe.fms.utilities.FragmentTracker import FragmentTracker
+from com.adobe.fms.utilities.RunTable import RunTable
+from com.adobe.fms.utilities.SyntheticOrigin import LiveStream
+from com.adobe.fms.settings import settings
+
+SIZES       = (10000, 100000, 1000000)
+TEXT_SIZES  = (1000, 10000)
+MEDIA_SIZES = (10, 1000, 5000)
+
+# f4fpackager --inspect-bootstrap style text for a parsed bootstrap
+def inspect_text(bootstrap):
+    lines = ['bootstrap:', '\tversion: %d' % bootstrap['version'], 'segments:',
+             'segment run table:', '\tis update: false', '\tqualities:', '\tentries:']
+    for first, frags in bootstrap['segment_run_tables'][0]['runs']:
+        lines.append('\t\tsegment = %d, fragments = %d' % (first, frags))
+    lines += ['fragments:', 'fragment run table:', '\tis update: false', '\tqualities:', '\tentries:']
+    for first, timestamp, duration, discontinuity in bootstrap['fragment_run_tables'][0]['runs']:
+        line = '\t\tfragment = %d, timestamp = %d, duration = %d' % (first, timestamp, duration)
+        if duration == 0:
+            line += ', discontinuity = %d' % discontinuity
+        lines.append(line)
+    return lines
+
+# A live bootstrap with one fragment run per fragment (alternating
+# durations keep the runs from collapsing) and ten fragments a segment
+def synthetic_bootstrap(fragments):
+    runs = [(i + 1, i * 4000, 4000 + (i & 1), 0) for i in xrange(fragments)]
+    segments = [(i + 1, 10) for i in xrange((fragments + 9) / 10)]
+    return BootstrapWriter.write({'live': True,
+                                  'current_media_time': fragments * 4000,
+                                  'segment_run_tables': [{'runs': segments}],
+                                  'fragment_run_tables': [{'timescale': 1000, 'runs': runs}]})
+
+def synthetic_mlm(media):
+    return ('<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<manifest xmlns="http://ns.adobe.com/f4m/2.0">\n'
+            '\t<baseURL>http://localhost/hds-live/streams/livepkgr/events/_definst_/liveevent/</baseURL>\n%s'
+            '</manifest>\n' % ''.join('\t<media href="livestream%d.f4m" bitrate="%d"/>\n' % (i + 1, 300 + i)
+                                     for i in xrange(media)))
+
+def manifest_with(data):
+    return ('<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<manifest xmlns="http://ns.adobe.com/f4m/1.0">\n'
+            '\t<id>liveevent</id>\n\t<streamType>live</streamType>\n'
+            '\t<bootstrapInfo profile="named" id="bootstrap0">\n%s\t</bootstrapInfo>\n'
+            '\t<media streamId="livestream1" url="livestream1" bootstrapInfoId="bootstrap0"/>\n'
+            '</manifest>\n' % encodestring(data))
+
+# Bootstraps of a live stream as it advances, with numbering gaps and
+# discontinuities, for the steady state per poll cost
+def live_polls(count):
+    stream = LiveStream('livestream1', 500, 4000, 0, 30, gap_every=25, gap_size=3, discontinuity_every=40, start=0)
+    return [stream.run_tables(produced) for produced in xrange(1, count + 1)]
+
+# Each case is (name, setup); setup builds the inputs and returns the
+# zero argument callable that is timed
+def cases(ref_dir, large):
+    ref = []
+    for file_name in sorted(glob.glob(os.path.join(ref_dir, '*.bootstrap'))):
+        data = open(file_name, 'rb').read()
+        try:
+            hds.parse_bootstrap(data)
+        except Exception:
+            continue
+        ref.append(data)
+    ref_parsed = [hds.parse_bootstrap(data) for data in ref]
+    ref_live = [b for b in ref_parsed if b['live']]
+
+    def parse_ref():
+        parse = hds.parse_bootstrap
+        return lambda: [parse(data) for data in ref]
+    yield 'parse_bootstrap[ref x%d]' % len(ref), parse_ref
+
+    def extract_ref_live():
+        def op():
+            for bootstrap in ref_live:
+                hds.extract_fragments('bench', bootstrap, FragmentTracker(settings.fragment_retention), True)
+        return op
+    yield 'extract_fragments.live[ref x%d]' % len(ref_live), extract_ref_live
+
+    def extract_ref_vod():
+        return lambda: [hds.extract_fragments('bench', bootstrap, [], False) for bootstrap in ref_parsed]
+    yield 'extract_fragments.vod[ref x%d]' % len(ref_parsed), extract_ref_vod
+
+    def inspect_ref():
+        texts = [inspect_text(bootstrap) for bootstrap in ref_parsed]
+        return lambda: [hds.parse_inspect_output(text) for text in texts]
+    yield 'parse_inspect_output[ref x%d]' % len(ref_parsed), inspect_ref
+
+    def live_poll():
+        polls = live_polls(1000)
+        def op():
+            tracker = FragmentTracker(settings.fragment_retention)
+            for bootstrap in polls:
+                hds.extract_fragments('bench', bootstrap, tracker, True)
+                tracker.take_pending()
+        return op
+    yield 'extract_fragments.live[1000 polls]', live_poll
+
+    for size in SIZES:
+        def parse_large(size=size):
+            data = synthetic_bootstrap(size)
+            return lambda: hds.parse_bootstrap(data)
+        yield 'parse_bootstrap[%d]' % size, parse_large
+
+        def extract_live(size=size):
+            bootstrap = hds.parse_bootstrap(synthetic_bootstrap(size))
+            return lambda: hds.extract_fragments('bench', bootstrap, FragmentTracker(settings.fragment_retention), True)
+        yield 'extract_fragments.live[%d]' % size, extract_live
+
+        def extract_vod(size=size):
+            bootstrap = hds.parse_bootstrap(synthetic_bootstrap(size))
+            return lambda: hds.extract_fragments('bench', bootstrap, [], False)
+        yield 'extract_fragments.vod[%d]' % size, extract_vod
+
+        def run_table(size=size):
+            bootstrap = hds.parse_bootstrap(synthetic_bootstrap(size))
+            return lambda: RunTable(bootstrap)
+        yield 'RunTable[%d]' % size, run_table
+
+        def run_table_lookup(size=size):
+            runs = RunTable(hds.parse_bootstrap(synthetic_bootstrap(size)))
+            numbers = [1 + i * size / 1000 for i in xrange(1000)]
+            def op():
+                lookup = runs.lookup
+                for number in numbers:
+                    lookup(number)
+            return op
+        yield 'RunTable.lookup[%d x1000]' % size, run_table_lookup
+
+        def manifest(size=size):
+            content = manifest_with(synthetic_bootstrap(size))
+            return lambda: hds.parse_manifest(content)
+        yield 'parse_manifest[%d]' % size, manifest
+
+    for size in (large and TEXT_SIZES + SIZES[1:] or TEXT_SIZES):
+        def sections(size=size):
+            text = inspect_text(hds.parse_bootstrap(synthetic_bootstrap(size)))
+            def op():
+                lines = list(text)
+                hds.extract_segment_section(lines)
+                hds.extract_fragment_section(lines)
+            return op
+        yield 'extract_sections[%d]' % size, sections
+
+        def inspect(size=size):
+            text = inspect_text(hds.parse_bootstrap(synthetic_bootstrap(size)))
+            return lambda: hds.parse_inspect_output(text)
+        yield 'parse_inspect_output[%d]' % size, inspect
+
+    for size in MEDIA_SIZES:
+        def mlm(size=size):
+            content = synthetic_mlm(size)
+            return lambda: hds.parse_live_mlm(content)
+        yield 'parse_live_mlm[%d media]' % size, mlm
+
+# Resident set in KiB from /proc, None where it is not available
+def memory_status(field):
+    try:
+        for line in open('/proc/self/status'):
+            if line.startswith(field + ':'):
+                return int(line.split()[1])
+    except IOError:
+        return None
+    return None
+
+# Peak resident set growth over one call. Resets the kernel high water
+# mark first (Linux 4.0+), returns None if that is not possible
+def peak_memory(op):
+    gc.collect()
+    try:
+        FILE = open('/proc/self/clear_refs', 'w')
+        FILE.write('5')
+        FILE.close()
+    except IOError:
+        return None
+    before = memory_status('VmRSS')
+    op()
+    peak = memory_status('VmHWM')
+    if before is None or peak is None:
+        return None
+    return max(peak - before, 0)
+
+# Best of 'repeats' timed loops, each loop long enough to take min_time
+def measure(op, repeats, min_time, budget):
+    start = time.time()
+    op()
+    single = time.time() - start
+    calls = max(int(min_time / max(single, 1e-7)), 1)
+    repeats = max(min(repeats, int(budget / max(single * calls, 1e-7))), 1)
+
+    per_call = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for i in xrange(repeats):
+            start = time.time()
+            for j in xrange(calls):
+                op()
+            per_call.append((time.time() - start) / calls)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    per_call.sort()
+    return {'calls': calls * repeats,
+            'ops_per_sec': 1.0 / per_call[0],
+            'usec_per_call': per_call[0] * 1e6,
+            'usec_median': per_call[len(per_call) / 2] * 1e6}
+
+def run(args):
+    results = {}
+    for name, setup in cases(args.ref, args.large):
+        if args.filter and args.filter not in name:
+            continue
+        op = setup()
+        result = measure(op, args.repeats, args.min_time, args.budget)
+        result['peak_kib'] = peak_memory(op)
+        results[name] = result
+        print '%-40s %12.1f ops/s %12.1f us/call %12.1f us median %10s KiB peak' % (
+            name, result['ops_per_sec'], result['usec_per_call'], result['usec_median'],
+            result['peak_kib'] is None and '-' or result['peak_kib'])
+        del op
+    return results
+
+# Prints the change against a baseline, returns the regressed cases
+def compare(results, baseline, threshold):
+    regressions = []
+    for name in sorted(results):
+        old = baseline['results'].get(name)
+        if old is None:
+            print '%-40s new' % name
+            continue
+        change = (old['usec_per_call'] and results[name]['usec_per_call'] / old['usec_per_call'] - 1) or 0
+        flag = ''
+        if change > threshold:
+            flag = 'REGRESSION'
+            regressions.append(name)
+        print '%-40s %12.1f -> %12.1f us/call %+7.1f%% %s' % (name, old['usec_per_call'],
+                                                           results[name]['usec_per_call'], change * 100, flag)
+    return regressions
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the hds parsing hot paths')
+    parser.add_argument('--ref', default=os.path.normpath(os.path.join(os.environ['HDS_LT_PATH'], '..', 'ref')),
+                        help='directory of reference bootstraps')
+    parser.add_argument('--filter', help='only run cases whose name contains this')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.2, help='seconds per timed loop')
+    parser.add_argument('--budget', type=float, default=5.0, help='seconds of timed loops per case')
+    parser.add_argument('--large', action='store_true', help='run the text cases up to 1M fragments')
+    parser.add_argument('--save', help='write the results to this JSON baseline')
+    parser.add_argument('--compare', help='compare against this JSON baseline')
+    parser.add_argument('--threshold', type=float, default=0.10, help='slowdown reported as a regression')
+    args = parser.parse_args()
+
+    results = run(args)
+
+    if args.save:
+        FILE = open(args.save, 'wb')
+        json.dump({'meta': {'python': platform.python_version(),
+                            'platform': platform.platform(),
+                            'time': int(time.time()),
+                            'repeats': args.repeats,
+                            'min_time': args.min_time},
+                   'results': results}, FILE, indent=1, sort_keys=True)
+        FILE.write('\n')
+        FILE.close()
+
+    if args.compare:
+        FILE = open(args.compare, 'rb')
+        baseline = json.load(FILE)
+        FILE.close()
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
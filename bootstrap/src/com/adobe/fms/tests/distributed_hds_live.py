@@ -0,0 +1,246 @@
+'''
+Created on 18 Oct 2026
+
+@author: wallace
+
+Spreads the live load test over several hosts. The coordinator reads the
+multi-level manifest once, hands each connected agent a shard of the
+streams and merges the results the agents stream back:
+
+    distributed_hds_live.py coordinator --agents 4 --port 9400
+    distributed_hds_live.py agent --coordinator host:9400
+
+With --local the coordinator starts the agents itself as local processes.
+'''
+
+import sys
+import os
+sys.path.append(os.path.normpath(os.environ['HDS_LT_PATH']))
+import argparse
+import socket
+import subprocess
+import threading
+import time
+from com.adobe.fms.settings import settings
+from com.adobe.fms.utilities.AgentProtocol import AgentConnection
+from com.adobe.fms.utilities.BatchWriter import BatchWriter
+from com.adobe.fms.utilities.statistics import LatencyHistogram, LatencySnapshots
+from com.adobe.fms.tests import threaded_hds_live as live
+
+class AgentSink(object):
+
+    # Stands in for the writer on an agent: log and result records are
+    # sent to the coordinator instead of written locally
+    def __init__(self, conn):
+        self.conn = conn
+
+    def put(self, record):
+        if isinstance(record, live.ResultRecord):
+            return self.conn.send({'type': 'record',
+                                   'stream': record.stream_name,
+                                   'fragment': record.frag_num,
+                                   'latency': record.latency,
+                                   'throughput': record.throughput,
+                                   'requests': record.requests,
+                                   'errors': record.errors,
+                                   'bytes': record.nbytes,
+                                   'time': record.when})
+        if isinstance(record, live.LogTask):
+            return self.conn.send({'type': 'result',
+                                   'stream': record.stream_name,
+                                   'fragment': record.frag_num,
+                                   'latency': record.latency,
+                                   'throughput': record.throughput,
+                                   'non200': record.non200s,
+                                   'percentiles': record.percentiles,
+                                   'transfer': record.transfer,
+                                   'schedule': record.schedule})
+        if isinstance(record, live.AvailabilityLog):
+            return self.conn.send({'type': 'availability',
+                                   'stream': record.stream_name,
+                                   'fragment': record.frag_num,
+                                   'duration': record.frag_dur,
+                                   'seen': record.seen,
+                                   'first_request': record.first_request,
+                                   'first_200': record.first_200,
+                                   'not_found': record.not_found})
+        return self.conn.send({'type': 'log',
+                               'level': record.level,
+                               'msg': record.msg,
+                               'time': time.mktime(record.time)})
+
+def send_latencies(conn):
+    histograms = live.histogram_snapshots()
+    conn.send({'type': 'latencies',
+               'histograms': dict((name, dict((stream, histogram.encode()) for stream, histogram in streams.iteritems()))
+                                  for name, streams in histograms.iteritems()),
+               'metrics': live.metrics.snapshot(False)})
+
+def run_agent(address):
+    conn = AgentConnection.connect(address)
+    conn.send({'type': 'hello', 'host': socket.gethostname()})
+    assign = conn.receive()
+    if assign is None or assign.get('type') != 'assign':
+        print 'No assignment from coordinator %s' % address
+        return
+
+    # The coordinator decides the workload
+    for name, value in assign.get('settings', {}).iteritems():
+        setattr(live, name, value)
+
+    agent_id = assign['agent']
+    prefix = 'Agent %d: ' % agent_id
+    print prefix + 'running %d streams' % len(assign['streams'])
+    live.start_pipeline(assign['streams'], AgentSink(conn),
+                        settings.bootstrap_archive and '%s.%d' % (settings.bootstrap_archive, agent_id))
+    live.start_profiler()
+
+    stopping = threading.Event()
+    def listen():
+        for message in conn:
+            if message.get('type') == 'stop':
+                break
+        stopping.set()
+    listener = threading.Thread(target=listen)
+    listener.daemon = True
+    listener.start()
+
+    last_report = time.time()
+    try:
+        while not stopping.is_set():
+            live.wait(1)
+            if time.time() - last_report >= settings.shard_report_interval:
+                send_latencies(conn)
+                live.log_summaries(prefix)
+                last_report = time.time()
+    except KeyboardInterrupt:
+        pass
+    send_latencies(conn)
+    live.log_summaries(prefix)
+    live.close_archive()
+    conn.send({'type': 'done'})
+    conn.close()
+
+# Reads one agent's messages until it is done or disconnects
+def relay(agent_id, conn, writer, snapshots):
+    for message in conn:
+        kind = message.get('type')
+        if kind == 'record':
+            writer.put(live.ResultRecord(message['stream'], message['fragment'], message['latency'],
+                                         message['throughput'], message['requests'], message['errors'],
+                                         message['bytes'], message['time']))
+        elif kind == 'result':
+            writer.put(live.LogTask(message['stream'], message['fragment'], message['latency'],
+                                    message['throughput'], message['non200'], message['percentiles'],
+                                    message.get('transfer', ''), message.get('schedule', '')))
+        elif kind == 'availability':
+            writer.put(live.AvailabilityLog(message['stream'], message['fragment'], message['duration'], message['seen'],
+                                            message['first_request'], message['first_200'], message['not_found']))
+        elif kind == 'log':
+            task = live.TestTask(message['level'], message['msg'])
+            task.time = time.localtime(message['time'])
+            writer.put(task)
+        elif kind == 'latencies':
+            for name, streams in message['histograms'].iteritems():
+                if name in snapshots:
+                    snapshots[name].update(agent_id, dict((stream, LatencyHistogram.decode(data))
+                                                          for stream, data in streams.iteritems()))
+            if 'metrics' in message:
+                live.metrics.update('agent%d' % agent_id, message['metrics'])
+        elif kind == 'done':
+            break
+    conn.close()
+
+def run_coordinator(num_agents, port, local):
+    writer = BatchWriter(settings.log_buffer_records, settings.log_flush_records,
+                         settings.log_flush_interval, settings.log_overflow)
+    writer.start()
+    live.test_info = writer
+    live.open_results()
+
+    urls = live.event_urls()
+    bootstrap_list = live.discover_events(urls, settings.discovery_threads)
+    if not bootstrap_list:
+        writer.put(live.TestTask('ERROR', ('No streams found in %d multi-level manifests' % len(urls))))
+        print ('No streams found in %d multi-level manifests' % len(urls))
+        writer.close()
+        live.result_log.close()
+        return
+
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(('', port))
+    server.listen(num_agents)
+    port = server.getsockname()[1]
+    print 'Coordinator listening on port %d for %d agents' % (port, num_agents)
+
+    agents = []
+    if local:
+        for i in xrange(num_agents):
+            agents.append(subprocess.Popen([sys.executable, os.path.abspath(__file__),
+                                            'agent', '--coordinator', '127.0.0.1:%d' % port]))
+
+    conns = []
+    while len(conns) < num_agents:
+        sock, address = server.accept()
+        conn = AgentConnection(sock)
+        hello = conn.receive()
+        writer.put(live.TestTask('INFO', 'Agent %d connected from %s (%s)' % (len(conns), address[0], hello and hello.get('host'))))
+        print 'Agent %d connected from %s' % (len(conns), address[0])
+        conns.append(conn)
+    server.close()
+
+    snapshots = dict((name, LatencySnapshots()) for name in live.histogram_recorders())
+    reporters = live.report_histograms(snapshots)
+    live.metrics.register('writer_queue_depth', 'gauge', writer.qsize)
+    live.start_metrics()
+
+    shards = live.shard_streams(bootstrap_list, num_agents)
+    relays = []
+    for agent_id, conn in enumerate(conns):
+        writer.put(live.TestTask('INFO', ('Agent %d takes %d streams' % (agent_id, len(shards[agent_id])))))
+        conn.send({'type': 'assign',
+                   'agent': agent_id,
+                   'streams': shards[agent_id],
+                   'settings': {'num_req': live.num_req,
+                                'concurrency': live.concurrency,
+                                'server_name': live.server_name,
+                                'MERGE_ORIGINS': live.MERGE_ORIGINS}})
+        thread = threading.Thread(target=relay, args=(agent_id, conn, writer, snapshots))
+        thread.daemon = True
+        thread.start()
+        relays.append(thread)
+
+    try:
+        while any(thread.is_alive() for thread in relays):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print 'Stopping agents'
+        for conn in conns:
+            conn.send({'type': 'stop'})
+        deadline = time.time() + 30
+        for thread in relays:
+            thread.join(max(deadline - time.time(), 0))
+
+    for reporter in reporters:
+        reporter.stop()
+    for agent in agents:
+        agent.wait()
+    writer.close()
+    live.result_log.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Distributed HDS live load test')
+    sub = parser.add_subparsers(dest='mode')
+    coordinator = sub.add_parser('coordinator')
+    coordinator.add_argument('--agents', type=int, default=1, help='number of agents to wait for')
+    coordinator.add_argument('--port', type=int, default=9400)
+    coordinator.add_argument('--local', action='store_true', help='start the agents as local processes')
+    agent = sub.add_parser('agent')
+    agent.add_argument('--coordinator', required=True, help='host:port of the coordinator')
+    args = parser.parse_args()
+
+    if args.mode == 'coordinator':
+        run_coordinator(args.agents, args.port, args.local)
+    else:
+        run_agent(args.coordinator)
@@ -0,0 +1,144 @@
+'''
+Created on 18 Oct 2026
+
+@author: wallace
+
+Python counterpart of tools/merge.pl: writes the union of bootstraps
+(files, or directories of them) to a file
+
+    merge_bootstraps.py union.bootstrap a.bootstrap b.bootstrap
+
+With --compare the inputs are grouped by name instead (bbc1_hd_p1 to
+bbc1_hd_p6 are one rendition), every group is merged both here and by
+tools/merge.pl and the two unions are compared:
+
+    merge_bootstraps.py --compare ../../../../../ref
+'''
+
+import sys
+import os
+sys.path.append(os.path.normpath(os.environ['HDS_LT_PATH']))
+import argparse
+import re
+import subprocess
+import tempfile
+from com.adobe.fms.utilities.hds import hds
+from com.adobe.fms.utilities.BootstrapParser import BootstrapParseError
+from com.adobe.fms.utilities.BootstrapMerger import BootstrapMergeError
+from com.adobe.fms.utilities.BootstrapWriter import BootstrapWriter
+
+MERGE_PL = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../../../../tools/merge.pl'))
+
+# Files named, directories expanded, as merge.pl loads them
+def input_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(input_files(sorted(os.path.join(path, name) for name in os.listdir(path))))
+        else:
+            files.append(path)
+    return files
+
+def load(file_name):
+    FILE = open(file_name, 'rb')
+    data = FILE.read()
+    FILE.close()
+    return hds.parse_bootstrap(data)
+
+# Bootstrap files by rendition: the name without a trailing number
+def group_files(files):
+    groups = {}
+    for file_name in files:
+        if file_name.endswith('.bootstrap'):
+            name = re.sub(r'[-_]?p?\d*\.bootstrap$', '', os.path.basename(file_name))
+            groups.setdefault(name, []).append(file_name)
+    return groups
+
+# merge.pl's union of files, parsed, or the error it gave
+def perl_merge(files, merge_pl):
+    root = os.path.dirname(os.path.dirname(merge_pl))
+    handle, out = tempfile.mkstemp('.bootstrap')
+    os.close(handle)
+    try:
+        process = subprocess.Popen(['perl', '-I' + os.path.join(root, 'lib'), merge_pl, out] +
+                                   [os.path.abspath(file_name) for file_name in files],
+                                   cwd=root, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        output = process.communicate()[0]
+        if process.returncode != 0:
+            return None, output.strip().splitlines()[0]
+        return load(out), None
+    finally:
+        os.remove(out)
+
+# First key at which two unions differ, None if they are the same
+def difference(lhs, rhs, path=''):
+    if isinstance(lhs, dict) and isinstance(rhs, dict):
+        for key in sorted(set(lhs) | set(rhs)):
+            found = difference(lhs.get(key), rhs.get(key), path + '/' + key)
+            if found is not None:
+                return found
+        return None
+    if isinstance(lhs, list) and isinstance(rhs, list) and len(lhs) == len(rhs):
+        for i in xrange(len(lhs)):
+            found = difference(lhs[i], rhs[i], '%s/%d' % (path, i))
+            if found is not None:
+                return found
+        return None
+    if lhs != rhs:
+        return '%s: %r != %r' % (path or '/', lhs, rhs)
+    return None
+
+def compare(paths, merge_pl):
+    groups = group_files(input_files(paths))
+    failed = 0
+    for name in sorted(groups):
+        files = groups[name]
+        try:
+            union, error = hds.merge_bootstraps([load(file_name) for file_name in files]), None
+        except BootstrapParseError, parse_error:
+            print '%-24s skipped, %s' % (name, parse_error)
+            continue
+        except BootstrapMergeError, merge_error:
+            union, error = None, str(merge_error)
+
+        expected, perl_error = perl_merge(files, merge_pl)
+        if perl_error is not None and perl_error.startswith('Can\'t locate'):
+            print 'merge.pl cannot run here: %s' % perl_error
+            return 2
+        if perl_error is not None and union is not None:
+            print '%-24s merge.pl failed: %s' % (name, perl_error)
+            failed += 1
+        elif union is None and expected is None:
+            print '%-24s %d files, both reject: %s' % (name, len(files), error)
+        elif union is None:
+            print '%-24s merge.pl merges, here: %s' % (name, error)
+            failed += 1
+        else:
+            found = difference(expected, union)
+            if found is None:
+                print '%-24s %d files, same union' % (name, len(files))
+            else:
+                print '%-24s %d files, differs at %s' % (name, len(files), found)
+                failed += 1
+    return failed and 1 or 0
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Merge HDS bootstraps as tools/merge.pl does')
+    parser.add_argument('--compare', action='store_true', help='check every group of inputs against merge.pl')
+    parser.add_argument('--merge-pl', default=MERGE_PL, help='path of tools/merge.pl')
+    parser.add_argument('paths', nargs='+', help='output file then inputs, or with --compare inputs only')
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(compare(args.paths, args.merge_pl))
+
+    if len(args.paths) < 2:
+        parser.error('an output file and at least one input are needed')
+    try:
+        union = hds.merge_bootstraps([load(file_name) for file_name in input_files(args.paths[1:])])
+    except (BootstrapParseError, BootstrapMergeError), error:
+        print error
+        sys.exit(1)
+    FILE = open(args.paths[0], 'wb')
+    FILE.write(BootstrapWriter.write(union))
+    FILE.close()
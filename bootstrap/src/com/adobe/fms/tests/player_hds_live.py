@@ -0,0 +1,333 @@
+'''
+Created on 18 Oct 2026
+
+@author: wallace
+
+Emulates adaptive bitrate players following the live edge instead of
+load testing single fragments. Each virtual player joins a few fragments
+behind the edge on the lowest rendition of the multi-level manifest, then
+fetches fragment after fragment, switching rendition on its measured
+download rate, with a modelled playback buffer that can run dry:
+
+    player_hds_live.py --players 20000 --ramp 120 --threads 200
+
+Players are plain objects moved along by the scheduler. Bootstraps are
+polled once per rendition whatever the number of players, and the
+fragment downloads share a fixed pool of fetch threads.
+'''
+
+import sys
+import os
+sys.path.append(os.path.normpath(os.environ['HDS_LT_PATH']))
+import argparse
+import Queue
+import threading
+import time
+import traceback
+from urlparse import urlsplit
+from com.adobe.fms.utilities.hds import hds
+from com.adobe.fms.utilities.ManifestReader import ManifestReader
+from com.adobe.fms.utilities.BootstrapParser import BootstrapParseError
+from com.adobe.fms.utilities.FragmentTracker import FragmentTracker
+from com.adobe.fms.utilities.FragmentValidator import FragmentValidator
+from com.adobe.fms.utilities.LoadEngine import LoadEngine
+from com.adobe.fms.utilities.BatchWriter import BatchWriter
+from com.adobe.fms.utilities.VirtualPlayer import VirtualPlayer
+from com.adobe.fms.utilities.statistics import HistogramReporter
+from com.adobe.fms.settings import settings
+from com.adobe.fms.tests import threaded_hds_live as live
+
+class Rendition(object):
+
+    # One rung of the bitrate ladder and its live edge, from the polled
+    # bootstrap. Players caught up with the edge wait on it until the
+    # next fragment is announced
+    def __init__(self, name, bitrate):
+        self.name       = name
+        self.bitrate    = bitrate
+        self.url        = 'http://' + live.server_name + '/hds-live/streams/livepkgr/streams/_definst_/' + name + '/' + name
+        self.path       = urlsplit(self.url).path
+        self.pool       = LoadEngine.get_pool(self.url, settings.player_threads)
+        self.tracker    = FragmentTracker(settings.fragment_retention)
+        self.lock       = threading.Lock()
+        self.waiting    = []
+
+        self.segment    = None
+        self.edge       = None
+        self.duration   = 0
+        self.requests   = 0
+
+class PlayerRecord(object):
+
+    # Final line of the per player CSV
+    def __init__(self, player, rendition, now):
+        self.player     = player
+        self.rendition  = rendition
+        self.now        = now
+
+    def render(self):
+        p = self.player
+        return (os.path.normpath(settings.bootstrap_dir + '/players.csv'),
+                '%d,%s,%.1f,%d,%d,%d,%.3f,%.1f,%d,%d\n' % (p.id, self.rendition, self.now - p.joined, p.fragments,
+                                                           p.switches, p.rebuffers, p.stall, p.mean_bitrate(),
+                                                           p.bytes, p.errors))
+
+class PlayerDriver(object):
+
+    # Moves the players along: fragment downloads run on the fetch
+    # threads, bootstrap polls on threads of their own so a download
+    # backlog never delays the live edge, and everything that waits goes
+    # on the scheduler
+    def __init__(self, ladder, count, ramp, threads):
+        self.ladder     = ladder
+        self.bitrates   = [rendition.bitrate for rendition in ladder]
+        self.count      = count
+        self.ramp       = ramp
+        self.threads    = threads
+        self.players    = []
+        self.jobs       = Queue.Queue()
+        self.polls      = Queue.Queue()
+        self.stopping   = False
+        self.validate   = settings.validate_fragments
+
+        self.offset     = settings.player_live_offset
+        self.startup    = settings.player_startup_buffer
+        self.max_buffer = settings.player_max_buffer
+        self.safety     = settings.player_safety
+        self.up_buffer  = settings.player_up_buffer
+
+    def start(self):
+        live.scheduler.start()
+        pollers = min(len(self.ladder), live.MAX_BOOSTRAP_THREAD_COUNT)
+        for i in xrange(self.threads + pollers):
+            worker = threading.Thread(target=self.work, args=(i < self.threads and self.jobs or self.polls,))
+            worker.daemon = True
+            worker.start()
+
+        now = time.time()
+        for rendition in self.ladder:
+            self.polls.put((self.poll, rendition))
+        # Players join evenly over the ramp
+        for player_id in xrange(self.count):
+            player = VirtualPlayer(player_id, 0, None, now, self.startup)
+            self.players.append(player)
+            live.scheduler.call_at(now + self.ramp * player_id / float(self.count), self.jobs.put, (self.join, player))
+
+    def later(self, delay, method, arg, jobs=None):
+        live.scheduler.call_later(delay, (jobs or self.jobs).put, (method, arg))
+
+    def work(self, jobs):
+        while not self.stopping:
+            method, arg = jobs.get()
+            # A failed job is logged, the worker goes on with the next
+            try:
+                method(arg)
+            except Exception, error:
+                live.test_info.put(live.TestTask('ERROR', ('Player job %s failed: %s' % (method.__name__, error))))
+                traceback.print_exc()
+
+    # Players stop where they are, downloads in flight are abandoned
+    def stop(self):
+        self.stopping = True
+        live.scheduler.stop()
+
+    def poll(self, rendition):
+        interval = live.BOOTSTRAP_POLL_INTERVAL
+        if rendition.duration:
+            interval = min(interval, rendition.duration / 2000.0)
+        self.later(interval, self.poll, rendition, self.polls)
+
+        b_req = hds.poll_live_bootstrap(live.bootstrap_client, rendition.url)
+        if not b_req:
+            if b_req is False:
+                live.test_info.put(live.TestTask('ERROR', ('Bootstrap for %s could not be loaded' % rendition.name)))
+            return
+        try:
+            bootstrap, new = live.bootstrap_cache.parse(rendition.name, b_req)
+        except BootstrapParseError, error:
+            live.test_info.put(live.TestTask('ERROR', ('Bootstrap for %s could not be parsed: %s' % (rendition.name, error))))
+            return
+        if new is False and rendition.edge is not None:
+            return
+
+        fragment = hds.extract_fragments(rendition.name, bootstrap, rendition.tracker, True)
+        rendition.tracker.take_pending()
+        with rendition.lock:
+            rendition.segment, rendition.edge, rendition.duration = fragment[0][0], fragment[0][1], fragment[0][2]
+            waiting, rendition.waiting = rendition.waiting, []
+        for player in waiting:
+            self.jobs.put((self.fetch, player))
+
+    def join(self, player):
+        rendition = self.ladder[player.rendition]
+        if rendition.edge is None:
+            self.later(0.5, self.join, player)
+            return
+        player.fragment = max(rendition.edge - self.offset + 1, 0)
+        player.joined = time.time()
+        self.fetch(player)
+
+    def fetch(self, player):
+        rendition = self.ladder[player.rendition]
+        with rendition.lock:
+            if rendition.edge is None or player.fragment > rendition.edge:
+                # Caught up with the live edge
+                rendition.waiting.append(player)
+                return
+            segment, edge, duration = rendition.segment, rendition.edge, rendition.duration
+            rendition.requests += 1
+
+        validator = self.validate and FragmentValidator(player.fragment, duration, segment) or None
+        connect, ttfb, total, nbytes, status, errors = LoadEngine.fetch(rendition.pool,
+                                                                        rendition.path + 'Seg%d-Frag%d' % (segment, player.fragment),
+                                                                        validator)
+        now = time.time()
+        live.metrics.inc('fragment_requests', rendition.name)
+        live.metrics.inc('fragment_bytes', rendition.name, nbytes)
+        if status == 200:
+            live.latencies.record(rendition.name, total * 1000)
+            if errors:
+                player.errors += 1
+            player.add_fragment(now, nbytes, total, duration / 1000.0, rendition.bitrate)
+            player.fragment += 1
+            player.choose(self.bitrates, now, self.safety, self.up_buffer)
+            wait = player.level(now) - self.max_buffer
+            if wait > 0:
+                self.later(wait, self.fetch, player)
+            else:
+                self.jobs.put((self.fetch, player))
+        elif status == 404:
+            live.metrics.inc('fragment_non2xx', rendition.name)
+            # A hole in the fragment numbering, or the player has fallen
+            # out of the window and resyncs to the live point
+            player.errors += 1
+            if player.fragment <= edge - self.offset:
+                player.fragment = edge - self.offset + 1
+            else:
+                player.fragment += 1
+            self.jobs.put((self.fetch, player))
+        else:
+            live.metrics.inc(status and 'fragment_non2xx' or 'fragment_failures', rendition.name)
+            player.errors += 1
+            self.later(1.0, self.fetch, player)
+
+    # Totals over the players that have joined, and the viewers of each
+    # rendition
+    def stats(self):
+        now = time.time()
+        stats = dict.fromkeys(('joined', 'playing', 'stalled', 'rebuffers', 'switches', 'errors'), 0)
+        stats['stall'] = stats['bitrate'] = 0.0
+        viewers = [0] * len(self.ladder)
+        for player in self.players:
+            if player.fragment is None:
+                continue
+            stats['joined'] += 1
+            viewers[player.rendition] += 1
+            if player.playing:
+                stats['playing'] += 1
+                if player.level(now) == 0:
+                    stats['stalled'] += 1
+            stats['rebuffers'] += player.rebuffers
+            stats['switches'] += player.switches
+            stats['errors'] += player.errors
+            stats['stall'] += player.stall
+            stats['bitrate'] += player.mean_bitrate()
+        if stats['joined']:
+            stats['bitrate'] /= stats['joined']
+        stats['viewers'] = dict((rendition.name, viewers[i]) for i, rendition in enumerate(self.ladder))
+        return stats
+
+    def summary(self):
+        stats = self.stats()
+        return ('Players: %d joined, %d playing, %d stalled, %d rebuffers (%.1f s), %d switches, %d errors, mean %.0f kbps | %s'
+                % (stats['joined'], stats['playing'], stats['stalled'], stats['rebuffers'], stats['stall'],
+                   stats['switches'], stats['errors'], stats['bitrate'],
+                   ', '.join('%s %d kbps: %d viewers %d requests' % (rendition.name, rendition.bitrate,
+                                                                      stats['viewers'][rendition.name], rendition.requests)
+                             for rendition in self.ladder)))
+
+    # Player totals for the metrics endpoint, worked out on scrape
+    def register_metrics(self):
+        for name, kind in (('joined', 'gauge'), ('playing', 'gauge'), ('stalled', 'gauge'), ('viewers', 'gauge'),
+                           ('rebuffers', 'counter'), ('switches', 'counter'), ('errors', 'counter')):
+            live.metrics.register('players_' + name, kind, lambda name=name: self.stats()[name])
+        live.metrics.register('player_fetch_queue_depth', 'gauge', self.jobs.qsize)
+        live.metrics.register('scheduler_pending', 'gauge', lambda: len(live.scheduler))
+        live.metrics.register('scheduler_lag_p99_ms', 'gauge', lambda: live.scheduler.lag.copy().percentile(99))
+        live.metrics.register('fragment_latency_ms', 'summary', lambda: live.latencies.snapshot()[0])
+
+    def write_players(self, writer):
+        now = time.time()
+        for player in self.players:
+            if player.fragment is not None:
+                writer.put(PlayerRecord(player, self.ladder[player.rendition].name, now))
+
+# The bitrate ladder from the multi-level manifest, lowest first
+def read_ladder(m_req):
+    ladder = []
+    for media in ManifestReader(m_req).media():
+        if media.href:
+            try:
+                bitrate = int(float(media.bitrate))
+            except (TypeError, ValueError):
+                bitrate = 0
+            ladder.append(Rendition(media.href.split('.')[0], bitrate))
+    ladder.sort(key=lambda rendition: rendition.bitrate)
+    return ladder
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Adaptive bitrate virtual players following the live edge')
+    parser.add_argument('--players', type=int, default=settings.player_count)
+    parser.add_argument('--ramp', type=float, default=settings.player_ramp, help='seconds over which players join')
+    parser.add_argument('--threads', type=int, default=settings.player_threads, help='concurrent fragment downloads')
+    parser.add_argument('--duration', type=float, default=0, help='seconds to run, 0 until interrupted')
+    args = parser.parse_args()
+
+    writer = BatchWriter(settings.log_buffer_records, settings.log_flush_records,
+                         settings.log_flush_interval, settings.log_overflow)
+    writer.start()
+    live.test_info = writer
+
+    m_req = hds.request_manifest(live.mlm_url)
+    if m_req is not False:
+        ladder = read_ladder(m_req)
+        driver = PlayerDriver(ladder, args.players, args.ramp, args.threads)
+        writer.put(live.TestTask('INFO', ('Emulating %d players over %s' % (args.players,
+                                          ', '.join('%s (%d kbps)' % (r.name, r.bitrate) for r in ladder)))))
+        driver.start()
+        driver.register_metrics()
+        live.start_metrics()
+
+        reporter = HistogramReporter(live.latencies, os.path.normpath(settings.bootstrap_dir + '/latency_percentiles.csv'),
+                                     settings.histogram_interval)
+        reporter.start()
+
+        deadline = args.duration and time.time() + args.duration
+        try:
+            while True:
+                wait = settings.player_report_interval
+                if deadline:
+                    wait = min(wait, deadline - time.time())
+                    if wait <= 0:
+                        break
+                time.sleep(wait)
+                summary = driver.summary()
+                print summary
+                writer.put(live.TestTask('INFO', summary))
+        except KeyboardInterrupt:
+            print 'Stopping, flushing results'
+        finally:
+            reporter.stop()
+            summary = driver.summary()
+            print summary
+            writer.put(live.TestTask('INFO', summary))
+            live.log_summaries()
+            driver.stop()
+            driver.write_players(writer)
+    else:
+        writer.put(live.TestTask('ERROR', ('Multi-level Manifest could not be loaded. Verify %s.f4m to ensure it can be reached.' % live.mlm_url)))
+        print ('Multi-level Manifest could not be loaded. Verify %s.f4m to ensure it can be reached.' % live.mlm_url)
+
+    writer.close()
+    if writer.dropped:
+        print ('%d log records were dropped' % writer.dropped)
@@ -0,0 +1,107 @@
+'''
+Created on 18 Oct 2026
+
+@author: wallace
+
+Replays bootstrap archives captured by threaded_hds_live.py (see
+settings.bootstrap_archive) through the parser and the live fragment
+tracking, without the origin, and reports per stream what the tracker
+made of them:
+
+    replay_bootstraps.py capture.hba capture.hba.0 --speed 60
+'''
+
+import sys
+import os
+sys.path.append(os.path.normpath(os.environ['HDS_LT_PATH']))
+import argparse
+import heapq
+import time
+from com.adobe.fms.utilities.hds import hds
+from com.adobe.fms.utilities.BootstrapArchive import ArchiveReader, replay
+from com.adobe.fms.utilities.BootstrapCache import BootstrapCache
+from com.adobe.fms.utilities.BootstrapParser import BootstrapParseError
+from com.adobe.fms.utilities.FragmentTracker import FragmentTracker
+from com.adobe.fms.settings import settings
+
+class StreamReplay(object):
+
+    # Fragment tracking state and counters for one replayed stream
+    def __init__(self, name, retention):
+        self.name           = name
+        self.tracker        = FragmentTracker(retention)
+        self.bootstraps     = 0
+        self.errors         = 0
+        self.fragments      = 0
+        self.filled         = 0
+        self.resets         = 0
+        self.discontinuities = 0
+        self.first_seen     = None
+        self.last_seen      = None
+
+    def feed(self, when, bootstrap):
+        self.bootstraps += 1
+        if self.first_seen is None:
+            self.first_seen = when
+        self.last_seen = when
+
+        previous = self.tracker.last_fragment
+        fragment = hds.extract_fragments(self.name, bootstrap, self.tracker, True)
+        if fragment[0][4]:
+            self.discontinuities += 1
+        pending = len(self.tracker.take_pending())
+        self.fragments += pending
+        if previous is not None and self.tracker.last_fragment < previous:
+            self.resets += 1
+        elif pending > 1:
+            # More than one new fragment per bootstrap: a gap was filled
+            self.filled += pending - 1
+
+def run(files, speed, stream_filter, start):
+    readers = [ArchiveReader(file_name) for file_name in files]
+    begin = None
+    if start:
+        begin = min(reader.times[0] for reader in readers if len(reader)) + start
+    records = heapq.merge(*[reader.records(begin) for reader in readers])
+
+    cache = BootstrapCache(settings.bootstrap_cache_entries)
+    streams = {}
+    count = 0
+    started = time.time()
+    for when, name, data in replay(records, speed):
+        if stream_filter and name not in stream_filter:
+            continue
+        stream = streams.get(name)
+        if stream is None:
+            stream = streams[name] = StreamReplay(name, settings.fragment_retention)
+        count += 1
+        try:
+            bootstrap, new = cache.parse(name, data)
+        except BootstrapParseError, error:
+            stream.errors += 1
+            print '%s: bootstrap at %.3f could not be parsed: %s' % (name, when, error)
+            continue
+        stream.feed(when, bootstrap)
+    elapsed = time.time() - started
+
+    print '%-24s %10s %10s %10s %8s %8s %8s %10s' % ('stream', 'bootstraps', 'fragments', 'filled',
+                                                   'resets', 'discon', 'errors', 'captured s')
+    for name in sorted(streams):
+        stream = streams[name]
+        print '%-24s %10d %10d %10d %8d %8d %8d %10.1f' % (name, stream.bootstraps, stream.fragments, stream.filled,
+                                                          stream.resets, stream.discontinuities, stream.errors,
+                                                          (stream.last_seen or 0) - (stream.first_seen or 0))
+    print 'Replayed %d bootstraps in %.2f s (%s)' % (count, elapsed, cache.summary())
+
+    for reader in readers:
+        reader.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replay captured bootstraps through the fragment tracking')
+    parser.add_argument('archives', nargs='+', help='archive files, merged by capture time')
+    parser.add_argument('--speed', type=float, default=0, help='times real time, 0 for as fast as possible')
+    parser.add_argument('--stream', action='append', help='only replay this stream (repeatable)')
+    parser.add_argument('--start', type=float, default=0, help='skip this many seconds of the capture')
+    args = parser.parse_args()
+
+    run(args.archives, args.speed, args.stream and set(args.stream), args.start)
@@ -0,0 +1,158 @@
+'''
+Created on 18 Oct 2026
+
+@author: wallace
+
+Summarizes the binary result log written by threaded_hds_live.py (see
+settings.results_file) per stream and, with --window, per time window:
+fragment tests, requests, error rate, bytes and the percentiles of the
+per-test mean latency. The log is memory-mapped and aggregated with
+numpy, so runs of millions of fragment tests take seconds:
+
+    results_report.py results.hrl --window 60
+    results_report.py results.hrl --export csv/
+
+--export writes the records of each stream to <dir>/<stream>.csv.
+Every run appends to the log; the last run is summarized unless --run
+picks another (1 the first, -2 the one before last, 0 all of them).
+'''
+
+import sys
+import os
+sys.path.append(os.path.normpath(os.environ['HDS_LT_PATH']))
+import argparse
+import time
+import numpy
+from com.adobe.fms.utilities.ResultLog import ResultReader
+from com.adobe.fms.utilities.statistics import PERCENTILES
+from com.adobe.fms.settings import settings
+
+# Aggregates of the records grouped by keys: one array per column, a
+# row per distinct key in key order
+def summarize(keys, records):
+    groups, inverse = numpy.unique(keys, return_inverse=True)
+    size = len(groups)
+    counts = numpy.bincount(inverse, minlength=size)
+    requests = numpy.bincount(inverse, weights=records['requests'], minlength=size)
+    errors = numpy.bincount(inverse, weights=records['errors'], minlength=size)
+    summary = {'key': groups,
+               'tests': counts,
+               'requests': requests,
+               'errors': errors,
+               'error_rate': errors / numpy.maximum(requests, 1),
+               'bytes': numpy.bincount(inverse, weights=records['bytes'], minlength=size),
+               'rps': numpy.bincount(inverse, weights=records['rps'], minlength=size) / numpy.maximum(counts, 1),
+               'mean': numpy.bincount(inverse, weights=records['latency'], minlength=size) / numpy.maximum(counts, 1)}
+
+    # Latencies sorted within each group: the percentile of a group is
+    # an offset from where the group starts. A stable sort by group of
+    # the latency order is much quicker than lexsort
+    latency = numpy.ascontiguousarray(records['latency'])
+    order = latency.argsort()
+    order = order[inverse[order].argsort(kind='mergesort')]
+    ranked = latency[order]
+    starts = numpy.concatenate(([0], numpy.cumsum(counts)[:-1]))
+    for name, pct in PERCENTILES:
+        rank = numpy.ceil(counts * pct / 100.0).astype(numpy.int64) - 1
+        summary[name] = ranked[starts + numpy.clip(rank, 0, counts - 1)]
+    summary['max'] = ranked[starts + counts - 1]
+    return summary
+
+# Records of the run, begun at 'begin', of the streams named, from start
+# to end seconds into the run
+def select(reader, records, begin, streams, start, end):
+    mask = None
+    if streams:
+        ids = [stream for stream in xrange(len(reader.names)) if reader.names[stream] in streams]
+        mask = numpy.in1d(records['stream'], ids)
+    if start or end:
+        times = records['time']
+        window = times >= begin + start
+        if end:
+            window &= times < begin + end
+        if mask is not None:
+            window &= mask
+        mask = window
+    if mask is not None:
+        records = records[mask]
+    return records
+
+def print_table(title, labels, summary):
+    print '%-24s %10s %12s %8s %12s %8s %9s %s %9s' % (title, 'tests', 'requests', 'err %', 'MB', 'rps',
+                                                      'mean ms', ' '.join('%9s' % name for name, pct in PERCENTILES),
+                                                      'max ms')
+    for row in xrange(len(labels)):
+        print '%-24s %10d %12d %8.3f %12.1f %8.1f %9.3f %s %9.3f' % (labels[row], summary['tests'][row], summary['requests'][row],
+                                                                     summary['error_rate'][row] * 100,
+                                                                     summary['bytes'][row] / 1048576.0, summary['rps'][row],
+                                                                     summary['mean'][row],
+                                                                     ' '.join('%9.3f' % summary[name][row] for name, pct in PERCENTILES),
+                                                                     summary['max'][row])
+
+def export(reader, records, directory):
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    order = numpy.argsort(records['stream'], kind='mergesort')
+    ordered = records[order]
+    streams, starts = numpy.unique(ordered['stream'], return_index=True)
+    ends = numpy.append(starts[1:], len(ordered))
+    for stream, first, last in zip(streams, starts, ends):
+        rows = ordered[first:last]
+        FILE = open(os.path.join(directory, reader.stream_name(stream) + '.csv'), 'wb')
+        FILE.write('time,fragment,latency,throughput,requests,errors,bytes\n')
+        numpy.savetxt(FILE, numpy.column_stack((rows['time'], rows['fragment'], rows['latency'], rows['rps'],
+                                                rows['requests'], rows['errors'], rows['bytes'])),
+                      fmt=('%.6f', '%d', '%.3f', '%.2f', '%d', '%d', '%d'), delimiter=',')
+        FILE.close()
+    print 'Exported %d records of %d streams to %s' % (len(ordered), len(streams), directory)
+
+def run(file_name, run_number, window, streams, start, end, directory):
+    started = time.time()
+    reader = ResultReader(file_name)
+    runs = len(reader.runs)
+    if run_number:
+        if not -runs <= run_number <= runs:
+            print '%s has %d runs' % (file_name, runs)
+            return
+        index = run_number
+        if index > 0:
+            index -= 1
+        records, begin = reader.run(index)
+        print 'Run %d of %d, started %s' % (index % runs + 1, runs, time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(begin)))
+    else:
+        records, begin = reader.records, reader.runs[0][1]
+        print 'All %d runs' % runs
+    records = select(reader, records, begin, streams, start, end)
+    if not len(records):
+        print 'No results in %s' % file_name
+        return
+
+    if directory:
+        export(reader, records, directory)
+    else:
+        summary = summarize(records['stream'], records)
+        print_table('stream', [reader.stream_name(stream) for stream in summary['key']], summary)
+        print_table('ALL', ['ALL'], summarize(numpy.zeros(len(records), numpy.uint8), records))
+
+        if window:
+            begin = records['time'].min()
+            print
+            summary = summarize(((records['time'] - begin) // window).astype(numpy.int64), records)
+            print_table('window', [time.strftime('%H:%M:%S', time.localtime(begin + key * window)) for key in summary['key']],
+                        summary)
+
+    print 'Read %d records in %.2f s' % (len(records), time.time() - started)
+    reader.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Summarize a binary fragment result log')
+    parser.add_argument('results', nargs='?', default=settings.results_file, help='result log')
+    parser.add_argument('--run', type=int, default=-1, help='run to summarize, 1 the first, -1 the last, 0 all')
+    parser.add_argument('--window', type=float, default=0, help='also summarize per window of this many seconds')
+    parser.add_argument('--stream', action='append', help='only this stream (repeatable)')
+    parser.add_argument('--start', type=float, default=0, help='skip this many seconds of the run')
+    parser.add_argument('--end', type=float, default=0, help='stop this many seconds into the run')
+    parser.add_argument('--export', metavar='DIR', help='write the records as per-stream CSV files instead')
+    args = parser.parse_args()
+
+    run(args.results, args.run, args.window, args.stream and set(args.stream), args.start, args.end, args.export)
@@ -0,0 +1,78 @@
+'''
+Created on 18 Oct 2026
+
+@author: wallace
+
+Runs a synthetic live HDS origin to benchmark threaded_hds_live.py
+without FMS/Apache. Point settings.server_name at it, e.g.
+
+    synthetic_origin.py --port 8080 --streams 50 --gap-every 20
+    server_name = 'localhost:8080'
+    mlm_url = 'http://' + server_name + '/vod/liveevent1'
+
+With --titles it also serves a VOD catalogue for threaded_hds_vod.py,
+listed one manifest per line in the --catalogue file.
+'''
+
+import sys
+import os
+sys.path.append(os.path.normpath(os.environ['HDS_LT_PATH']))
+import argparse
+import threading
+import time
+from com.adobe.fms.utilities.SyntheticOrigin import LiveStream, VodAsset, SyntheticOrigin, VOD_PATH
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Synthetic live HDS origin')
+    parser.add_argument('--host', default='')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--streams', type=int, default=6, help='number of renditions')
+    parser.add_argument('--prefix', default='livestream', help='rendition names are prefix1, prefix2, ...')
+    parser.add_argument('--bitrates', default='300,500,800,1200,1800,2500', help='kbps, cycled over the renditions')
+    parser.add_argument('--durations', default='4000', help='fragment durations in msec, cycled over the renditions')
+    parser.add_argument('--fragment-size', type=int, default=None, help='payload bytes (default: bitrate x duration)')
+    parser.add_argument('--window', type=int, default=30, help='fragments listed in each bootstrap')
+    parser.add_argument('--gap-every', type=int, default=0, help='skip fragment numbers after every N fragments')
+    parser.add_argument('--gap-size', type=int, default=1, help='fragment numbers skipped per gap')
+    parser.add_argument('--discontinuity-every', type=int, default=0, help='timestamp discontinuity every N fragments')
+    parser.add_argument('--publish-delay', type=int, default=0, help='msec a fragment 404s after it is in the bootstrap')
+    parser.add_argument('--latency', type=float, default=0, help='msec added to every response')
+    parser.add_argument('--jitter', type=float, default=0, help='up to this many msec more')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with a 503')
+    parser.add_argument('--titles', type=int, default=0, help='VOD titles served')
+    parser.add_argument('--title-fragments', type=int, default=900, help='fragments per VOD title')
+    parser.add_argument('--miss-latency', type=float, default=0, help='msec added to the first request of a VOD fragment')
+    parser.add_argument('--catalogue', default=None, help='write the VOD manifest URLs to this file')
+    parser.add_argument('--report', type=float, default=10, help='seconds between request counts')
+    args = parser.parse_args()
+
+    bitrates = [int(b) for b in args.bitrates.split(',')]
+    durations = [int(d) for d in args.durations.split(',')]
+    streams = [LiveStream(args.prefix + str(i + 1), bitrates[i % len(bitrates)], durations[i % len(durations)],
+                          args.fragment_size, args.window, args.gap_every, args.gap_size,
+                          args.discontinuity_every, publish_delay=args.publish_delay)
+               for i in xrange(args.streams)]
+
+    assets = [VodAsset('title%d' % (i + 1), bitrates[i % len(bitrates)], args.title_fragments,
+                       durations[i % len(durations)], args.fragment_size, args.miss_latency)
+              for i in xrange(args.titles)]
+
+    origin = SyntheticOrigin((args.host, args.port), streams, args.latency, args.jitter, args.error_rate, assets)
+    server = threading.Thread(target=origin.serve_forever)
+    server.daemon = True
+    server.start()
+    print 'Serving %d live streams and %d VOD titles on port %d' % (len(streams), len(assets), origin.server_address[1])
+    if args.catalogue:
+        FILE = open(args.catalogue, 'w')
+        for asset in assets:
+            FILE.write('http://localhost:%d%s%s\n' % (origin.server_address[1], VOD_PATH, asset.name))
+        FILE.close()
+
+    try:
+        while True:
+            time.sleep(args.report)
+            print origin.summary()
+    except KeyboardInterrupt:
+        pass
+    origin.shutdown()
+    print origin.summary()
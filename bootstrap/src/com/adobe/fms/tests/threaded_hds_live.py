@@ -11,40 +11,125 @@ import time
 import Queue
 import threading
 import multiprocessing
+import zlib
+import socket
+from urlparse import urlsplit
 from com.adobe.fms.utilities.hds import hds
+from com.adobe.fms.utilities.ManifestReader import ManifestReader
+from com.adobe.fms.utilities.BootstrapParser import BootstrapParseError
+from com.adobe.fms.utilities.BootstrapMerger import BootstrapMerger, BootstrapMergeError
+from com.adobe.fms.utilities.BootstrapWriter import BootstrapWriter
+from com.adobe.fms.utilities.BootstrapCache import BootstrapCache
+from com.adobe.fms.utilities.BootstrapArchive import BootstrapArchive
+from com.adobe.fms.utilities.FragmentTracker import FragmentTracker
 from com.adobe.fms.settings import settings
 from com.adobe.fms.utilities.ApacheBench import ApacheBench
+from com.adobe.fms.utilities.LoadEngine import LoadEngine
+from com.adobe.fms.utilities.OpenLoopEngine import OpenLoopEngine
+from com.adobe.fms.utilities.PollingClient import PollingClient
+from com.adobe.fms.utilities.BatchWriter import BatchWriter
+from com.adobe.fms.utilities.ResultLog import ResultLog
+from com.adobe.fms.utilities.Scheduler import Scheduler
+from com.adobe.fms.utilities.StageQueue import StageQueue
+from com.adobe.fms.utilities.StageTimer import StageTimer
+from com.adobe.fms.utilities.WorkerPool import WorkerPool
+from com.adobe.fms.utilities import SamplingProfiler
+from com.adobe.fms.utilities.Metrics import Metrics, MetricsServer
+from com.adobe.fms.utilities.statistics import LatencyHistogram, LatencyRecorder, HistogramReporter, LatencySnapshots, PERCENTILES
 
 # Number of requests for AB
 num_req = settings.num_req
 # Concurrent requests for AB
 concurrency = settings.concurrency
 
+# Fragment load generator
+LOAD_ENGINE = {'builtin': LoadEngine, 'open': OpenLoopEngine}.get(settings.load_engine, ApacheBench)
+
 # HDS Origin name/port 
 server_name = settings.server_name
 
 # MLM URL
 mlm_url = settings.mlm_url
 
+# Redundant origins whose bootstraps are polled and merged per stream,
+# none to follow server_name's alone
+MERGE_ORIGINS = settings.merge_origins
+
 # Write a plain text version of bootstrap to disk
 WRITE_TO_DISK = settings.WRITE_TO_DISK
 
-#Max thread pool sizes
-MAX_BOOSTRAP_THREAD_COUNT = 120
+# Cross-check the native bootstrap parser with f4fpackager
+CHECK_WITH_PACKAGER = settings.CHECK_WITH_PACKAGER
+
+#Max thread pool sizes. Bootstrap consumers never sleep, so a few
+#of them serve every stream
+MAX_BOOSTRAP_THREAD_COUNT = settings.bootstrap_threads
 MAX_FRAGMENT_THREAD_COUNT = 120
-MAX_LOG_THREAD_COUNT      = 120
 
-class TestConsumer(threading.Thread):
-    
-    def __init__(self, task_queue):        
-        threading.Thread.__init__(self)
-        self.task_queue = task_queue
+# Per-stream latency histograms, merged across the fragment consumers
+latencies = LatencyRecorder()
 
-    def run(self):
-        while True:
-            next_task = self.task_queue.get()
-            next_task()
-        return
+# Keep-alive, revalidating client shared by all bootstrap polls
+bootstrap_client = PollingClient()
+
+# Seconds between bootstrap polls of a stream
+BOOTSTRAP_POLL_INTERVAL = settings.bootstrap_poll_interval
+
+# Adaptive polling: tight polls around the expected time of the next
+# fragment instead of a fixed cadence
+ADAPTIVE_POLLING = settings.adaptive_polling
+POLL_WINDOW = settings.bootstrap_poll_window
+POLL_TIGHT = settings.bootstrap_poll_tight
+
+# Per-stream time from a fragment first appearing in a bootstrap to its
+# first 200, in msec
+availability = LatencyRecorder()
+
+# Per-stream latency from the actual rather than the intended send time,
+# only recorded for an open-loop workload
+raw_latencies = LatencyRecorder()
+
+# Per-stream histograms: recorder name, the file its percentiles are
+# written to and the metric it is served as
+HISTOGRAMS = (('latencies', 'latency_percentiles.csv', 'fragment_latency_ms'),
+              ('raw_latencies', 'latency_raw_percentiles.csv', 'fragment_raw_latency_ms'),
+              ('availability', 'availability_percentiles.csv', 'availability_ms'),
+              ('stages', 'stage_percentiles.csv', 'stage_ms'))
+
+# Time spent in each pipeline stage: bootstrap fetch, parse, merge,
+# archive, disk write and packager check, fragment extraction and
+# scheduling, queue waits and the fragment load test
+stages = StageTimer(settings.stage_timing)
+
+# Threads running the AvailabilityTasks, apart from the fragment queue so
+# a probe neither waits behind load tests nor holds up a consumer
+probes = WorkerPool(settings.availability_threads)
+
+# Live counters and gauges, served by start_metrics()
+metrics = Metrics()
+
+# Timer driving the bootstrap polls and fragment requests of every stream
+scheduler = Scheduler()
+
+# Parsed bootstraps by content, a poll returning the same bytes is not
+# parsed again
+bootstrap_cache = BootstrapCache(settings.bootstrap_cache_entries)
+
+# Archive of every distinct bootstrap, opened by start_pipeline when
+# settings.bootstrap_archive is set
+bootstrap_archive = None
+
+# Bootstrap poll and fragment test queues, created by start_pipeline
+bootstrap_queue = None
+fragment_queue = None
+
+# Time to discovery, primed bootstraps and a first fragment test of
+# every stream, from the start of the run
+startup = None
+
+# Binary log the ResultRecords are packed into, opened by whoever runs
+# the writer (see open_results)
+result_log = None
 
 class TestTask(object):
     
@@ -52,64 +137,182 @@ class TestTask(object):
         self.level  = level
         self.msg    = msg
         
-    def __call__(self):
-        t = time.localtime()
+        self.time   = time.localtime()
+        
+    # Returns the file and line for the BatchWriter
+    def render(self):
+        t = self.time
         h = str(t.tm_hour < 10 and '0' + str(t.tm_hour) or t.tm_hour)
         m = str(t.tm_min < 10 and '0' + str(t.tm_min) or t.tm_min)
         s = str(t.tm_sec < 10 and '0' + str(t.tm_sec) or t.tm_sec)
         output_time = '%s:%s:%s' % (h,m,s)
-        FILE = open(settings.log, "ab")
-        FILE.write('[' + output_time + '][' + self.level + '] ' + self.msg + '\n')
-        FILE.close()
-
-class LogConsumer(threading.Thread):
-    
-    def __init__(self, task_queue):        
-        threading.Thread.__init__(self)
-        self.task_queue = task_queue
-
-    def run(self):
-        while True:
-            next_task = self.task_queue.get()
-            next_task()
-        return
+        return settings.log, '[' + output_time + '][' + self.level + '] ' + self.msg + '\n'
 
 class LogTask(object):
     
-    def __init__(self, stream_name, frag_num, latency, throughput, non200s):
+    def __init__(self, stream_name, frag_num, latency, throughput, non200s, percentiles='', transfer='', schedule=''):
         self.stream_name    = stream_name
         self.frag_num       = frag_num
         self.latency        = latency
         self.throughput     = throughput
         self.non200s        = non200s
+        self.percentiles    = percentiles
+        self.transfer       = transfer
+        self.schedule       = schedule
         
-    def __call__(self):
-        print 'Writing log line for %s-%s' % (self.stream_name, self.frag_num)
-        FILE = open(os.path.normpath(settings.bootstrap_dir + '/'+ self.stream_name + '.csv'), "ab")
-        FILE.write(self.latency + ',' + self.throughput + ',' + self.non200s + '\n')
-        FILE.close()  
+    # Returns the file and line for the BatchWriter
+    def render(self):
+        return (os.path.normpath(settings.bootstrap_dir + '/'+ self.stream_name + '.csv'),
+                self.latency + ',' + self.throughput + ',' + self.non200s + ',' + self.percentiles + ',' + self.transfer + ',' + self.schedule + '\n')
+
+class ResultRecord(object):
+
+    # One fragment test for the binary result log
+    def __init__(self, stream_name, frag_num, latency, throughput, requests, errors, nbytes, when=None):
+        self.stream_name    = stream_name
+        self.frag_num       = frag_num
+        self.latency        = latency
+        self.throughput     = throughput
+        self.requests       = requests
+        self.errors         = errors
+        self.nbytes         = nbytes
+        self.when           = when is None and time.time() or when
+
+    # Returns the file and record for the BatchWriter
+    def render(self):
+        return result_log.file_name, result_log.pack(self.when, self.stream_name, self.frag_num, self.latency,
+                                                     self.throughput, self.requests, self.errors, self.nbytes)
+
+class AvailabilityLog(object):
+
+    # When a fragment was first seen in the bootstrap, first requested and
+    # first served, as time.time() stamps
+    def __init__(self, stream_name, frag_num, frag_dur, seen, first_request, first_200, not_found):
+        self.stream_name    = stream_name
+        self.frag_num       = frag_num
+        self.frag_dur       = frag_dur
+        self.seen           = seen
+        self.first_request  = first_request
+        self.first_200      = first_200
+        self.not_found      = not_found
+
+    # Returns the file and line for the BatchWriter
+    def render(self):
+        served = ',,'
+        if self.first_200 is not None:
+            delay = (self.first_200 - self.seen) * 1000
+            served = '%.6f,%.3f,%.3f' % (self.first_200, delay, self.frag_dur and delay / self.frag_dur or 0)
+        return (os.path.normpath(settings.bootstrap_dir + '/' + self.stream_name + '_availability.csv'),
+                '%s,%d,%.6f,%.6f,%s,%d\n' % (self.frag_num, self.frag_dur, self.seen, self.first_request,
+                                             served, self.not_found))
+
+class StartupTracker(object):
+
+    # Seconds from the start of the run until the streams were discovered,
+    # until every stream's first bootstrap was parsed and scheduled and
+    # until every stream had its first fragment test: the time to steady
+    # state. After that tested() only reads a flag. A stream whose first
+    # bootstrap could not be loaded is counted as failed and not waited
+    # for. The parent of sharded workers takes the times of the last
+    # worker instead (see worker()).
+    def __init__(self, started=None):
+        self.started    = started is None and time.time() or started
+        self.lock       = threading.Lock()
+        self.waiting    = None
+        self.discovery  = None
+        self.primed     = None
+        self.steady     = None
+        self.failed     = 0
+        self.workers    = {}
+
+    # The streams this process tests; a worker keeps the discovery time
+    # of the parent
+    def discovered(self, bootstrap_list):
+        with self.lock:
+            self.waiting = set(item.__getitem__('stream') for item in bootstrap_list)
+            if self.discovery is None:
+                self.discovery = time.time() - self.started
+
+    # A process without streams has nothing to wait for
+    def primed_all(self):
+        self.primed = time.time() - self.started
+        with self.lock:
+            if self.waiting or self.steady is not None:
+                return
+            self.steady = self.primed
+        self.reached_steady()
+
+    def tested(self, stream_name):
+        if self.steady is not None or self.waiting is None:
+            return
+        with self.lock:
+            self.waiting.discard(stream_name)
+            if self.waiting or self.steady is not None:
+                return
+            self.steady = time.time() - self.started
+        self.reached_steady()
+
+    def failed_first_poll(self, stream_name):
+        with self.lock:
+            if self.waiting is None or stream_name not in self.waiting:
+                return
+            self.failed += 1
+        self.tested(stream_name)
+
+    # The (primed, steady, failed) a worker reported, of num_workers. The
+    # run is primed and steady when its last worker is; the workers
+    # count from the parent's start, which they inherit
+    def worker(self, worker_id, primed, steady, failed, num_workers):
+        self.workers[worker_id] = (primed, steady, failed)
+        self.failed = sum(times[2] for times in self.workers.itervalues())
+        if len(self.workers) < num_workers or self.steady is not None:
+            return
+        times = self.workers.values()
+        if self.primed is None and all(primed is not None for primed, steady, failed in times):
+            self.primed = max(primed for primed, steady, failed in times)
+        if all(steady is not None for primed, steady, failed in times):
+            self.steady = max(steady for primed, steady, failed in times)
+            self.reached_steady()
+
+    def reached_steady(self):
+        test_info.put(TestTask('INFO', 'Steady state: every stream tested %s' % self.summary()))
+        print 'Steady state: every stream tested %s' % self.summary()
+
+    def summary(self):
+        summary = ', '.join('%s %s' % (name, value is None and '-' or '%.1f s' % value)
+                            for name, value in (('discovery', self.discovery), ('primed', self.primed),
+                                                ('steady', self.steady)))
+        if self.failed:
+            summary += ', %d streams failed their first poll' % self.failed
+        return summary
 
 class FragmentConsumer(threading.Thread):
     
-    def __init__(self, task_queue, result_queue, logging_queue):
+    def __init__(self, task_queue, logging_queue):
         threading.Thread.__init__(self)
         self.task_queue = task_queue
-        self.result_queue = result_queue
         self.logging_queue = logging_queue
         
     def run(self):
         while True:
             
             next_task = self.task_queue.get()
-            answer = next_task()
+            with stages.span('fragment_task'):
+                answer = next_task()
             if answer is not None:
-                self.logging_queue.put(LogTask(answer.__getitem__('name'), answer.__getitem__('fragment'), answer.__getitem__('latency'), answer.__getitem__('throughput'), answer.__getitem__('non200')))
-                self.result_queue.put(answer)
+                record_answer(answer, self.logging_queue)
         return
 
+# Logs the answer of a fragment test
+def record_answer(answer, logging_queue):
+    startup.tested(answer.__getitem__('name'))
+    logging_queue.put(answer.__getitem__('record'))
+    if settings.results_csv:
+        logging_queue.put(LogTask(answer.__getitem__('name'), answer.__getitem__('fragment'), answer.__getitem__('latency'), answer.__getitem__('throughput'), answer.__getitem__('non200'), answer.__getitem__('percentiles'), answer.__getitem__('transfer'), answer.__getitem__('schedule')))
+
 class FragmentTask(object):
     
-    def __init__(self, frag_num, frag_dur, num_req, concurrency, stream_url, stream_name, frag_list, discontinuity):
+    def __init__(self, frag_num, frag_dur, num_req, concurrency, stream_url, stream_name, frag_list, discontinuity, due=None):
         self.frag_num       = frag_num
         self.frag_dur       = frag_dur
         self.stream_url     = stream_url
@@ -118,6 +321,7 @@ class FragmentTask(object):
         self.concurrency    = concurrency
         self.frag_list      = frag_list
         self.discontinuity  = discontinuity
+        self.due            = due
         self.result         = []
         
     def __call__(self):
@@ -125,60 +329,214 @@ class FragmentTask(object):
         if self.frag_dur != 0:
             test_info.put(TestTask('INFO', ('Load testing %s-%s with duration of %s msec' % (self.stream_name, self.frag_num, self.frag_dur))))
             print 'Load testing %s-%s with duration of %s msec' % (self.stream_name, self.frag_num, self.frag_dur)
-            self.result = ApacheBench.run(self.frag_num, self.frag_dur, self.num_req, self.concurrency, self.stream_url)
-            return {'name': self.stream_name,
-                    'latency': str(ApacheBench.get_latency(self.result)),
-                    'throughput': str(ApacheBench.get_requests_per_second(self.result)),
-                    'non200': str(ApacheBench.get_non_2xx_responses(self.result)),
-                    'fragment':str(self.frag_num)}
+            started = time.time()
+            if LOAD_ENGINE is OpenLoopEngine:
+                # The scheduler releases the requests, the answer is
+                # logged once the last has been answered
+                OpenLoopEngine.start(self.frag_num, self.frag_dur, self.stream_url, self.due, scheduler,
+                                     lambda result: self.finished(result, started))
+                return
+            with stages.span('load_test'):
+                self.result = LOAD_ENGINE.run(self.frag_num, self.frag_dur, self.num_req, self.concurrency, self.stream_url,
+                                              self.due)
+            return self.report(started)
         else:
             return                 
 
+    def finished(self, result, started):
+        self.result = result
+        stages.record('load_test', (time.time() - started) * 1000)
+        record_answer(self.report(started), test_info)
+
+    # Records the result of the test begun at 'started' and returns the
+    # answer the FragmentConsumer logs
+    def report(self, started):
+        # Fragment latency distribution, merged into the stream totals
+        histogram = LatencyHistogram()
+        for latency in LOAD_ENGINE.get_latencies(self.result):
+            histogram.record(latency)
+        latencies.record_histogram(self.stream_name, histogram)
+        summary = histogram.summary()
+
+        requests = LOAD_ENGINE.get_total_requests(self.result)
+        metrics.inc('fragment_tests', self.stream_name)
+        metrics.inc('fragment_requests', self.stream_name, requests)
+        metrics.inc('fragment_failures', self.stream_name, LOAD_ENGINE.get_failed_requests(self.result))
+        metrics.inc('fragment_non2xx', self.stream_name, LOAD_ENGINE.get_non_2xx_responses(self.result))
+        metrics.inc('fragment_bytes', self.stream_name, LOAD_ENGINE.get_total_bytes(self.result))
+
+        # Open loop: requests that went out behind schedule and the
+        # latency from the actual send time (blank when closed loop)
+        schedule = ',,'
+        late = LOAD_ENGINE.get_late_requests(self.result)
+        if late is not None:
+            raw = LatencyHistogram()
+            for latency in LOAD_ENGINE.get_raw_latencies(self.result):
+                raw.record(latency)
+            raw_latencies.record_histogram(self.stream_name, raw)
+            metrics.inc('fragment_late', self.stream_name, late)
+            schedule = '%d,%.3f,%.3f' % (late, raw.percentile(50), raw.percentile(99))
+            if late:
+                test_info.put(TestTask('INFO', ('%s-%s: %d of %d requests behind schedule'
+                                                % (self.stream_name, self.frag_num, late, len(self.result['status'])))))
+
+        # Time to first byte, body bytes/sec and fragments that failed
+        # validation (blank when the engine does not validate)
+        invalid = LOAD_ENGINE.get_validation_failures(self.result)
+        if invalid:
+            metrics.inc('fragment_invalid', self.stream_name, invalid)
+            test_info.put(TestTask('ERROR', ('%s-%s: %d invalid fragment responses: %s'
+                                             % (self.stream_name, self.frag_num, invalid,
+                                                '; '.join(LOAD_ENGINE.get_validation_errors(self.result))))))
+
+        record = ResultRecord(self.stream_name, self.frag_num, LOAD_ENGINE.get_latency(self.result),
+                              LOAD_ENGINE.get_requests_per_second(self.result), requests,
+                              LOAD_ENGINE.get_failed_requests(self.result) + LOAD_ENGINE.get_non_2xx_responses(self.result),
+                              LOAD_ENGINE.get_total_bytes(self.result), started)
+
+        return {'name': self.stream_name,
+                'record': record,
+                'percentiles': ','.join('%.3f' % summary[name] for name, pct in PERCENTILES) + ',%.3f' % summary['max'],
+                'transfer': '%.3f,%.0f,%s' % (LOAD_ENGINE.get_ttfb(self.result), LOAD_ENGINE.get_transfer_rate(self.result),
+                                              invalid is None and '' or str(invalid)),
+                'latency': str(LOAD_ENGINE.get_latency(self.result)),
+                'throughput': str(LOAD_ENGINE.get_requests_per_second(self.result)),
+                'non200': str(LOAD_ENGINE.get_non_2xx_responses(self.result)),
+                'schedule': schedule,
+                'fragment':str(self.frag_num)}
+
+class AvailabilityTask(object):
+
+    # Requests a fragment that has just appeared in the bootstrap until the
+    # origin serves it, and records how long that took
+    def __init__(self, frag_num, frag_dur, stream_url, stream_name, seen):
+        self.frag_num       = frag_num
+        self.frag_dur       = frag_dur
+        self.stream_url     = stream_url
+        self.stream_name    = stream_name
+        self.seen           = seen
+
+    def __call__(self):
+        pool = LoadEngine.get_pool(self.stream_url, 1)
+        path = urlsplit(self.stream_url).path
+        deadline = self.seen + max(self.frag_dur * 2 / 1000.0, 1)
+        first_request, first_200, not_found, status = LoadEngine.first_available(pool, path, deadline,
+                                                                                 settings.availability_retry)
+        metrics.inc('availability_probes', self.stream_name)
+        metrics.inc('availability_not_found', self.stream_name, not_found)
+        if first_200 is not None:
+            availability.record(self.stream_name, (first_200 - self.seen) * 1000)
+        else:
+            metrics.inc('availability_timeouts', self.stream_name)
+            test_info.put(TestTask('ERROR', ('%s-%s was not served within %.1f s of appearing in the bootstrap (status %d, %d 404s)'
+                                             % (self.stream_name, self.frag_num, deadline - self.seen, status, not_found))))
+        test_info.put(AvailabilityLog(self.stream_name, self.frag_num, self.frag_dur, self.seen,
+                                      first_request, first_200, not_found))
+
 class BootstrapConsumer(threading.Thread):
     
-    def __init__(self, task_queue, result_queue, fragment_queue):
+    def __init__(self, task_queue, fragment_queue):
         threading.Thread.__init__(self)
         self.task_queue     = task_queue
-        self.result_queue   = result_queue
         self.fragment_queue = fragment_queue
         
     def run(self):
         while True:
             next_task = self.task_queue.get()
                         
-            answer = next_task()
+            with stages.span('bootstrap_task'):
+                answer = next_task()
             if answer is not None:
-                seg       = answer.__getitem__('segment')   
-                dur       = answer.__getitem__('duration')
-                frag      = answer.__getitem__('number')
-                name      = answer.__getitem__('name')
-                url       = answer.__getitem__('stream_url')
-                frag_list = answer.__getitem__('frag_list')
-                
-                # Loop through current fragment list and add un-pulled, continuous fragments to 
-                for frags in frag_list:
-                    if frags.__getitem__('pulled') is False:
-                        self.fragment_queue.put(FragmentTask(frags.__getitem__('fragment'),
-                                                             frags.__getitem__('duration'),
-                                                             num_req, concurrency,
-                                                             url + 'Seg' + str(frags.__getitem__('segment')).replace(' ', '') + '-Frag' + str(frags.__getitem__('fragment')),
-                                                             name, frag_list, int(frags.__getitem__('discontinuity'))))
-                        frags.update({'pulled': True})                        
-                        time.sleep((int(frags.__getitem__('duration'))/1000) < 2 and 1 or (int(frags.__getitem__('duration'))/1000)-0.5)
-
-                #Sleep before pulling updated bootstrap
-                time.sleep(1)
-                self.task_queue.put(BootstrapTask(url, name, dur, frag_list))                
-                self.result_queue.put(answer)
+                self.schedule(next_task, answer)
         return
 
+    # Starts measuring availability of a new fragment, schedules the
+    # stream's pending fragments and its next bootstrap poll
+    def schedule(self, next_task, answer):
+        seg       = answer.__getitem__('segment')   
+        dur       = answer.__getitem__('duration')
+        frag      = answer.__getitem__('number')
+        name      = answer.__getitem__('name')
+        url       = answer.__getitem__('stream_url')
+        frag_list = answer.__getitem__('frag_list')
+        
+        now = time.time()
+
+        # A new fragment at the live edge: remember when it was
+        # seen and measure how soon the origin serves it
+        edge, edge_at = next_task.edge, next_task.edge_at
+        if next_task.changed:
+            if edge is not None and frag > edge:
+                # The poll before this one did not have it yet, the
+                # fragment appeared after that
+                edge_at = next_task.last_polled or next_task.polled
+                if settings.measure_availability:
+                    probes.submit(AvailabilityTask(frag, int(dur),
+                                                   url + 'Seg' + str(seg) + '-Frag' + str(frag),
+                                                   name, next_task.polled))
+            elif frag != edge:
+                # First bootstrap of the stream, or a restart
+                edge_at = next_task.polled
+            edge = frag
+
+        # Schedule the un-pulled fragments, in order, spaced a little
+        # under their duration so a backlog drains ahead of the edge
+        fragment_at = max(next_task.fragment_at, now)
+        for frags in frag_list.take_pending():
+            scheduler.call_at(fragment_at, self.fragment_queue.put,
+                              FragmentTask(frags.__getitem__('fragment'),
+                                           frags.__getitem__('duration'),
+                                           num_req, concurrency,
+                                           url + 'Seg' + str(frags.__getitem__('segment')) + '-Frag' + str(frags.__getitem__('fragment')),
+                                           name, frag_list, int(frags.__getitem__('discontinuity')),
+                                           fragment_at))
+            fragment_at += (int(frags.__getitem__('duration'))/1000) < 2 and 1 or (int(frags.__getitem__('duration'))/1000.0)-0.5
+
+        # Next bootstrap poll on a fixed cadence from the last
+        # deadline, at least twice per fragment duration. If the
+        # schedule has fallen a whole interval behind, restart it
+        interval = BOOTSTRAP_POLL_INTERVAL
+        if dur:
+            interval = min(interval, dur / 2000.0)
+        poll_at = next_task.poll_at + interval
+        if poll_at < now - interval:
+            poll_at = now
+        if ADAPTIVE_POLLING and dur and edge_at:
+            # Sleep until just before the next fragment is due, then
+            # poll tightly until it shows up. A stream a whole
+            # duration overdue goes back to the fixed cadence
+            expected = edge_at + dur / 1000.0
+            if now < expected - POLL_WINDOW:
+                poll_at = min(expected - POLL_WINDOW, now + BOOTSTRAP_POLL_INTERVAL)
+            elif now < expected + dur / 1000.0:
+                poll_at = now + POLL_TIGHT
+        scheduler.call_at(poll_at, self.task_queue.put, BootstrapTask(url, name, dur, frag_list, poll_at, fragment_at,
+                                                                      edge, edge_at, next_task.polled, next_task.merger))
+        stages.record('bootstrap_schedule', (time.time() - now) * 1000)
+
 class BootstrapTask(object):
     
-    def __init__(self, baseURL, stream_name, duration, frag_list):
+    def __init__(self, baseURL, stream_name, duration, frag_list, poll_at=None, fragment_at=0, edge=None, edge_at=None, last_polled=None,
+                 merger=None):
         self.baseURL = baseURL
         self.stream_name = stream_name
         self.duration    = duration
         self.frag_list  = frag_list
+        # Deadline this poll was scheduled for and the earliest time the
+        # next fragment may be requested
+        self.poll_at     = poll_at is None and time.time() or poll_at
+        self.fragment_at = fragment_at
+        # The newest fragment so far and when it is believed to have
+        # appeared, and when the previous and this poll's bootstraps came
+        # back
+        self.edge        = edge
+        self.edge_at     = edge_at
+        self.last_polled = last_polled
+        self.polled      = None
+        self.changed     = False
+        # The stream's BootstrapMerger when its bootstrap is polled from
+        # every MERGE_ORIGINS server
+        self.merger      = merger
 
         self.bootstrap_url   = 'http://' + server_name + '/hds-live/streams/livepkgr/streams/_definst_/' + stream_name + '/' + stream_name
         self.stream_url      = 'http://' + server_name + '/hds-live/streams/livepkgr/streams/_definst_/' + stream_name + '/' + stream_name        
@@ -186,128 +544,586 @@ class BootstrapTask(object):
         self.fragment_num = 0
         self.fragment_dur = 0
         
-    def __call__(self):
-        
-        # Request the bootstrap 
-        b_req = hds.request_live_bootstrap(self.bootstrap_url)
-        
-        if b_req is not False:    
-            # Write bootstrap to disk
-            hds.write_bootstrap_to_file(settings.bootstrap_dir, self.stream_name, b_req)
-                
-            # Extract fragment durations
-            fragment = hds.extract_fragments(self.stream_name,
-                                                hds.convert_manifest(settings.packager,
-                                                                    settings.bootstrap_dir,
-                                                                    self.stream_name, WRITE_TO_DISK),
-                                                                    self.frag_list, True)
-            self.segment_num  = fragment[0][0]
-            self.fragment_num = fragment[0][1]
-            self.fragment_dur = fragment[0][2]
-            self.frag_list    = fragment[0][3]
-            discontinuity     = fragment[0][4]
-            
+    # Answer for a bootstrap that has not changed: the newest fragment
+    # already tracked, or None if nothing is tracked yet
+    def unchanged(self):
+        last = self.frag_list.get(self.frag_list.last_fragment)
+        if last is not None:
             return {'name': self.stream_name,
-                    'number': fragment[0][1],
-                    'segment': fragment[0][0],
-                    'duration': fragment[0][2],
+                    'number': last.__getitem__('fragment'),
+                    'segment': last.__getitem__('segment'),
+                    'duration': last.__getitem__('duration'),
                     'stream_url':self.stream_url,
                     'frag_list':  self.frag_list,
-                    'discontinuity': discontinuity}
-        else:
+                    'discontinuity': 0}
+        return None
+        
+    # Fetches and parses the bootstrap. Returns (bootstrap, new, data),
+    # False when it has not changed and a fragment is already tracked, or
+    # None if it could not be loaded
+    def poll(self):
+        with stages.span('bootstrap_fetch'):
+            b_req = hds.poll_live_bootstrap(bootstrap_client, self.bootstrap_url)
+        self.polled = time.time()
+        metrics.inc('bootstrap_polls', self.stream_name)
+
+        if b_req is None:
+            # Unchanged since the last poll, nothing new to parse
+            if self.unchanged() is not None:
+                return False
+            bootstrap_client.forget(self.bootstrap_url + '.bootstrap')
+            with stages.span('bootstrap_fetch'):
+                b_req = hds.poll_live_bootstrap(bootstrap_client, self.bootstrap_url)
+            self.polled = time.time()
+
+        if not b_req:
+            metrics.inc('bootstrap_errors', self.stream_name)
             test_info.put(TestTask('ERROR', ('Bootstrap for %s could not be loaded. Verify %s.bootstrap to ensure it can be reached.' % (self.stream_name, self.bootstrap_url))))
             print ('Bootstrap for %s could not be loaded. Verify %s.bootstrap to ensure it can be reached.' % (self.stream_name, self.bootstrap_url))
-            
+            return None
+
+        # Parse the bootstrap in-process, or reuse the parse of the
+        # same bytes
+        try:
+            with stages.span('bootstrap_parse'):
+                bootstrap, new = bootstrap_cache.parse(self.stream_name, b_req)
+        except BootstrapParseError, error:
+            metrics.inc('bootstrap_errors', self.stream_name)
+            test_info.put(TestTask('ERROR', ('Bootstrap for %s could not be parsed: %s' % (self.stream_name, error))))
+            print ('Bootstrap for %s could not be parsed: %s' % (self.stream_name, error))
+            return None
+        if new is True:
+            metrics.inc('bootstrap_bytes', self.stream_name, len(b_req))
+        return bootstrap, new, b_req
+
+    # As poll(), for the bootstrap of every merge origin: the changed
+    # ones are folded into the stream's merger and the merged timeline
+    # returned. An origin that cannot be loaded or does not merge is left
+    # out of this poll, the data is only written out when asked for
+    def poll_origins(self):
+        loaded = new = False
+        for origin in MERGE_ORIGINS:
+            url = 'http://' + origin + '/hds-live/streams/livepkgr/streams/_definst_/' + self.stream_name + '/' + self.stream_name
+            with stages.span('bootstrap_fetch'):
+                b_req = hds.poll_live_bootstrap(bootstrap_client, url)
+            metrics.inc('bootstrap_polls', self.stream_name)
+            if b_req is None and origin not in self.merger.sources:
+                bootstrap_client.forget(url + '.bootstrap')
+                with stages.span('bootstrap_fetch'):
+                    b_req = hds.poll_live_bootstrap(bootstrap_client, url)
+            if b_req is None:
+                loaded = True
+                continue
+            if not b_req:
+                metrics.inc('bootstrap_errors', self.stream_name)
+                test_info.put(TestTask('ERROR', ('Bootstrap for %s could not be loaded from %s' % (self.stream_name, origin))))
+                continue
+            try:
+                with stages.span('bootstrap_parse'):
+                    bootstrap, changed = bootstrap_cache.parse(self.stream_name + '@' + origin, b_req)
+                if changed is True:
+                    metrics.inc('bootstrap_bytes', self.stream_name, len(b_req))
+                    with stages.span('bootstrap_merge'):
+                        self.merger.add(origin, bootstrap)
+            except BootstrapParseError, error:
+                metrics.inc('bootstrap_errors', self.stream_name)
+                test_info.put(TestTask('ERROR', ('Bootstrap for %s from %s could not be parsed: %s' % (self.stream_name, origin, error))))
+                continue
+            except BootstrapMergeError, error:
+                metrics.inc('bootstrap_merge_errors', self.stream_name)
+                test_info.put(TestTask('ERROR', ('Bootstrap for %s from %s does not merge: %s' % (self.stream_name, origin, error))))
+                continue
+            loaded = True
+            new = new or changed
+        self.polled = time.time()
+
+        if not loaded or self.merger.union is None:
+            print ('Bootstrap for %s could not be loaded from any of %s' % (self.stream_name, ', '.join(MERGE_ORIGINS)))
+            return None
+        if not new and self.unchanged() is not None:
+            return False
+        with stages.span('bootstrap_merge'):
+            return self.merger.timeline(), True, None
+
+    def __call__(self):
+        if self.merger is not None:
+            polled = self.poll_origins()
+        else:
+            polled = self.poll()
+        if polled is None:
             return
+        if polled is False:
+            return self.unchanged()
 
-if __name__ == '__main__':
-    
-    # Establish communication queues
-    fragments           = Queue.Queue()
-    bootstraps          = Queue.Queue()
-    bootstrap_results   = Queue.Queue()
-    fragment_results    = Queue.Queue()
-    logs_to_write       = Queue.Queue()
-    test_info           = Queue.Queue()
+        bootstrap, new, b_req = polled
+        if new is False:
+            answer = self.unchanged()
+            if answer is not None:
+                return answer
+
+        if new is True:
+            metrics.inc('bootstraps_changed', self.stream_name)
+
+        if new is True and b_req is None and (bootstrap_archive is not None or WRITE_TO_DISK is True or CHECK_WITH_PACKAGER is True):
+            # The merged timeline is archived and checked as a bootstrap
+            with stages.span('bootstrap_merge'):
+                b_req = BootstrapWriter.write(bootstrap)
+
+        if new is True and bootstrap_archive is not None:
+            with stages.span('bootstrap_archive'):
+                bootstrap_archive.append(self.stream_name, b_req)
+
+        if new is True and (WRITE_TO_DISK is True or CHECK_WITH_PACKAGER is True):
+            # Write bootstrap to disk
+            with stages.span('bootstrap_write'):
+                hds.write_bootstrap_to_file(settings.bootstrap_dir, self.stream_name, b_req)
+
+        if new is True and CHECK_WITH_PACKAGER is True:
+            # Cross-check the native parser against f4fpackager
+            with stages.span('packager'):
+                inspected = hds.parse_inspect_output(hds.convert_manifest(settings.packager,
+                                                                          settings.bootstrap_dir,
+                                                                          self.stream_name, WRITE_TO_DISK))
+            if hds.compare_run_tables(bootstrap, inspected) is False:
+                test_info.put(TestTask('ERROR', ('Bootstrap for %s does not match the f4fpackager output' % self.stream_name)))
+
+        # Extract fragment durations
+        with stages.span('extract_fragments'):
+            fragment = hds.extract_fragments(self.stream_name, bootstrap, self.frag_list, True)
+        self.changed      = True
+        self.segment_num  = fragment[0][0]
+        self.fragment_num = fragment[0][1]
+        self.fragment_dur = fragment[0][2]
+        self.frag_list    = fragment[0][3]
+        discontinuity     = fragment[0][4]
+
+        return {'name': self.stream_name,
+                'number': fragment[0][1],
+                'segment': fragment[0][0],
+                'duration': fragment[0][2],
+                'stream_url':self.stream_url,
+                'frag_list':  self.frag_list,
+                'discontinuity': discontinuity}
+
+# Build the stream list from the live multi-level manifest. Media
+# entries are read as they are parsed, the manifest is never held as a DOM
+def discover_streams(m_req):
+    reader = ManifestReader(m_req)
+    bootstrap_list = []
+    for media in reader.media():
+        if media.href:
+            stream_name = media.href.split('.')
+            bootstrap_list.append({'base' : reader.base_url, 'stream' : stream_name[0]})
+    return bootstrap_list
+
+# Fetch and parse several multi-level manifests at once on 'threads'
+# threads. Returns the streams of every event in list order, a stream
+# listed by more than one event only once
+def discover_events(urls, threads):
+    events = [None] * len(urls)
+    jobs = Queue.Queue()
+    for position, url in enumerate(urls):
+        jobs.put((position, url))
+
+    def loader():
+        while True:
+            try:
+                position, url = jobs.get_nowait()
+            except Queue.Empty:
+                return
+            m_req = hds.request_manifest(url)
+            if m_req is False:
+                test_info.put(TestTask('ERROR', ('Multi-level Manifest could not be loaded. Verify %s.f4m to ensure it can be reached.' % url)))
+                print ('Multi-level Manifest could not be loaded. Verify %s.f4m to ensure it can be reached.' % url)
+                continue
+            events[position] = discover_streams(m_req)
+
+    loaders = [threading.Thread(target=loader) for i in xrange(max(min(threads, len(urls)), 1))]
+    for loader_thread in loaders:
+        loader_thread.start()
+    for loader_thread in loaders:
+        loader_thread.join()
+
+    bootstrap_list = []
+    seen = set()
+    for url, streams in zip(urls, events):
+        repeated = []
+        for item in streams or ():
+            if item.__getitem__('stream') in seen:
+                repeated.append(item.__getitem__('stream'))
+                continue
+            seen.add(item.__getitem__('stream'))
+            item['event'] = url
+            bootstrap_list.append(item)
+        if repeated:
+            test_info.put(TestTask('ERROR', ('%s lists streams already tested for another event: %s' % (url, ', '.join(repeated)))))
+    return bootstrap_list
+
+# The MLMs to load test: settings.mlm_urls and the URLs listed in
+# settings.mlm_list, one per line, or else settings.mlm_url alone
+def event_urls():
+    urls = list(settings.mlm_urls)
+    if settings.mlm_list:
+        FILE = open(settings.mlm_list, 'r')
+        for line in FILE:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                urls.append(line)
+        FILE.close()
+    return urls or [mlm_url]
+
+# Stable stream to worker assignment: a stream always lands on the same
+# worker for a given worker count, whatever order the MLM lists it in
+def shard_streams(bootstrap_list, num_workers):
+    shards = [[] for i in xrange(num_workers)]
+    for item in bootstrap_list:
+        shards[(zlib.crc32(item.__getitem__('stream')) & 0xffffffff) % num_workers].append(item)
+    return shards
+
+# Start the bootstrap/fragment pipeline for a list of streams. Log and
+# result records go to log_sink, anything with a put() method. Distinct
+# bootstraps are appended to the archive archive_name if given
+def start_pipeline(bootstrap_list, log_sink, archive_name=None):
+    global test_info, bootstrap_archive, bootstrap_queue, fragment_queue
+
+    # Establish communication queues. Every stream has one bootstrap poll
+    # in flight, which schedules the next, so polls are never dropped
+    fragments           = StageQueue(settings.fragment_queue_size, settings.fragment_queue_policy,
+                                     lambda task: task.stream_name, settings.fragment_max_lag,
+                                     lambda msec: stages.record('fragment_queue_wait', msec))
+    bootstraps          = StageQueue(max(settings.bootstrap_queue_size, len(bootstrap_list)),
+                                     timing=lambda msec: stages.record('bootstrap_queue_wait', msec))
+    bootstrap_queue     = bootstraps
+    fragment_queue      = fragments
+    test_info           = log_sink
+
+    if archive_name:
+        bootstrap_archive = BootstrapArchive(archive_name)
+
+    scheduler.start()
+    register_metrics(bootstraps, fragments, log_sink)
+
+    global startup
+    if startup is None:
+        startup = StartupTracker()
+    startup.discovered(bootstrap_list)
+
+    # Spawn consumer threads
+    bootstrap_num_consumers = (len(bootstrap_list) > MAX_BOOSTRAP_THREAD_COUNT) and MAX_BOOSTRAP_THREAD_COUNT or len(bootstrap_list) 
+    fragment_num_consumers  = (len(bootstrap_list) > MAX_FRAGMENT_THREAD_COUNT) and MAX_FRAGMENT_THREAD_COUNT or len(bootstrap_list)
     
-    # Request the live multi-level manifest
-    m_req = hds.request_manifest(mlm_url)
+    test_info.put(TestTask('INFO', ('Creating Bootstrap %d consumers' % bootstrap_num_consumers)))    
+    print ('Creating Bootstrap %d consumers' % bootstrap_num_consumers)
+    bootstrap_consumers = [ BootstrapConsumer(bootstraps, fragments)
+                  for i in xrange(bootstrap_num_consumers) ]
+                  
+    test_info.put(TestTask('INFO', ('Creating Fragment %d consumers' % fragment_num_consumers)))
+    print ('Creating Fragment %d consumers' % fragment_num_consumers)
+    fragment_consumers = [ FragmentConsumer(fragments, log_sink)
+                  for i in xrange(fragment_num_consumers) ]
     
-    #Start logging thread
-    test_info_num_consumers = 1
-    test_info.put(TestTask('INFO', ('Creating Internal log %d consumers' % test_info_num_consumers)))
-    print ('Creating Internal log %d consumers' % test_info_num_consumers)
-    test_info_consumers = [ TestConsumer(test_info)
-                      for i in xrange(test_info_num_consumers) ]
+    # Consumers do not hold the process open, shutdown goes through
+    # the writer flush
+    for w in bootstrap_consumers:
+        w.daemon = True
+        w.start()
+        
+    for w in fragment_consumers:
+        w.daemon = True
+        w.start()
+
+    if bootstrap_list:
+        prime(bootstrap_list, bootstrap_consumers[0])
+    else:
+        test_info.put(TestTask('INFO', 'No streams to test'))
+        print 'No streams to test'
+        startup.primed_all()
+
+# Poll the first bootstrap of every stream on settings.prime_threads
+# threads rather than through the few bootstrap consumers, and schedule
+# each stream as its consumer would. A stream whose first poll fails is
+# not waited for and is polled again by the consumers a poll interval
+# later. Returns once all are done
+def prime(bootstrap_list, consumer):
+    started = time.time()
+    tasks = Queue.Queue()
+    for item in bootstrap_list:
+        frag_list = FragmentTracker(settings.fragment_retention)
+        merger = MERGE_ORIGINS and BootstrapMerger(live=True) or None
+        tasks.put(BootstrapTask(item.__getitem__('base'), item.__getitem__('stream'), 0.1, frag_list, merger=merger))
+
+    def primer():
+        while True:
+            try:
+                task = tasks.get_nowait()
+            except Queue.Empty:
+                return
+            with stages.span('bootstrap_task'):
+                answer = task()
+            if answer is not None:
+                consumer.schedule(task, answer)
+            else:
+                startup.failed_first_poll(task.stream_name)
+                scheduler.call_later(BOOTSTRAP_POLL_INTERVAL, consumer.task_queue.put, task)
+
+    primers = [threading.Thread(target=primer) for i in xrange(max(min(settings.prime_threads, len(bootstrap_list)), 1))]
+    for primer_thread in primers:
+        primer_thread.daemon = True
+        primer_thread.start()
+    for primer_thread in primers:
+        primer_thread.join()
+    startup.primed_all()
+    test_info.put(TestTask('INFO', ('Primed %d streams in %.1f s (%s)' % (len(bootstrap_list), time.time() - started, startup.summary()))))
+    print ('Primed %d streams in %.1f s (%s)' % (len(bootstrap_list), time.time() - started, startup.summary()))
+
+# Queue depths, schedule lag and the shared clients, read on scrape
+def register_metrics(bootstraps, fragments, log_sink):
+    metrics.register('bootstrap_queue_depth', 'gauge', bootstraps.qsize)
+    metrics.register('fragment_queue_depth', 'gauge', fragments.qsize)
+    metrics.register('fragment_queue_dropped', 'counter', lambda: fragments.dropped)
+    metrics.register('fragment_queue_shed', 'counter', lambda: fragments.shed)
+    metrics.register('fragment_queue_blocked', 'counter', lambda: fragments.blocked)
+    metrics.register('bootstrap_queue_blocked', 'counter', lambda: bootstraps.blocked)
+    if isinstance(log_sink, BatchWriter):
+        metrics.register('writer_queue_depth', 'gauge', log_sink.qsize)
+        metrics.register('log_records_dropped', 'counter', lambda: log_sink.dropped)
+    metrics.register('availability_pending', 'gauge', lambda: probes.pending)
+    metrics.register('scheduler_pending', 'gauge', lambda: len(scheduler))
+    metrics.register('scheduler_errors', 'counter', lambda: scheduler.errors)
+    metrics.register('scheduler_lag_p99_ms', 'gauge', lambda: scheduler.lag.copy().percentile(99))
+    metrics.register('scheduler_lag_max_ms', 'gauge', lambda: scheduler.lag.max / 1000.0)
+    metrics.register('bootstrap_not_modified', 'counter', lambda: bootstrap_client.not_modified)
+    metrics.register('bootstrap_cache_hits', 'counter', lambda: bootstrap_cache.hits)
+    metrics.register('bootstrap_cache_misses', 'counter', lambda: bootstrap_cache.misses)
+    register_startup_metrics()
+
+def register_startup_metrics():
+    metrics.register('startup_discovery_seconds', 'gauge', lambda: startup.discovery or 0)
+    metrics.register('startup_primed_seconds', 'gauge', lambda: startup.primed or 0)
+    metrics.register('startup_steady_seconds', 'gauge', lambda: startup.steady or 0)
+    metrics.register('startup_failed_streams', 'gauge', lambda: startup.failed)
+
+# This process's histograms by HISTOGRAMS name
+def histogram_recorders():
+    recorders = {'latencies': latencies, 'availability': availability}
+    if settings.stage_timing:
+        recorders['stages'] = stages
+    if LOAD_ENGINE is OpenLoopEngine:
+        recorders['raw_latencies'] = raw_latencies
+    return recorders
+
+def histogram_snapshots():
+    return dict((name, recorder.snapshot()[0]) for name, recorder in histogram_recorders().iteritems())
+
+# Write the percentiles of each recorder (a LatencyRecorder or
+# LatencySnapshots by HISTOGRAMS name) to its file on a timer, and serve
+# them as metric summaries. Returns the reporters, to be stopped at the end
+def report_histograms(recorders):
+    reporters = []
+    for name, file_name, metric in HISTOGRAMS:
+        recorder = recorders.get(name)
+        if recorder is None:
+            continue
+        reporter = HistogramReporter(recorder, os.path.normpath(settings.bootstrap_dir + '/' + file_name),
+                                     settings.histogram_interval)
+        reporter.start()
+        reporters.append(reporter)
+        metrics.register(metric, 'summary', lambda recorder=recorder: recorder.snapshot()[0])
+    return reporters
+
+# Serve the metrics on settings.metrics_port, if set. Returns the server
+# or None
+def start_metrics():
+    if not settings.metrics_port:
+        return None
+    try:
+        server = MetricsServer(metrics, (settings.metrics_address, settings.metrics_port)).start()
+    except socket.error, error:
+        test_info.put(TestTask('ERROR', ('Metrics endpoint could not be started on port %d: %s' % (settings.metrics_port, error))))
+        print ('Metrics endpoint could not be started on port %d: %s' % (settings.metrics_port, error))
+        return None
+    print ('Metrics on http://%s:%d/metrics and /metrics.json' % (settings.metrics_address, settings.metrics_port))
+    return server
+
+# Sample the stacks of every thread for settings.profile_seconds when
+# the process gets SIGUSR2, and right away with settings.profile_at_start.
+# Must be called from the main thread
+def start_profiler():
+    directory = os.path.dirname(settings.log) or '.'
+    if settings.profile_signal:
+        SamplingProfiler.install(directory, settings.profile_seconds, settings.profile_interval)
+    if settings.profile_at_start:
+        SamplingProfiler.capture(directory, settings.profile_seconds, settings.profile_interval)
+
+# Wait a number of seconds while the pipeline runs, in short sleeps
+# that keep Ctrl-C responsive
+def wait(seconds):
+    deadline = time.time() + seconds
+    while True:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return
+        time.sleep(min(remaining, 1))
+
+def log_summaries(prefix=''):
+    test_info.put(TestTask('INFO', prefix + 'Bootstrap polling: ' + bootstrap_client.summary()))
+    test_info.put(TestTask('INFO', prefix + 'Scheduler: ' + scheduler.summary()))
+    test_info.put(TestTask('INFO', prefix + 'Bootstrap cache: ' + bootstrap_cache.summary()))
+    if startup is not None:
+        test_info.put(TestTask('INFO', prefix + 'Startup: ' + startup.summary()))
+    if fragment_queue is not None:
+        test_info.put(TestTask('INFO', prefix + 'Bootstrap queue: ' + bootstrap_queue.summary()))
+        test_info.put(TestTask('INFO', prefix + 'Fragment queue: ' + fragment_queue.summary()))
+    if bootstrap_archive is not None:
+        bootstrap_archive.flush()
+
+# Open the binary result log the writer packs ResultRecords into
+def open_results():
+    global result_log
+    result_log = ResultLog(settings.results_file)
+    return result_log
+
+def close_archive():
+    if bootstrap_archive is not None:
+        bootstrap_archive.close()
+
+# Entry point of a worker process: runs the pipeline for its shard and
+# sends log records and histogram snapshots to the parent over 'records'
+def run_worker(worker_id, shard, records):
+    start_pipeline(shard, records, settings.bootstrap_archive and '%s.%d' % (settings.bootstrap_archive, worker_id))
+    start_profiler()
+    prefix = 'Worker %d: ' % worker_id
+    try:
+        while True:
+            wait(settings.shard_report_interval)
+            records.put(('histograms', worker_id, histogram_snapshots()))
+            records.put(('metrics', worker_id, metrics.snapshot(False)))
+            records.put(('startup', worker_id, (startup.primed, startup.steady, startup.failed)))
+            log_summaries(prefix)
+    except KeyboardInterrupt:
+        pass
+    records.put(('histograms', worker_id, histogram_snapshots()))
+    records.put(('metrics', worker_id, metrics.snapshot(False)))
+    records.put(('startup', worker_id, (startup.primed, startup.steady, startup.failed)))
+    log_summaries(prefix)
+    close_archive()
+    records.put(('done', worker_id, None))
+
+# Run the shards in worker processes, relaying their records to the
+# writer and their latency snapshots to the reporter
+def run_sharded(bootstrap_list, num_workers, writer):
+    # Bounded like the writer buffer, so a worker waits rather than
+    # queueing without limit when the writer falls behind
+    records = multiprocessing.Queue(settings.log_buffer_records)
+    shards = shard_streams(bootstrap_list, num_workers)
+    workers = []
+    for worker_id in xrange(num_workers):
+        writer.put(TestTask('INFO', ('Worker %d takes %d streams' % (worker_id, len(shards[worker_id])))))
+        print ('Worker %d takes %d streams' % (worker_id, len(shards[worker_id])))
+        worker = multiprocessing.Process(target=run_worker, args=(worker_id, shards[worker_id], records))
+        worker.daemon = True
+        worker.start()
+        workers.append(worker)
+
+    # The profile signal sent to the parent profiles every worker
+    if settings.profile_signal:
+        SamplingProfiler.forward(workers)
+
+    snapshots = dict((name, LatencySnapshots()) for name in histogram_recorders())
+    reporters = report_histograms(snapshots)
+    metrics.register('writer_queue_depth', 'gauge', writer.qsize)
+    metrics.register('log_records_dropped', 'counter', lambda: writer.dropped)
+    register_startup_metrics()
+    start_metrics()
+
+    running = num_workers
+    stopping = False
+    while running > 0:
+        try:
+            record = records.get(True, 1)
+        except Queue.Empty:
+            if stopping and not any(worker.is_alive() for worker in workers):
+                break
+            continue
+        except KeyboardInterrupt:
+            # The workers got the interrupt too, collect their last records
+            print 'Stopping, waiting for workers'
+            stopping = True
+            continue
+        if isinstance(record, tuple):
+            kind, worker_id, payload = record
+            if kind == 'histograms':
+                for name, streams in payload.iteritems():
+                    snapshots[name].update(worker_id, streams)
+            elif kind == 'metrics':
+                metrics.update('worker%d' % worker_id, payload)
+            elif kind == 'startup':
+                startup.worker(worker_id, payload[0], payload[1], payload[2], num_workers)
+            elif kind == 'done':
+                running -= 1
+        else:
+            writer.put(record)
+
+    for reporter in reporters:
+        reporter.stop()
+    for worker in workers:
+        worker.join(1)
+    writer.put(TestTask('INFO', 'Startup: ' + startup.summary()))
+    print 'Startup: ' + startup.summary()
+
+if __name__ == '__main__':
+
+    # A single batching writer takes the internal log and the per-stream
+    # results
+    writer = BatchWriter(settings.log_buffer_records, settings.log_flush_records,
+                         settings.log_flush_interval, settings.log_overflow)
+    writer.start()
+    test_info           = writer
+    open_results()
+    startup             = StartupTracker()
     
-    for w in test_info_consumers:
-            w.start()
+    # Request the live multi-level manifests, all events at once
+    urls = event_urls()
+    bootstrap_list = discover_events(urls, settings.discovery_threads)
             
-    if m_req is not False:
-        # Parse multi-level manifest and extract stream names
-        m_bin = hds.parse_live_mlm(m_req)
-        bootstrap_list = []
-        i = 0
-        for item in m_bin:
-            if i == 0:
-                base_url = item
-            else:
-                for key, val in item.iteritems():
-                    if key == 'href':
-                        stream_name = val.split('.')
-                        #populate queue with data
-                        bootstrap_list.append({'base' : base_url, 'stream' : stream_name[0]})
-                        frag_list = []
-                        frag_list.append({'segment':0,'fragment':0,'duration':0,'discontinuity':0,'pulled':True})
-                        bootstraps.put(BootstrapTask(base_url, stream_name[0], 0.1, frag_list))  
-            i += 1
-        
-        # Spawn consumer threads
-        bootstrap_num_consumers = (len(bootstrap_list) > MAX_BOOSTRAP_THREAD_COUNT) and MAX_BOOSTRAP_THREAD_COUNT or len(bootstrap_list) 
-        fragment_num_consumers  = (len(bootstrap_list) > MAX_FRAGMENT_THREAD_COUNT) and MAX_FRAGMENT_THREAD_COUNT or len(bootstrap_list)
-        #(multiprocessing.cpu_count() < len(bootstrap_list) and len(bootstrap_list) * 2 or multiprocessing.cpu_count() * 2)
-        log_num_consumers = (len(bootstrap_list) > MAX_LOG_THREAD_COUNT) and MAX_LOG_THREAD_COUNT or len(bootstrap_list)
-        
-        test_info.put(TestTask('INFO', ('Creating Bootstrap %d consumers' % bootstrap_num_consumers)))    
-        print ('Creating Bootstrap %d consumers' % bootstrap_num_consumers)
-        bootstrap_consumers = [ BootstrapConsumer(bootstraps, bootstrap_results, fragments)
-                      for i in xrange(bootstrap_num_consumers) ]
-                      
-        test_info.put(TestTask('INFO', ('Creating Fragment %d consumers' % fragment_num_consumers)))
-        print ('Creating Fragment %d consumers' % fragment_num_consumers)
-        fragment_consumers = [ FragmentConsumer(fragments, fragment_results, logs_to_write)
-                      for i in xrange(fragment_num_consumers) ]
-        
-        test_info.put(TestTask('INFO', ('Creating Log %d consumers' % log_num_consumers)))
-        print ('Creating Log %d consumers' % log_num_consumers)
-        log_consumers = [ LogConsumer(logs_to_write)
-                      for i in xrange(log_num_consumers) ]
-        
-        for w in bootstrap_consumers:
-            w.start()
+    if bootstrap_list:
+        startup.discovered(bootstrap_list)
+        test_info.put(TestTask('INFO', ('Discovered %d streams of %d events in %.1f s' % (len(bootstrap_list), len(urls), startup.discovery))))
+        print ('Discovered %d streams of %d events in %.1f s' % (len(bootstrap_list), len(urls), startup.discovery))
+
+        num_workers = settings.worker_processes or multiprocessing.cpu_count()
+        num_workers = min(num_workers, len(bootstrap_list))
+
+        if num_workers > 1:
+            run_sharded(bootstrap_list, num_workers, writer)
+        else:
+            start_pipeline(bootstrap_list, writer, settings.bootstrap_archive)
+            start_metrics()
+            start_profiler()
+
+            # Write the latency percentiles on a timer and at the end of the run
+            reporters = report_histograms(histogram_recorders())
             
-        for w in fragment_consumers:
-            w.start()
-        
-        for w in log_consumers:
-            w.start()    
-        
-        i=0
-        while True: 
-            for i in xrange(len(bootstrap_list)):
-                if i < len(bootstrap_list):
-                    result = bootstrap_results.get()
-                    dur    = result.__getitem__('duration')
-                    frag   = result.__getitem__('number')
-                    name   = result.__getitem__('name')
-                    url    = result.__getitem__('stream_url')
-                    url    = bootstrap_list[i].__getitem__('base')
-                    name   = bootstrap_list[i].__getitem__('stream')
-                       
-            if i == len(bootstrap_list):
-                i = 0    
-            i += 1
+            try:
+                while True: 
+                    wait(settings.histogram_interval)
+                    log_summaries()
+            except KeyboardInterrupt:
+                print 'Stopping, flushing results'
+            finally:
+                for reporter in reporters:
+                    reporter.stop()
+                log_summaries()
+                print 'Bootstrap polling: ' + bootstrap_client.summary()
+                print 'Scheduler: ' + scheduler.summary()
+                scheduler.stop()
+                close_archive()
             
     else:
-        test_info.put(TestTask('ERROR', ('Multi-level Manifest could not be loaded. Verify %s.f4m to ensure it can be reached.' % mlm_url)))
-        print ('Multi-level Manifest could not be loaded. Verify %s.f4m to ensure it can be reached.' % mlm_url)
+        test_info.put(TestTask('ERROR', ('No streams found in %d multi-level manifests' % len(urls))))
+        print ('No streams found in %d multi-level manifests' % len(urls))
+
+    writer.close()
+    result_log.close()
+    if writer.dropped:
+        print ('%d log records were dropped' % writer.dropped)
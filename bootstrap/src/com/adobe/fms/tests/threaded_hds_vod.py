@@ -0,0 +1,279 @@
+'''
+Created on 18 Oct 2026
+
+@author: wallace
+
+Load tests a VOD catalogue. The manifests listed in the catalogue file
+(one URL per line excluding .f4m, most popular first) are loaded in
+parallel, then playback sessions run concurrently, each picking a title
+by Zipf popularity and requesting its fragments sequentially or with
+random seeks:
+
+    threaded_hds_vod.py --catalogue titles.txt --sessions 500 --pattern seek --zipf 0.8
+
+The first request for a fragment during the run is the one an origin or
+cache is likely to miss on, so latencies are kept apart for first
+('cold') and repeated ('warm') requests, overall and per title.
+'''
+
+import sys
+import os
+sys.path.append(os.path.normpath(os.environ['HDS_LT_PATH']))
+import argparse
+import Queue
+import random
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from urlparse import urljoin, urlsplit
+from com.adobe.fms.utilities.hds import hds
+from com.adobe.fms.utilities.ManifestReader import ManifestReader
+from com.adobe.fms.utilities.BootstrapParser import BootstrapParseError
+from com.adobe.fms.utilities.LoadEngine import LoadEngine
+from com.adobe.fms.utilities.BatchWriter import BatchWriter
+from com.adobe.fms.utilities.VodTitle import VodTitle
+from com.adobe.fms.utilities.statistics import LatencyRecorder, HistogramReporter
+from com.adobe.fms.settings import settings
+from com.adobe.fms.tests import threaded_hds_live as live
+
+# Cold and warm fragment latency, in msec
+vod_latencies = LatencyRecorder()
+
+class TitleRecord(object):
+
+    # Final line of the per title CSV
+    def __init__(self, title):
+        self.title = title
+
+    def render(self):
+        t = self.title
+        warm = t.requests - t.errors - t.cold
+        return (os.path.normpath(settings.bootstrap_dir + '/vod_titles.csv'),
+                '%d,%s,%d,%d,%d,%.3f,%d,%.3f,%.3f,%d\n' % (t.rank, t.name, t.count, t.requests,
+                                                           t.cold, t.cold and t.cold_ms / t.cold or 0,
+                                                           warm, warm and t.warm_ms / warm or 0,
+                                                           t.max_ms, t.errors))
+
+class Popularity(object):
+
+    # Picks a title index with probability proportional to
+    # 1/(index + 1)^exponent by bisecting the cumulative weights
+    def __init__(self, count, exponent):
+        self.cumulative = array('d')
+        total = 0.0
+        for rank in xrange(1, count + 1):
+            total += 1.0 / rank ** exponent
+            self.cumulative.append(total)
+        self.total = total
+
+    def pick(self, rand=random.random):
+        return min(bisect_right(self.cumulative, rand() * self.total), len(self.cumulative) - 1)
+
+class VodDriver(object):
+
+    # Runs the playback sessions, one thread each. A session picks a
+    # title, plays it from the start ('sequential') or from random
+    # positions vod_seek_run fragments at a time ('seek') and ends after
+    # vod_session_fragments fragments or at the end of the title
+    def __init__(self, titles, sessions, pattern, zipf):
+        self.titles     = titles
+        self.sessions   = sessions
+        self.pattern    = pattern
+        self.popularity = Popularity(len(titles), zipf)
+        self.length     = settings.vod_session_fragments
+        self.seek_run   = max(settings.vod_seek_run, 1)
+        self.realtime   = settings.vod_realtime
+        self.stopping   = False
+        self.threads    = []
+        self.started    = 0
+        self.lock       = threading.Lock()
+
+    def start(self):
+        for i in xrange(self.sessions):
+            thread = threading.Thread(target=self.run)
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        self.stopping = True
+
+    def run(self):
+        rand = random.Random()
+        while not self.stopping:
+            title = self.titles[self.popularity.pick(rand.random)]
+            with self.lock:
+                self.started += 1
+            self.play(title, rand)
+
+    def play(self, title, rand):
+        remaining = self.length or title.count
+        position = self.pattern == 'seek' and rand.randrange(title.count) or 0
+        run = 0
+        pool = LoadEngine.get_pool(title.url, self.sessions)
+        path = urlsplit(title.url).path
+        while remaining > 0 and not self.stopping:
+            if position >= title.count:
+                if self.pattern != 'seek':
+                    return
+                position = rand.randrange(title.count)
+            segment, number, duration = title.fragment(position)
+            cold = title.first_request(position)
+            connect, ttfb, total, nbytes, status, errors = LoadEngine.fetch(pool, path + 'Seg%d-Frag%d' % (segment, number))
+            msec = total * 1000
+            live.metrics.inc('vod_requests')
+            live.metrics.inc('vod_bytes', '', nbytes)
+            if status == 200:
+                title.record(msec, cold)
+                vod_latencies.record(cold and 'cold' or 'warm', msec)
+                if cold:
+                    live.metrics.inc('vod_cold_requests')
+            else:
+                title.record(msec, cold, True)
+                live.metrics.inc('vod_errors')
+            remaining -= 1
+            position += 1
+            run += 1
+            if self.pattern == 'seek' and run >= self.seek_run:
+                position = rand.randrange(title.count)
+                run = 0
+            if self.realtime and duration > msec:
+                time.sleep((duration - msec) / 1000.0)
+
+    def summary(self):
+        requests = cold = errors = 0
+        for title in self.titles:
+            requests += title.requests
+            cold += title.cold
+            errors += title.errors
+        streams = vod_latencies.snapshot()[0]
+        percentiles = ', '.join('%s p50 %.1f ms p99 %.1f ms' % (name, streams[name].percentile(50), streams[name].percentile(99))
+                                for name in ('cold', 'warm') if name in streams)
+        return ('VOD: %d sessions started, %d requests, %d cold (%.1f%%), %d errors | %s'
+                % (self.started, requests, cold, requests and cold * 100.0 / requests or 0, errors, percentiles))
+
+    def register_metrics(self):
+        live.metrics.register('vod_sessions_started', 'counter', lambda: self.started)
+        live.metrics.register('vod_latency_ms', 'summary', lambda: vod_latencies.snapshot()[0])
+
+    def write_titles(self, writer):
+        for title in self.titles:
+            if title.requests:
+                writer.put(TitleRecord(title))
+
+# Manifest URLs of the catalogue file, blank lines and # comments skipped
+def read_catalogue(file_name):
+    urls = []
+    FILE = open(file_name, 'r')
+    for line in FILE:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            urls.append(line)
+    FILE.close()
+    return urls
+
+# A VodTitle for the first media entry of the manifest with an embedded
+# bootstrap, None if there is none or it cannot be loaded
+def load_title(url, rank):
+    name = url.rstrip('/').rsplit('/', 1)[-1]
+    content = hds.request_manifest(url)
+    if content is False:
+        live.test_info.put(live.TestTask('ERROR', ('Manifest %s.f4m could not be loaded' % url)))
+        return None
+    reader = ManifestReader(content)
+    for media in reader.media():
+        data = media.bootstrap()
+        if data and media.url:
+            try:
+                bootstrap = hds.parse_bootstrap(data)
+            except BootstrapParseError, error:
+                live.test_info.put(live.TestTask('ERROR', ('Bootstrap of %s could not be parsed: %s' % (url, error))))
+                return None
+            base = reader.base_url and reader.base_url.rstrip('/') + '/' or url + '.f4m'
+            return VodTitle(name, urljoin(base, media.url), bootstrap, rank)
+    live.test_info.put(live.TestTask('ERROR', ('Manifest %s.f4m has no media with an embedded bootstrap' % url)))
+    return None
+
+# Loads the manifests on 'threads' threads, keeping catalogue order.
+# Titles without fragments are left out, a session could not play them
+def load_titles(urls, threads):
+    titles = [None] * len(urls)
+    jobs = Queue.Queue()
+    for rank, url in enumerate(urls):
+        jobs.put((rank, url))
+
+    def loader():
+        while True:
+            try:
+                rank, url = jobs.get_nowait()
+            except Queue.Empty:
+                return
+            titles[rank] = load_title(url, rank + 1)
+
+    loaders = [threading.Thread(target=loader) for i in xrange(max(min(threads, len(urls)), 1))]
+    for loader_thread in loaders:
+        loader_thread.start()
+    for loader_thread in loaders:
+        loader_thread.join()
+    for title in titles:
+        if title is not None and not title.count:
+            live.test_info.put(live.TestTask('ERROR', ('Bootstrap of %s has no fragments' % title.url)))
+    return [title for title in titles if title is not None and title.count]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='VOD catalogue load test')
+    parser.add_argument('--catalogue', default=settings.vod_catalogue, help='file of manifest URLs, most popular first')
+    parser.add_argument('--sessions', type=int, default=settings.vod_sessions, help='concurrent playback sessions')
+    parser.add_argument('--pattern', choices=('sequential', 'seek'), default=settings.vod_pattern)
+    parser.add_argument('--zipf', type=float, default=settings.vod_zipf_exponent, help='popularity exponent, 0 for uniform')
+    parser.add_argument('--duration', type=float, default=0, help='seconds to run, 0 until interrupted')
+    args = parser.parse_args()
+    if not args.catalogue:
+        parser.error('no catalogue given and settings.vod_catalogue is not set')
+
+    writer = BatchWriter(settings.log_buffer_records, settings.log_flush_records,
+                         settings.log_flush_interval, settings.log_overflow)
+    writer.start()
+    live.test_info = writer
+
+    started = time.time()
+    urls = read_catalogue(args.catalogue)
+    titles = load_titles(urls, settings.vod_manifest_threads)
+    fragments = sum(title.count for title in titles)
+    message = ('Loaded %d of %d titles, %d fragments, in %.1f s'
+               % (len(titles), len(urls), fragments, time.time() - started))
+    print message
+    writer.put(live.TestTask('INFO', message))
+
+    if titles:
+        driver = VodDriver(titles, args.sessions, args.pattern, args.zipf)
+        driver.register_metrics()
+        live.start_metrics()
+        reporter = HistogramReporter(vod_latencies, os.path.normpath(settings.bootstrap_dir + '/vod_latency_percentiles.csv'),
+                                     settings.histogram_interval)
+        reporter.start()
+        driver.start()
+
+        deadline = args.duration and time.time() + args.duration
+        try:
+            while True:
+                wait = settings.vod_report_interval
+                if deadline:
+                    wait = min(wait, deadline - time.time())
+                    if wait <= 0:
+                        break
+                time.sleep(wait)
+                summary = driver.summary()
+                print summary
+                writer.put(live.TestTask('INFO', summary))
+        except KeyboardInterrupt:
+            print 'Stopping, flushing results'
+        finally:
+            driver.stop()
+            reporter.stop()
+            summary = driver.summary()
+            print summary
+            writer.put(live.TestTask('INFO', summary))
+            driver.write_titles(writer)
+    writer.close()
@@ -0,0 +1,75 @@
+'''
+Created on 18 Oct 2026
+
+@author: wallace
+'''
+import json
+import socket
+import threading
+
+class AgentConnection(object):
+
+    # One end of the coordinator <-> agent link. Messages are dicts sent
+    # as one JSON object per line; send() may be called from any thread.
+    #
+    # coordinator -> agent
+    #   {'type': 'assign', 'agent': id, 'streams': [...], 'settings': {...}}
+    #   {'type': 'stop'}
+    # agent -> coordinator
+    #   {'type': 'hello'}
+    #   {'type': 'log', 'level': ..., 'msg': ..., 'time': ...}
+    #   {'type': 'result', 'stream': ..., 'fragment': ..., 'latency': ...,
+    #    'throughput': ..., 'non200': ..., 'percentiles': ..., 'transfer': ...}
+    #   {'type': 'latencies', 'streams': {name: encoded histogram}}
+    #   {'type': 'done'}
+    def __init__(self, sock):
+        self.sock       = sock
+        self.reader     = sock.makefile('rb')
+        self.lock       = threading.Lock()
+        self.closed     = False
+
+    @staticmethod
+    def connect(address, timeout=30):
+        host, port = address.rsplit(':', 1)
+        sock = socket.create_connection((host, int(port)), timeout)
+        # Only the connect is bounded, an agent may wait hours for 'stop'
+        sock.settimeout(None)
+        return AgentConnection(sock)
+
+    def send(self, message):
+        line = json.dumps(message, separators=(',', ':')) + '\n'
+        with self.lock:
+            if self.closed:
+                return False
+            try:
+                self.sock.sendall(line)
+            except socket.error:
+                self.closed = True
+                return False
+        return True
+
+    # Returns the next message, or None once the peer has gone
+    def receive(self):
+        try:
+            line = self.reader.readline()
+        except socket.error:
+            return None
+        if not line:
+            return None
+        return json.loads(line)
+
+    def __iter__(self):
+        while True:
+            message = self.receive()
+            if message is None:
+                return
+            yield message
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
+        self.sock.close()
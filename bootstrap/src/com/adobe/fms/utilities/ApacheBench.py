@@ -9,7 +9,7 @@ from com.adobe.fms.settings import settings
 class ApacheBench(object):
 
     @staticmethod
-    def run(frag, frag_dur, num_req, concurrency, stream_url):
+    def run(frag, frag_dur, num_req, concurrency, stream_url, due=None):
         
         output = subprocess.check_output(settings.apache_bench +
                                          ' -d -n' + str(num_req) + ' -c ' + str(concurrency)
@@ -76,4 +76,66 @@ class ApacheBench(object):
                     print line
                 return int(non_2xx_responses_line[1].strip(' '))
         return 0;
-                
+
+    @staticmethod    
+    def get_failed_requests(lines, debug = False):
+        for line in lines:
+            failed_line = line.split(":")
+            if  failed_line[0] == 'Failed requests':
+                if debug is True:
+                    print line
+                return int(failed_line[1].split()[0])
+        return 0;
+
+    # Bytes received, headers included
+    @staticmethod
+    def get_total_bytes(lines, debug = False):
+        for line in lines:
+            transferred_line = line.split(":")
+            if  transferred_line[0] == 'Total transferred':
+                if debug is True:
+                    print line
+                return int(transferred_line[1].split()[0])
+        return 0;
+
+    # Mean 'Waiting' connection time, ab's time to first byte, in msec
+    @staticmethod
+    def get_ttfb(lines, debug = False):
+        for line in lines:
+            waiting_line = line.split(":")
+            if  waiting_line[0] == 'Waiting':
+                if debug is True:
+                    print line
+                return float(waiting_line[1].split()[1])
+        return 0;
+
+    # Transfer rate in bytes/sec
+    @staticmethod
+    def get_transfer_rate(lines, debug = False):
+        for line in lines:
+            transfer_rate_line = line.split(":")
+            if  transfer_rate_line[0] == 'Transfer rate':
+                if debug is True:
+                    print line
+                return float(transfer_rate_line[1].split()[0]) * 1024
+        return 0;
+
+    # ab does not look at the payload
+    @staticmethod
+    def get_validation_failures(lines, debug = False):
+        return None
+
+    @staticmethod
+    def get_validation_errors(lines):
+        return []
+
+    # Closed loop, there is no schedule to fall behind
+    @staticmethod
+    def get_late_requests(lines, debug = False):
+        return None
+
+    # ab is run with -d so only the mean is available, this returns it as
+    # the single latency sample for the fragment
+    @staticmethod
+    def get_latencies(lines):
+        return [ApacheBench.get_latency(lines)]
@@ -0,0 +1,141 @@
+'''
+Created on 18 Oct 2026
+
+@author: wallace
+'''
+import threading
+import time
+from collections import deque, OrderedDict
+
+class BatchWriter(threading.Thread):
+
+    # The single writer stage for log and result files. put() accepts any
+    # record with a render() method returning (file name, text); records
+    # are buffered and written in batches once flush_records are waiting
+    # or flush_interval seconds have passed, through file handles that are
+    # kept open. When max_records are buffered put() either blocks
+    # (policy 'block') or drops the record and counts it (policy 'drop').
+    # A record that cannot be rendered or written is reported and counted
+    # as dropped; the writer keeps going, and should it stop anyway put()
+    # drops instead of waiting for room that never comes.
+    def __init__(self, max_records=10000, flush_records=500, flush_interval=1.0,
+                 policy='block', max_handles=256):
+        threading.Thread.__init__(self)
+        self.daemon         = True
+        self.max_records    = max_records
+        self.flush_records  = flush_records
+        self.flush_interval = flush_interval
+        self.policy         = policy
+        self.max_handles    = max_handles
+
+        self.buffer         = deque()
+        self.lock           = threading.Lock()
+        self.ready          = threading.Condition(self.lock)
+        self.space          = threading.Condition(self.lock)
+        self.closing        = False
+        self.stopped        = False
+        self.handles        = OrderedDict()
+
+        self.written        = 0
+        self.dropped        = 0
+
+    # Queue style entry point so producers can treat the writer as the
+    # queue they used to put log tasks on
+    def put(self, record):
+        with self.lock:
+            if self.closing or self.stopped:
+                self.dropped += 1
+                return False
+            while len(self.buffer) >= self.max_records:
+                if self.policy == 'drop' or self.closing or self.stopped:
+                    self.dropped += 1
+                    return False
+                self.space.wait()
+            self.buffer.append(record)
+            if len(self.buffer) >= self.flush_records:
+                self.ready.notify()
+        return True
+
+    def qsize(self):
+        return len(self.buffer)
+
+    def run(self):
+        try:
+            while True:
+                with self.lock:
+                    deadline = time.time() + self.flush_interval
+                    while not self.closing and len(self.buffer) < self.flush_records:
+                        remaining = deadline - time.time()
+                        if remaining <= 0:
+                            break
+                        self.ready.wait(remaining)
+                    batch, self.buffer = self.buffer, deque()
+                    self.space.notify_all()
+                    closing = self.closing
+                if batch:
+                    self._write(batch)
+                if closing:
+                    break
+            self._close_handles()
+        finally:
+            with self.lock:
+                self.stopped = True
+                self.dropped += len(self.buffer)
+                self.buffer.clear()
+                self.space.notify_all()
+        return
+
+    def _write(self, batch):
+        # Group the batch per file so each file gets one write
+        pending = OrderedDict()
+        for record in batch:
+            try:
+                file_name, text = record.render()
+            except Exception, error:
+                print 'Log writer: dropped a %s record: %r' % (type(record).__name__, error)
+                with self.lock:
+                    self.dropped += 1
+                continue
+            pending.setdefault(file_name, []).append(text)
+        for file_name, lines in pending.iteritems():
+            try:
+                FILE = self._handle(file_name)
+                FILE.write(''.join(lines))
+                FILE.flush()
+            except (IOError, OSError), error:
+                print 'Log writer: dropped %d records for %s: %s' % (len(lines), file_name, error)
+                with self.lock:
+                    self.dropped += len(lines)
+                FILE = self.handles.pop(file_name, None)
+                if FILE is not None:
+                    try:
+                        FILE.close()
+                    except IOError:
+                        pass
+                continue
+            self.written += len(lines)
+
+    def _handle(self, file_name):
+        FILE = self.handles.pop(file_name, None)
+        if FILE is None:
+            if len(self.handles) >= self.max_handles:
+                oldest, old_file = self.handles.popitem(last=False)
+                old_file.close()
+            FILE = open(file_name, "ab")
+        # Most recently used last
+        self.handles[file_name] = FILE
+        return FILE
+
+    def _close_handles(self):
+        for FILE in self.handles.itervalues():
+            FILE.close()
+        self.handles.clear()
+
+    # Write out everything buffered and stop the writer
+    def close(self):
+        with self.lock:
+            self.closing = True
+            self.ready.notify()
+            self.space.notify_all()
+        if self.is_alive():
+            self.join()
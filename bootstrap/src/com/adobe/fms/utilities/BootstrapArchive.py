@@ -0,0 +1,143 @@
+'''
+Created on 18 Oct 2026
+
+@author: wallace
+'''
+import bisect
+import mmap
+import struct
+import threading
+import time
+
+# Archive file: MAGIC, then one record per distinct bootstrap
+#   RECORD   capture time, stream name length, bootstrap length
+#            followed by the stream name and the bootstrap
+# Index file (archive + '.idx'): one INDEX entry per record
+#   INDEX    capture time, record offset
+MAGIC   = 'HDSBSA01'
+RECORD  = struct.Struct('>dHI')
+INDEX   = struct.Struct('>dQ')
+
+class BootstrapArchive(object):
+
+    # Appends bootstraps to an archive for later replay. Safe to share
+    # between the bootstrap consumer threads.
+    def __init__(self, file_name):
+        self.file_name  = file_name
+        self.lock       = threading.Lock()
+        self.data       = open(file_name, 'ab')
+        self.index      = open(file_name + '.idx', 'ab')
+        if self.data.tell() == 0:
+            self.data.write(MAGIC)
+        self.offset     = self.data.tell()
+        self.records    = 0
+
+    def append(self, stream_name, bootstrap, when=None):
+        if isinstance(stream_name, unicode):
+            stream_name = stream_name.encode('utf-8')
+        with self.lock:
+            # Stamped under the lock so the index stays in time order
+            if when is None:
+                when = time.time()
+            self.data.write(RECORD.pack(when, len(stream_name), len(bootstrap)))
+            self.data.write(stream_name)
+            self.data.write(bootstrap)
+            self.index.write(INDEX.pack(when, self.offset))
+            self.offset += RECORD.size + len(stream_name) + len(bootstrap)
+            self.records += 1
+
+    def flush(self):
+        with self.lock:
+            # Data before index, so an index entry never points past the data
+            self.data.flush()
+            self.index.flush()
+
+    def close(self):
+        with self.lock:
+            self.data.close()
+            self.index.close()
+
+class ArchiveReader(object):
+
+    # Random access to an archive through mmap. Records are addressed by
+    # position, in capture order; an index entry whose record has not
+    # been completely written (a capture still running or cut short) is
+    # ignored.
+    def __init__(self, file_name):
+        self.file_name  = file_name
+        self.data_file  = open(file_name, 'rb')
+        self.data       = mmap.mmap(self.data_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[:len(MAGIC)] != MAGIC:
+            raise ValueError('%s is not a bootstrap archive' % file_name)
+
+        self.times      = []
+        self.offsets    = []
+        index = open(file_name + '.idx', 'rb')
+        try:
+            entries = index.read()
+        finally:
+            index.close()
+        size = len(self.data)
+        for pos in xrange(0, len(entries) - INDEX.size + 1, INDEX.size):
+            when, offset = INDEX.unpack_from(entries, pos)
+            if offset + RECORD.size > size:
+                break
+            name_len, data_len = RECORD.unpack_from(self.data, offset)[1:]
+            if offset + RECORD.size + name_len + data_len > size:
+                break
+            self.times.append(when)
+            self.offsets.append(offset)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    # Returns (capture time, stream name, bootstrap)
+    def __getitem__(self, position):
+        offset = self.offsets[position]
+        when, name_len, data_len = RECORD.unpack_from(self.data, offset)
+        start = offset + RECORD.size
+        return when, self.data[start:start + name_len], self.data[start + name_len:start + name_len + data_len]
+
+    def __iter__(self):
+        for position in xrange(len(self.offsets)):
+            yield self[position]
+
+    # Position of the first record captured at or after when
+    def position(self, when):
+        return bisect.bisect_left(self.times, when)
+
+    def streams(self):
+        names = set()
+        for position in xrange(len(self.offsets)):
+            offset = self.offsets[position]
+            name_len = RECORD.unpack_from(self.data, offset)[1]
+            names.add(self.data[offset + RECORD.size:offset + RECORD.size + name_len])
+        return sorted(names)
+
+    # Yields the records captured at or after start, in capture order
+    def records(self, start=None):
+        position = start is not None and self.position(start) or 0
+        for position in xrange(position, len(self.offsets)):
+            yield self[position]
+
+    def replay(self, speed=1.0, start=None):
+        return replay(self.records(start), speed)
+
+    def close(self):
+        self.data.close()
+        self.data_file.close()
+
+# Yields (capture time, stream, bootstrap) records, already in capture
+# order, paced at speed times real time. speed 0 replays as fast as the
+# consumer takes them
+def replay(records, speed=1.0):
+    origin = None
+    for record in records:
+        if speed:
+            if origin is None:
+                origin = record[0]
+                began = time.time()
+            delay = (record[0] - origin) / speed - (time.time() - began)
+            if delay > 0:
+                time.sleep(delay)
+        yield record
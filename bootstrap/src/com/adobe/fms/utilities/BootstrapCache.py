@@ -0,0 +1,56 @@
+'''
+Created on 18 Oct 2026
+
+@author: wallace
+'''
+import hashlib
+import threading
+from collections import OrderedDict
+from com.adobe.fms.utilities.BootstrapParser import BootstrapParser
+
+class BootstrapCache(object):
+
+    # Parsed bootstraps keyed by the SHA-1 of their bytes. A bootstrap
+    # seen before, on this or any other stream, is not parsed again; the
+    # parsed dicts are shared and must be treated as read only. The
+    # digest last seen per stream tells a caller whether a poll brought
+    # anything new.
+    def __init__(self, max_entries=1024):
+        self.max_entries    = max_entries
+        self.entries        = OrderedDict()
+        self.last           = {}
+        self.lock           = threading.Lock()
+
+        self.hits           = 0
+        self.misses         = 0
+
+    # Returns (parsed bootstrap, new) where new is False if the bytes are
+    # the same as the stream's previous bootstrap. Raises
+    # BootstrapParseError like BootstrapParser.parse
+    def parse(self, stream_name, data):
+        digest = hashlib.sha1(data).digest()
+        with self.lock:
+            new = self.last.get(stream_name) != digest
+            self.last[stream_name] = digest
+            parsed = self.entries.pop(digest, None)
+            if parsed is not None:
+                # Most recently used last
+                self.entries[digest] = parsed
+                self.hits += 1
+                return parsed, new
+            self.misses += 1
+
+        parsed = BootstrapParser.parse(data)
+
+        with self.lock:
+            self.entries[digest] = parsed
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return parsed, new
+
+    def forget(self, stream_name):
+        with self.lock:
+            self.last.pop(stream_name, None)
+
+    def summary(self):
+        return 'Parsed: %d, cache hits: %d, cached: %d' % (self.misses, self.hits, len(self.entries))
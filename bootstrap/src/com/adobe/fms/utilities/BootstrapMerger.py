@@ -0,0 +1,308 @@
+'''
+Created on 18 Oct 2026
+
+@author: wallace
+'''
+from bisect import bisect_left, bisect_right
+from com.adobe.fms.utilities.RunTable import RunTable
+
+_TABLES = ('segment_run_tables', 'fragment_run_tables')
+
+class BootstrapMergeError(Exception):
+    pass
+
+class BootstrapMerger(object):
+
+    # Unions bootstraps of the same rendition, parsed by BootstrapParser,
+    # with the rules of BBC::HDS::Bootstrap::Merger (tools/merge.pl):
+    #   current_media_time      the larger
+    #   version                 with live=True the larger, a packager
+    #                           bumps it with each update of a source
+    #   run tables              paired by index
+    #   runs                    ordered by first number, a run listed by
+    #                           several bootstraps takes the most fragments
+    #                           (segment runs) or the longest duration
+    #                           (fragment runs); timestamps must agree
+    #   servers, quality        union, in order
+    #   anything else           must agree
+    # or BootstrapMergeError is raised. Unlike merge.pl a zero duration
+    # marker and a run starting on the same number are kept apart (merge.pl
+    # gives up on the timestamp) with the marker first, as RunTable has it.
+    #
+    # Bootstraps are folded in one at a time with add(), per source: only
+    # the runs newer than the last seen from that source are merged, each
+    # by a binary search of the union, so following N polled origins costs
+    # the entries they add. With live=True the union is kept to the window
+    # of the most advanced source and segment runs are merged by the
+    # fragment numbers they cover (base + fragments before them, as
+    # hds.extract_fragments counts), so the newest fragment of the union is
+    # the newest of any source even when a packager lists its whole window
+    # as one segment run. 'union' is the merge.pl result; timeline() also
+    # drops the part of a gap (discontinuity 1) another source has.
+    def __init__(self, live=False):
+        self.live       = live
+        self.union      = None
+        # Per table index, the union's run keys, and with live the first
+        # fragment number of each union segment run
+        self.keys       = {}
+        self.segment_from = {}
+        # Per source: its runs as a RunTable, the first fragment of its
+        # newest bootstrap and per table the newest key merged from it
+        self.sources    = {}
+        self.bases      = {}
+        self.seen       = {}
+
+    # Merges bootstraps the way merge.pl does, which returns a single
+    # bootstrap as it is: an end of presentation marker stays after the
+    # runs instead of being ordered by its number
+    @staticmethod
+    def merge(bootstraps):
+        if len(bootstraps) == 1:
+            return bootstraps[0]
+        merger = BootstrapMerger()
+        for source, bootstrap in enumerate(bootstraps):
+            merger.add(source, bootstrap)
+        return merger.union
+
+    @staticmethod
+    def segment_key(run):
+        return run[0]
+
+    # Markers sort before a run starting on the same number
+    @staticmethod
+    def fragment_key(run):
+        return run[0], run[2] != 0
+
+    @staticmethod
+    def merge_value(path, lhs, rhs, live=False):
+        if lhs is None:
+            return rhs
+        if rhs is None:
+            return lhs
+        if path == '/*/current_media_time' or live and path == '/*/version':
+            return max(lhs, rhs)
+        if isinstance(lhs, list):
+            merged = list(lhs)
+            for value in rhs:
+                if value not in merged:
+                    merged.append(value)
+            return merged
+        if lhs != rhs:
+            raise BootstrapMergeError('Scalar mismatch with no merge rule at %s' % path)
+        return lhs
+
+    @staticmethod
+    def merge_segment_run(lhs, rhs):
+        return lhs[0], max(lhs[1], rhs[1])
+
+    @staticmethod
+    def merge_fragment_run(lhs, rhs):
+        if lhs[1] != rhs[1]:
+            raise BootstrapMergeError('Scalar mismatch with no merge rule at /*/fragment_run_tables/*/runs/*/timestamp '
+                                      '(fragment %d: %d, %d)' % (lhs[0], lhs[1], rhs[1]))
+        duration = max(lhs[2], rhs[2])
+        if duration:
+            return lhs[0], lhs[1], duration, 0
+        if lhs[3] != rhs[3]:
+            raise BootstrapMergeError('Scalar mismatch with no merge rule at /*/fragment_run_tables/*/runs/*/discontinuity '
+                                      '(fragment %d: %d, %d)' % (lhs[0], lhs[3], rhs[3]))
+        return lhs
+
+    # Folds in the newest bootstrap of source. Runs merged before a
+    # conflict is found stay merged, the source's runs after it are tried
+    # again with its next bootstrap
+    def add(self, source, bootstrap):
+        if self.union is None:
+            self.union = dict(bootstrap)
+            for kind in _TABLES:
+                self.union[kind] = []
+        else:
+            header = {}
+            for key, value in bootstrap.iteritems():
+                if key not in _TABLES:
+                    header[key] = BootstrapMerger.merge_value('/*/' + key, self.union.get(key), value, self.live)
+            self.union.update(header)
+
+        for kind in _TABLES:
+            tables = self.union[kind]
+            for index, table in enumerate(bootstrap[kind]):
+                if index == len(tables):
+                    merged = dict(table)
+                    merged['runs'] = []
+                    tables.append(merged)
+                else:
+                    merged = tables[index]
+                    path = '/*/%s/*/' % kind
+                    for key, value in table.iteritems():
+                        if key != 'runs':
+                            merged[key] = BootstrapMerger.merge_value(path + key, merged.get(key), value, self.live)
+                if kind == 'fragment_run_tables':
+                    self.merge_fragment_runs(source, index, merged['runs'], table['runs'])
+                elif self.live:
+                    self.merge_live_segment_runs(source, index, merged['runs'], table['runs'], bootstrap)
+                else:
+                    self.merge_segment_runs(source, index, merged['runs'], table['runs'])
+
+        runs = self.sources.get(source)
+        if runs is None:
+            runs = self.sources[source] = RunTable()
+        runs.append(bootstrap)
+        if self.live and bootstrap['fragment_run_tables'][0]['runs']:
+            self.bases[source] = bootstrap['fragment_run_tables'][0]['runs'][0][0]
+            runs.trim(self.bases[source])
+            self.trim(max(self.bases.itervalues()))
+
+    # Position in new of the first run not yet merged from source: from
+    # the end, past an end of presentation marker, back to the newest
+    # merged before, which may have grown
+    def _unseen(self, seen, new, key):
+        start = len(new)
+        last = self.seen.get(seen)
+        if last is None:
+            return 0
+        while start > 1 and key(new[start - 1]) < key(new[start - 2]):
+            start -= 1
+        while start > 0 and key(new[start - 1]) >= last:
+            start -= 1
+        return start
+
+    def merge_segment_runs(self, source, index, merged, new):
+        seen = (source, 'segment', index)
+        keys = self.keys.setdefault(('segment', index), [])
+        for run in new[self._unseen(seen, new, BootstrapMerger.segment_key):]:
+            key = run[0]
+            i = bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                merged[i] = BootstrapMerger.merge_segment_run(merged[i], run)
+            else:
+                keys.insert(i, key)
+                merged.insert(i, run)
+            self.seen[seen] = key
+
+    # Segment runs by the fragments they cover: union run i holds the
+    # fragments from segment_from[i] on, frags of them
+    def merge_live_segment_runs(self, source, index, merged, new, bootstrap):
+        seen = (source, 'segment', index)
+        keys = self.keys.setdefault(('segment', index), [])
+        froms = self.segment_from.setdefault(index, [])
+        start = self._unseen(seen, new, BootstrapMerger.segment_key)
+        fragment_runs = bootstrap['fragment_run_tables'][0]['runs']
+        if not fragment_runs:
+            return
+        first = fragment_runs[0][0]
+        for i in xrange(start):
+            first += new[i][1]
+        for run in new[start:]:
+            key, frags = run
+            i = bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                last = max(froms[i] + merged[i][1], first + frags)
+                froms[i] = min(froms[i], first)
+                merged[i] = (key, last - froms[i])
+            else:
+                keys.insert(i, key)
+                froms.insert(i, first)
+                merged.insert(i, run)
+            self.seen[seen] = key
+            first += frags
+
+    def merge_fragment_runs(self, source, index, merged, new):
+        seen = (source, 'fragment', index)
+        keys = self.keys.setdefault(('fragment', index), [])
+        for run in new[self._unseen(seen, new, BootstrapMerger.fragment_key):]:
+            key = BootstrapMerger.fragment_key(run)
+            # The end of presentation marker of a live bootstrap follows
+            # its runs with a zero number, it closes nothing in a union
+            last = self.seen.get(seen, key)
+            if self.live and key < last:
+                continue
+            i = bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                merged[i] = BootstrapMerger.merge_fragment_run(merged[i], run)
+            else:
+                keys.insert(i, key)
+                merged.insert(i, run)
+            self.seen[seen] = max(key, last)
+
+    # Drops the union's runs wholly before fragment number, the first
+    # kept starts at number. Only for live, where the fragments of the
+    # segment runs count from the first fragment run
+    def trim(self, number):
+        for index, table in enumerate(self.union['segment_run_tables']):
+            froms = self.segment_from.get(index)
+            runs = table['runs']
+            if not froms:
+                continue
+            drop = bisect_right(froms, number) - 1
+            if drop > 0:
+                del froms[:drop], runs[:drop], self.keys[('segment', index)][:drop]
+            if froms[0] < number:
+                runs[0] = (runs[0][0], max(froms[0] + runs[0][1] - number, 0))
+                froms[0] = number
+
+        for index, table in enumerate(self.union['fragment_run_tables']):
+            keys = self.keys.get(('fragment', index))
+            runs = table['runs']
+            if not keys:
+                continue
+            drop = bisect_right(keys, (number, True)) - 1
+            if drop > 0:
+                del keys[:drop], runs[:drop]
+            first, timestamp, duration, discontinuity = runs[0]
+            if first < number:
+                runs[0] = (number, timestamp + (number - first) * duration, duration, discontinuity)
+                keys[0] = BootstrapMerger.fragment_key(runs[0])
+
+    # The union with the gaps of one source that another has fragments
+    # for closed up: a gap marker gives way to the runs of the sources
+    # covering it, up to the first fragment none of them has
+    def timeline(self):
+        if self.union is None:
+            return None
+        tables = self.union['fragment_run_tables']
+        if not tables or len(self.sources) < 2:
+            return self.union
+        runs = tables[0]['runs']
+        reconciled = None
+        for i, run in enumerate(runs):
+            first, timestamp, duration, discontinuity = run
+            if duration == 0 and discontinuity & 1:
+                end = None
+                if i + 1 < len(runs):
+                    end = runs[i + 1][0]
+                covering, covered = self._covering(first, end)
+                if covering:
+                    if reconciled is None:
+                        reconciled = runs[:i]
+                    reconciled.extend(covering)
+                    if end is None or covered < end:
+                        number, timestamp, duration = covering[-1][:3]
+                        reconciled.append((covered, timestamp + (covered - number) * duration, 0, discontinuity))
+                    continue
+            if reconciled is not None:
+                reconciled.append(run)
+        if reconciled is None:
+            return self.union
+        timeline = dict(self.union)
+        table = dict(tables[0])
+        table['runs'] = reconciled
+        timeline['fragment_run_tables'] = [table] + tables[1:]
+        return timeline
+
+    # Runs of the sources having the fragments from number on, before
+    # end, and the first fragment number after them
+    def _covering(self, number, end):
+        covering = []
+        moved = True
+        while moved and (end is None or number < end):
+            moved = False
+            for runs in self.sources.itervalues():
+                run_end = runs.run_end(number)
+                if run_end > number:
+                    segment, timestamp, duration, discontinuity = runs.lookup(number)
+                    if not covering or covering[-1][2] != duration:
+                        covering.append((number, int(timestamp), duration, 0))
+                    number, moved = run_end, True
+                    if end is not None and number >= end:
+                        return covering, end
+        return covering, number
@@ -0,0 +1,181 @@
+'''
+Created on 18 Oct 2026
+
+@author: wallace
+'''
+import struct
+
+_BOX_HEADER = struct.Struct('>I4s')
+_U8         = struct.Struct('>B')
+_U32        = struct.Struct('>I')
+_U64        = struct.Struct('>Q')
+_FULL_BOX   = struct.Struct('>B3s')
+_ABST_HEAD  = struct.Struct('>IBIQQ')
+_SEG_RUN    = struct.Struct('>II')
+_FRAG_RUN   = struct.Struct('>IQI')
+
+class BootstrapParseError(Exception):
+    pass
+
+class BootstrapParser(object):
+
+    # Parses the abst box in a bootstrap (or fragment) held in a str,
+    # buffer or memoryview. Fields are unpacked in place, nothing but
+    # the short strings is copied. The run tables are returned as lists of
+    # tuples:
+    #   segment run:  (first segment, fragments per segment)
+    #   fragment run: (first fragment, timestamp, duration, discontinuity)
+    @staticmethod
+    def parse(data):
+        end = len(data)
+        pos = 0
+        while pos < end:
+            size, box_type, body = BootstrapParser.read_box_header(data, pos, end)
+            if box_type == 'abst':
+                return BootstrapParser.parse_abst(data, body, pos + size)
+            pos += size
+        raise BootstrapParseError('No abst box found')
+
+    # Returns (size, type, body offset) for the box starting at pos
+    @staticmethod
+    def read_box_header(data, pos, end):
+        if end - pos < 8:
+            raise BootstrapParseError('Truncated box header at offset %d' % pos)
+        size, box_type = _BOX_HEADER.unpack_from(data, pos)
+        body = pos + 8
+        if size == 1:
+            size = BootstrapParser._unpack(_U64, data, body, end)[0]
+            body += 8
+        elif size == 0:
+            size = end - pos
+        if size < body - pos or pos + size > end:
+            raise BootstrapParseError('Bad %s box size %d at offset %d' % (box_type, size, pos))
+        return size, box_type, body
+
+    @staticmethod
+    def parse_abst(data, pos, end):
+        pos += _FULL_BOX.size
+        version, flags, time_scale, current_media_time, smpte_offset = \
+            BootstrapParser._unpack(_ABST_HEAD, data, pos, end)
+        pos += _ABST_HEAD.size
+
+        movie_identifier, pos = BootstrapParser._read_string(data, pos, end)
+        servers, pos          = BootstrapParser._read_strings(data, pos, end)
+        quality, pos          = BootstrapParser._read_strings(data, pos, end)
+        drm_data, pos         = BootstrapParser._read_string(data, pos, end)
+        metadata, pos         = BootstrapParser._read_string(data, pos, end)
+
+        segment_run_tables = []
+        count = BootstrapParser._unpack(_U8, data, pos, end)[0]
+        pos += 1
+        for i in xrange(count):
+            size, box_type, body = BootstrapParser.read_box_header(data, pos, end)
+            if box_type != 'asrt':
+                raise BootstrapParseError("Expected 'asrt', got '%s'" % box_type)
+            segment_run_tables.append(BootstrapParser.parse_asrt(data, body, pos + size))
+            pos += size
+
+        fragment_run_tables = []
+        count = BootstrapParser._unpack(_U8, data, pos, end)[0]
+        pos += 1
+        for i in xrange(count):
+            size, box_type, body = BootstrapParser.read_box_header(data, pos, end)
+            if box_type != 'afrt':
+                raise BootstrapParseError("Expected 'afrt', got '%s'" % box_type)
+            fragment_run_tables.append(BootstrapParser.parse_afrt(data, body, pos + size))
+            pos += size
+
+        return {'version': version,
+                'profile': flags >> 6,
+                'live': (flags & 0x20) != 0,
+                'update': (flags & 0x10) != 0,
+                'time_scale': time_scale,
+                'current_media_time': current_media_time,
+                'smpte_timecode_offset': smpte_offset,
+                'movie_identifier': movie_identifier,
+                'servers': servers,
+                'quality': quality,
+                'drm_data': drm_data,
+                'metadata': metadata,
+                'segment_run_tables': segment_run_tables,
+                'fragment_run_tables': fragment_run_tables}
+
+    @staticmethod
+    def parse_asrt(data, pos, end):
+        flags = BootstrapParser._unpack(_FULL_BOX, data, pos, end)[1]
+        pos += _FULL_BOX.size
+        quality, pos = BootstrapParser._read_strings(data, pos, end)
+        count = BootstrapParser._unpack(_U32, data, pos, end)[0]
+        pos += 4
+        if pos + count * _SEG_RUN.size > end:
+            raise BootstrapParseError('Truncated segment run table at offset %d' % pos)
+        runs = []
+        unpack_from = _SEG_RUN.unpack_from
+        for i in xrange(count):
+            runs.append(unpack_from(data, pos))
+            pos += _SEG_RUN.size
+        return {'update': flags[2] == '\x01',
+                'quality': quality,
+                'runs': runs}
+
+    @staticmethod
+    def parse_afrt(data, pos, end):
+        flags = BootstrapParser._unpack(_FULL_BOX, data, pos, end)[1]
+        pos += _FULL_BOX.size
+        timescale = BootstrapParser._unpack(_U32, data, pos, end)[0]
+        pos += 4
+        quality, pos = BootstrapParser._read_strings(data, pos, end)
+        count = BootstrapParser._unpack(_U32, data, pos, end)[0]
+        pos += 4
+        runs = []
+        unpack_from = _FRAG_RUN.unpack_from
+        for i in xrange(count):
+            if pos + _FRAG_RUN.size > end:
+                raise BootstrapParseError('Truncated fragment run table at offset %d' % pos)
+            first, timestamp, duration = unpack_from(data, pos)
+            pos += _FRAG_RUN.size
+            discontinuity = 0
+            # A zero duration entry carries a discontinuity indicator
+            if duration == 0:
+                discontinuity = BootstrapParser._unpack(_U8, data, pos, end)[0]
+                pos += 1
+            runs.append((first, timestamp, duration, discontinuity))
+        return {'update': flags[2] == '\x01',
+                'timescale': timescale,
+                'quality': quality,
+                'runs': runs}
+
+    @staticmethod
+    def _unpack(fmt, data, pos, end):
+        if pos + fmt.size > end:
+            raise BootstrapParseError('Truncated read at offset %d' % pos)
+        return fmt.unpack_from(data, pos)
+
+    # Reads a NUL terminated string, returns (string, new offset)
+    @staticmethod
+    def _read_string(data, pos, end):
+        start = pos
+        if isinstance(data, str):
+            pos = data.find('\x00', pos, end)
+            if pos < 0:
+                raise BootstrapParseError('Unterminated string at offset %d' % start)
+        else:
+            while pos < end and data[pos] != '\x00':
+                pos += 1
+            if pos == end:
+                raise BootstrapParseError('Unterminated string at offset %d' % start)
+        # A buffer slices to a str, a memoryview to another memoryview
+        string = data[start:pos]
+        if isinstance(string, memoryview):
+            string = string.tobytes()
+        return string, pos + 1
+
+    @staticmethod
+    def _read_strings(data, pos, end):
+        count = BootstrapParser._unpack(_U8, data, pos, end)[0]
+        pos += 1
+        strings = []
+        for i in xrange(count):
+            value, pos = BootstrapParser._read_string(data, pos, end)
+            strings.append(value)
+        return strings, pos
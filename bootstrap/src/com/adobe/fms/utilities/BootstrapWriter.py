@@ -0,0 +1,88 @@
+'''
+Created on 18 Oct 2026
+
+@author: wallace
+'''
+import struct
+
+_BOX_HEADER = struct.Struct('>I4s')
+_U8         = struct.Struct('>B')
+_U32        = struct.Struct('>I')
+_FULL_BOX   = struct.Struct('>B3s')
+_ABST_HEAD  = struct.Struct('>IBIQQ')
+_SEG_RUN    = struct.Struct('>II')
+_FRAG_RUN   = struct.Struct('>IQI')
+
+class BootstrapWriter(object):
+
+    # The inverse of BootstrapParser: builds a bootstrap from the dict
+    # BootstrapParser.parse returns, so parse(write(b)) == b. Missing
+    # keys take the values a live FMS bootstrap would have.
+    @staticmethod
+    def write(bootstrap):
+        get = bootstrap.get
+        flags = ((get('profile', 0) & 0x03) << 6) | \
+                (get('live', False) and 0x20 or 0) | \
+                (get('update', False) and 0x10 or 0)
+        parts = [_FULL_BOX.pack(0, '\x00\x00\x00'),
+                 _ABST_HEAD.pack(get('version', 1), flags, get('time_scale', 1000),
+                                 get('current_media_time', 0), get('smpte_timecode_offset', 0)),
+                 BootstrapWriter._string(get('movie_identifier', '')),
+                 BootstrapWriter._strings(get('servers', [])),
+                 BootstrapWriter._strings(get('quality', [])),
+                 BootstrapWriter._string(get('drm_data', '')),
+                 BootstrapWriter._string(get('metadata', ''))]
+
+        tables = get('segment_run_tables', [])
+        parts.append(_U8.pack(len(tables)))
+        for table in tables:
+            parts.append(BootstrapWriter.write_asrt(table))
+
+        tables = get('fragment_run_tables', [])
+        parts.append(_U8.pack(len(tables)))
+        for table in tables:
+            parts.append(BootstrapWriter.write_afrt(table))
+
+        return BootstrapWriter.box('abst', ''.join(parts))
+
+    @staticmethod
+    def write_asrt(table):
+        runs = table['runs']
+        parts = [BootstrapWriter._full_box(table.get('update', False)),
+                 BootstrapWriter._strings(table.get('quality', [])),
+                 _U32.pack(len(runs))]
+        pack = _SEG_RUN.pack
+        for first, frags in runs:
+            parts.append(pack(first, frags))
+        return BootstrapWriter.box('asrt', ''.join(parts))
+
+    @staticmethod
+    def write_afrt(table):
+        runs = table['runs']
+        parts = [BootstrapWriter._full_box(table.get('update', False)),
+                 _U32.pack(table.get('timescale', 1000)),
+                 BootstrapWriter._strings(table.get('quality', [])),
+                 _U32.pack(len(runs))]
+        pack = _FRAG_RUN.pack
+        for first, timestamp, duration, discontinuity in runs:
+            parts.append(pack(first, timestamp, duration))
+            # Only a zero duration entry carries the discontinuity indicator
+            if duration == 0:
+                parts.append(_U8.pack(discontinuity))
+        return BootstrapWriter.box('afrt', ''.join(parts))
+
+    @staticmethod
+    def box(box_type, payload):
+        return _BOX_HEADER.pack(len(payload) + _BOX_HEADER.size, box_type) + payload
+
+    @staticmethod
+    def _full_box(update):
+        return _FULL_BOX.pack(0, update and '\x00\x00\x01' or '\x00\x00\x00')
+
+    @staticmethod
+    def _string(value):
+        return value + '\x00'
+
+    @staticmethod
+    def _strings(values):
+        return _U8.pack(len(values)) + ''.join(value + '\x00' for value in values)
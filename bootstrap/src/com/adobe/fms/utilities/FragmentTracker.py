@@ -0,0 +1,143 @@
+'''
+Created on 18 Oct 2026
+
+@author: wallace
+'''
+from array import array
+
+# Slot states
+ABSENT  = 0
+PENDING = 1
+PULLED  = 2
+
+class FragmentTracker(object):
+
+    # Tracks the fragments seen for one stream. Fragments are held in
+    # slots indexed by (fragment number - first), so membership and
+    # updates are O(1) and pending fragments come out in fragment order.
+    # Only the newest 'retention' fragments are kept.
+    def __init__(self, retention=300):
+        self.retention      = retention
+        self.first          = None
+        self.state          = bytearray()
+        self.segment        = array('I')
+        self.duration       = array('I')
+        self.discontinuity  = array('B')
+        # Lowest slot that may still be pending
+        self.cursor         = 0
+        self.count          = 0
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, fragment):
+        slot = self._slot(fragment)
+        return slot is not None and self.state[slot] != ABSENT
+
+    def __iter__(self):
+        for slot in xrange(len(self.state)):
+            if self.state[slot] != ABSENT:
+                yield self._entry(slot)
+
+    @property
+    def last_fragment(self):
+        if self.first is None:
+            return None
+        return self.first + len(self.state) - 1
+
+    # Returns the slot for a fragment, or None if outside the window
+    def _slot(self, fragment):
+        if self.first is None:
+            return None
+        slot = fragment - self.first
+        if slot < 0 or slot >= len(self.state):
+            return None
+        return slot
+
+    def _entry(self, slot):
+        return {'segment': self.segment[slot],
+                'fragment': self.first + slot,
+                'duration': self.duration[slot],
+                'discontinuity': self.discontinuity[slot],
+                'pulled': self.state[slot] == PULLED}
+
+    def get(self, fragment):
+        slot = self._slot(fragment)
+        if slot is None or self.state[slot] == ABSENT:
+            return None
+        return self._entry(slot)
+
+    # Add a fragment as pending. Returns False if the fragment is already
+    # known or too old for the retention window
+    def add(self, segment, fragment, duration, discontinuity=0):
+        if self.first is None:
+            self.first = fragment
+
+        slot = fragment - self.first
+        if slot < 0:
+            return False
+
+        gap = slot - len(self.state) + 1
+        if gap > 0:
+            # Open empty slots up to the new fragment
+            if gap > self.retention:
+                self.reset(fragment)
+                slot = 0
+                gap  = 1
+            self.state.extend('\x00' * gap)
+            self.segment.extend([0] * gap)
+            self.duration.extend([0] * gap)
+            self.discontinuity.extend([0] * gap)
+        elif self.state[slot] != ABSENT:
+            return False
+
+        self.state[slot]         = PENDING
+        self.segment[slot]       = segment
+        self.duration[slot]      = duration
+        self.discontinuity[slot] = discontinuity
+        self.count += 1
+        if slot < self.cursor:
+            self.cursor = slot
+
+        self._trim()
+        return True
+
+    def mark_pulled(self, fragment):
+        slot = self._slot(fragment)
+        if slot is not None and self.state[slot] == PENDING:
+            self.state[slot] = PULLED
+
+    # Returns the pending fragments in order and marks them as pulled
+    def take_pending(self):
+        pending = []
+        state = self.state
+        for slot in xrange(self.cursor, len(state)):
+            if state[slot] == PENDING:
+                state[slot] = PULLED
+                pending.append(self._entry(slot))
+        self.cursor = len(state)
+        return pending
+
+    # Forget everything, e.g. when a stream restarts below the window
+    def reset(self, first=None):
+        self.first          = first
+        self.state          = bytearray()
+        self.segment        = array('I')
+        self.duration       = array('I')
+        self.discontinuity  = array('B')
+        self.cursor         = 0
+        self.count          = 0
+
+    # Drop the oldest slots once the window has grown a quarter past the
+    # retention size, so the copy is amortised over many fragments
+    def _trim(self):
+        excess = len(self.state) - self.retention
+        if excess <= 0 or excess < max(self.retention / 4, 1):
+            return
+        self.count -= excess - self.state.count('\x00', 0, excess)
+        del self.state[:excess]
+        del self.segment[:excess]
+        del self.duration[:excess]
+        del self.discontinuity[:excess]
+        self.first += excess
+        self.cursor = max(self.cursor - excess, 0)
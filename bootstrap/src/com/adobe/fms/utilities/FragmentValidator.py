@@ -0,0 +1,147 @@
+'''
+Created on 18 Oct 2026
+
+@author: wallace
+'''
+import struct
+from com.adobe.fms.utilities.BootstrapParser import BootstrapParser, BootstrapParseError
+
+_BOX_HEADER = struct.Struct('>I4s')
+_U64        = struct.Struct('>Q')
+
+# Top level boxes whose body is kept (up to max_box bytes) and checked
+CAPTURED    = ('abst',)
+
+class FragmentValidator(object):
+
+    # Checks an F4F fragment as it is downloaded. feed() takes the
+    # response body in chunks of any size; box headers are parsed as they
+    # go by and box bodies are skipped, except the abst which is kept (at
+    # most max_box bytes) to check the fragment against what the stream
+    # bootstrap said: the fragment number, its duration and segment.
+    # finish() returns the list of problems found, empty for a good one.
+    def __init__(self, fragment=None, duration=None, segment=None, max_box=65536):
+        self.fragment   = fragment
+        self.duration   = duration
+        self.segment    = segment
+        self.max_box    = max_box
+
+        self.header     = ''
+        self.header_len = _BOX_HEADER.size
+        self.header_at  = 0
+        self.box_type   = None
+        self.remaining  = 0
+        self.to_end     = False
+        self.capture    = None
+        self.broken     = False
+
+        self.boxes      = []
+        self.bytes      = 0
+        self.errors     = []
+
+    def feed(self, chunk):
+        pos = 0
+        end = len(chunk)
+        self.bytes += end
+        while pos < end and not self.broken:
+            if self.to_end or self.remaining:
+                take = end - pos
+                if not self.to_end:
+                    take = min(take, self.remaining)
+                    self.remaining -= take
+                if self.capture is not None:
+                    self.capture.append(chunk[pos:pos + take])
+                pos += take
+                if not self.to_end and self.remaining == 0:
+                    self._end_box()
+                continue
+
+            if not self.header:
+                self.header_at = self.bytes - end + pos
+            take = min(self.header_len - len(self.header), end - pos)
+            self.header += chunk[pos:pos + take]
+            pos += take
+            if len(self.header) == self.header_len:
+                self._start_box()
+
+    def _start_box(self):
+        size, box_type = _BOX_HEADER.unpack_from(self.header)
+        if size == 1 and self.header_len == _BOX_HEADER.size:
+            # 64 bit size follows the type
+            self.header_len += _U64.size
+            return
+        if size == 1:
+            size = _U64.unpack_from(self.header, _BOX_HEADER.size)[0]
+        header_len, self.header, self.header_len = self.header_len, '', _BOX_HEADER.size
+
+        if not box_type.isalnum():
+            self.errors.append('not an F4F fragment, no box header at offset %d' % self.header_at)
+            self.broken = True
+            return
+        if len(self.boxes) < 32:
+            self.boxes.append(box_type)
+        self.box_type = box_type
+        if size == 0:
+            # Runs to the end of the fragment
+            self.to_end = True
+        elif size < header_len:
+            self.errors.append('bad %s box size %d' % (box_type, size))
+            self.broken = True
+            return
+        self.remaining = size and size - header_len or 0
+        self.capture = None
+        if box_type in CAPTURED:
+            if self.to_end or self.remaining > self.max_box:
+                self.errors.append('%s box of %d bytes is too large to check' % (box_type, self.remaining))
+            else:
+                self.capture = []
+        if not self.to_end and self.remaining == 0:
+            self._end_box()
+
+    def _end_box(self):
+        if self.capture is not None:
+            body = ''.join(self.capture)
+            self.capture = None
+            if self.box_type == 'abst':
+                self._check_abst(body)
+
+    def _check_abst(self, body):
+        try:
+            abst = BootstrapParser.parse_abst(body, 0, len(body))
+        except BootstrapParseError, error:
+            self.errors.append('bad abst box: %s' % error)
+            return
+        segments = abst['segment_run_tables'] and abst['segment_run_tables'][0]['runs']
+        fragments = [run for run in abst['fragment_run_tables'] and abst['fragment_run_tables'][0]['runs'] or []
+                     if run[2]]
+        if not segments or not fragments:
+            self.errors.append('abst box has no run tables')
+            return
+        if self.segment is not None and segments[-1][0] != self.segment:
+            self.errors.append('segment %d, expected %d' % (segments[-1][0], self.segment))
+        # The fragment the abst describes is its newest, worked out as
+        # hds.extract_fragments does for a live bootstrap
+        frags = 0
+        for segment in segments:
+            frags += segment[1]
+        first, timestamp, duration, discontinuity = fragments[-1]
+        newest = frags - (first - fragments[0][0]) + first - 1
+        if self.fragment is not None and newest != self.fragment:
+            self.errors.append('fragment %d, expected %d' % (newest, self.fragment))
+        if self.duration and duration != self.duration:
+            self.errors.append('fragment duration %d, expected %d' % (duration, self.duration))
+
+    # Call once the response has ended; returns the problems found
+    def finish(self):
+        if not self.broken:
+            if self.header:
+                self.errors.append('truncated box header at offset %d' % self.header_at)
+            elif self.remaining:
+                self.errors.append('%s box truncated, %d bytes missing' % (self.box_type, self.remaining))
+            elif self.to_end:
+                self._end_box()
+        if not self.bytes:
+            self.errors.append('empty fragment')
+        elif 'mdat' not in self.boxes:
+            self.errors.append('no mdat box')
+        return self.errors
@@ -0,0 +1,301 @@
+'''
+Created on 18 Oct 2026
+
+@author: wallace
+'''
+import httplib
+import re
+import threading
+import time
+from array import array
+from urlparse import urlsplit
+from com.adobe.fms.utilities.FragmentValidator import FragmentValidator
+from com.adobe.fms.utilities.WorkerPool import WorkerPool
+from com.adobe.fms.settings import settings
+
+READ_SIZE = 65536
+
+# Distinct validation errors kept per fragment run
+MAX_ERRORS = 5
+
+_SEGMENT = re.compile(r'Seg(\d+)-Frag\d+$')
+
+class ConnectionPool(object):
+
+    # Keep-alive HTTP connections to one host, shared by every fragment
+    # request made for the same stream
+    def __init__(self, scheme, host, port, max_idle=10, timeout=30):
+        self.scheme     = scheme
+        self.host       = host
+        self.port       = port
+        self.max_idle   = max_idle
+        self.timeout    = timeout
+        self.idle       = []
+        self.lock       = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            if self.idle:
+                return self.idle.pop()
+        if self.scheme == 'https':
+            return httplib.HTTPSConnection(self.host, self.port, timeout=self.timeout)
+        return httplib.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def release(self, conn):
+        with self.lock:
+            if len(self.idle) < self.max_idle:
+                self.idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for conn in idle:
+            conn.close()
+
+class LoadEngine(object):
+
+    pools       = {}
+    pools_lock  = threading.Lock()
+
+    # Threads the requests of every fragment run are made on
+    workers     = WorkerPool(settings.load_threads)
+
+    # Returns the pool for the stream a fragment URL belongs to. Fragment
+    # URLs only differ in the trailing SegN-FragM so the key is the
+    # host plus the stream path
+    @staticmethod
+    def get_pool(url, concurrency):
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.netloc, parts.path.rsplit('/', 1)[0])
+        with LoadEngine.pools_lock:
+            pool = LoadEngine.pools.get(key)
+            if pool is None:
+                pool = ConnectionPool(parts.scheme, parts.hostname, parts.port, concurrency)
+                LoadEngine.pools[key] = pool
+            elif pool.max_idle < concurrency:
+                pool.max_idle = concurrency
+        return pool
+
+    # Issue one GET on a pooled connection. Returns
+    # (connect, ttfb, total, bytes, status, errors) with times in seconds,
+    # a status of 0 for a failed request and the problems the validator
+    # found in a 200 response (None without a validator). The body is read
+    # in READ_SIZE chunks and never held whole. A pooled connection may
+    # have been closed by the server while idle, so a request that fails
+    # on one before any response arrives is retried on a fresh connection
+    @staticmethod
+    def fetch(pool, path, validator=None):
+        start   = time.time()
+        for attempt in (0, 1):
+            connect = 0.0
+            nbytes  = 0
+            conn    = pool.acquire()
+            reused  = conn.sock is not None
+            response = None
+            try:
+                if not reused:
+                    conn.connect()
+                    connect = time.time() - start
+                conn.request('GET', path)
+                response = conn.getresponse()
+                ttfb = time.time() - start
+                if response.status != 200:
+                    validator = None
+                while True:
+                    chunk = response.read(READ_SIZE)
+                    if not chunk:
+                        break
+                    nbytes += len(chunk)
+                    if validator is not None:
+                        validator.feed(chunk)
+                total = time.time() - start
+            except (httplib.HTTPException, IOError):
+                conn.close()
+                if reused and response is None and attempt == 0:
+                    continue
+                return connect, 0.0, time.time() - start, nbytes, 0, None
+            break
+
+        if response.will_close:
+            conn.close()
+        else:
+            pool.release(conn)
+        return connect, ttfb, total, nbytes, response.status, validator and validator.finish()
+
+    # Requests a fragment until it is served, retrying every retry seconds
+    # while it 404s and up to deadline. Returns (first request, first 200,
+    # 404s before it, last status) with time.time() stamps; the first 200
+    # is when its response headers arrived, None if it never came
+    @staticmethod
+    def first_available(pool, path, deadline, retry=0.02):
+        first = None
+        not_found = 0
+        while True:
+            start = time.time()
+            if first is None:
+                first = start
+            connect, ttfb, total, nbytes, status, errors = LoadEngine.fetch(pool, path)
+            if status == 200:
+                return first, start + ttfb, not_found, status
+            if status != 404 or time.time() + retry > deadline:
+                return first, None, not_found, status
+            not_found += 1
+            time.sleep(retry)
+
+    # Runs the num_req/concurrency workload against one fragment, the
+    # in-process equivalent of ApacheBench.run. With
+    # settings.validate_fragments every 200 response is checked to be the
+    # fragment frag of duration frag_dur. due, the time the test was
+    # scheduled for, only matters to OpenLoopEngine
+    @staticmethod
+    def run(frag, frag_dur, num_req, concurrency, stream_url, due=None):
+        pool = LoadEngine.get_pool(stream_url, concurrency)
+        parts = urlsplit(stream_url)
+        path = parts.path + (parts.query and '?' + parts.query or '')
+        validate = settings.validate_fragments
+        segment = _SEGMENT.search(parts.path)
+        segment = segment and int(segment.group(1))
+
+        result = {'url':     stream_url,
+                  'connect': array('d'),
+                  'ttfb':    array('d'),
+                  'total':   array('d'),
+                  'bytes':   array('L'),
+                  'status':  array('H'),
+                  'invalid': array('B'),
+                  'errors':  []}
+        lock = threading.Lock()
+        remaining = [num_req]
+
+        def worker():
+            while True:
+                with lock:
+                    if remaining[0] <= 0:
+                        return
+                    remaining[0] -= 1
+                validator = validate and FragmentValidator(frag and int(frag), frag_dur and int(frag_dur), segment) or None
+                connect, ttfb, total, nbytes, status, errors = LoadEngine.fetch(pool, path, validator)
+                with lock:
+                    result['connect'].append(connect)
+                    result['ttfb'].append(ttfb)
+                    result['total'].append(total)
+                    result['bytes'].append(nbytes)
+                    result['status'].append(status)
+                    result['invalid'].append(errors and 1 or 0)
+                    for error in errors or ():
+                        if error not in result['errors'] and len(result['errors']) < MAX_ERRORS:
+                            result['errors'].append(error)
+
+        start = time.time()
+        LoadEngine.workers.run(worker, max(min(concurrency, num_req), 1))
+        result['time_taken'] = time.time() - start
+        return result
+
+    @staticmethod
+    def get_time_taken(result, debug = False):
+        if debug is True:
+            print 'Time taken for tests: %.3f seconds' % result['time_taken']
+        return result['time_taken']
+
+    @staticmethod
+    def get_total_requests(result, debug = False):
+        complete = len(result['status']) - result['status'].count(0)
+        if debug is True:
+            print 'Complete requests: %d' % complete
+        return complete
+
+    @staticmethod
+    def get_requests_per_second(result, debug = False):
+        if result['time_taken'] <= 0:
+            return 0
+        rps = LoadEngine.get_total_requests(result) / result['time_taken']
+        if debug is True:
+            print 'Requests per second: %.2f [#/sec] (mean)' % rps
+        return rps
+
+    # Mean request latency in msec
+    @staticmethod
+    def get_latency(result, debug = False):
+        if not result['total']:
+            return 0
+        latency = sum(result['total']) * 1000 / len(result['total'])
+        if debug is True:
+            print 'Time per request: %.3f [ms] (mean)' % latency
+        return latency
+
+    # Latency in msec of every completed request
+    @staticmethod
+    def get_latencies(result):
+        return [total * 1000 for total, status in zip(result['total'], result['status']) if status != 0]
+
+    # Mean time to the response headers in msec
+    @staticmethod
+    def get_ttfb(result, debug = False):
+        ttfb = [t for t, status in zip(result['ttfb'], result['status']) if status != 0]
+        if not ttfb:
+            return 0
+        mean = sum(ttfb) * 1000 / len(ttfb)
+        if debug is True:
+            print 'Time to first byte: %.3f [ms] (mean)' % mean
+        return mean
+
+    # Bytes per second while the bodies were being received, headers
+    # excluded
+    @staticmethod
+    def get_transfer_rate(result, debug = False):
+        nbytes = 0
+        receiving = 0.0
+        for ttfb, total, size, status in zip(result['ttfb'], result['total'], result['bytes'], result['status']):
+            if status != 0:
+                nbytes += size
+                receiving += total - ttfb
+        rate = receiving > 0 and nbytes / receiving or 0
+        if debug is True:
+            print 'Transfer rate: %.2f [bytes/sec]' % rate
+        return rate
+
+    # Body bytes received
+    @staticmethod
+    def get_total_bytes(result, debug = False):
+        nbytes = sum(result['bytes'])
+        if debug is True:
+            print 'Total transferred: %d bytes' % nbytes
+        return nbytes
+
+    # Responses that were not the expected fragment, None if not validated
+    @staticmethod
+    def get_validation_failures(result, debug = False):
+        if not settings.validate_fragments:
+            return None
+        failures = result['invalid'].count(1)
+        if debug is True:
+            print 'Invalid fragments: %d %s' % (failures, '; '.join(result['errors']))
+        return failures
+
+    @staticmethod
+    def get_validation_errors(result):
+        return result['errors']
+
+    # Closed loop, there is no schedule to fall behind
+    @staticmethod
+    def get_late_requests(result, debug = False):
+        return None
+
+    @staticmethod
+    def get_non_2xx_responses(result, debug = False):
+        non_2xx = 0
+        for status in result['status']:
+            if status != 0 and (status < 200 or status > 299):
+                non_2xx += 1
+        if debug is True:
+            print 'Non-2xx responses: %d' % non_2xx
+        return non_2xx
+
+    @staticmethod
+    def get_failed_requests(result, debug = False):
+        failed = result['status'].count(0)
+        if debug is True:
+            print 'Failed requests: %d' % failed
+        return failed
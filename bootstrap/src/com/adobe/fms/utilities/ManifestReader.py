@@ -0,0 +1,116 @@
+'''
+Created on 18 Oct 2026
+
+@author: wallace
+'''
+from base64 import decodestring
+from cStringIO import StringIO
+try:
+    from xml.etree import cElementTree as ElementTree
+except ImportError:
+    from xml.etree import ElementTree
+
+# Tag name without the f4m namespace
+def _local(tag):
+    return tag.rsplit('}', 1)[-1]
+
+class BootstrapInfo(object):
+
+    # A bootstrapInfo element. An embedded bootstrap is kept base64 encoded
+    # until data is first asked for; data is None for one given by url
+    __slots__ = ('id', 'profile', 'url', 'encoded', '_data')
+
+    def __init__(self, id, profile, url, encoded):
+        self.id         = id
+        self.profile    = profile
+        self.url        = url
+        self.encoded    = encoded
+        self._data      = None
+
+    @property
+    def data(self):
+        if self._data is None and self.encoded:
+            self._data = decodestring(self.encoded)
+            self.encoded = None
+        return self._data
+
+class MediaEntry(object):
+
+    # A media element: the attributes plus a link back to the reader for
+    # the bootstrapInfo it refers to
+    __slots__ = ('bitrate', 'href', 'url', 'stream_id', 'bootstrap_info_id', 'reader')
+
+    def __init__(self, reader, attrib):
+        self.bitrate            = attrib.get('bitrate')
+        self.href               = attrib.get('href')
+        self.url                = attrib.get('url')
+        self.stream_id          = attrib.get('streamId')
+        self.bootstrap_info_id  = attrib.get('bootstrapInfoId')
+        self.reader             = reader
+
+    @property
+    def bootstrap_info(self):
+        return self.reader.bootstrap_info(self.bootstrap_info_id)
+
+    # The embedded bootstrap for this rendition, decoded on first use
+    def bootstrap(self):
+        info = self.bootstrap_info
+        return info is not None and info.data or None
+
+class ManifestReader(object):
+
+    # Event driven f4m reader. Elements are handled as they close and then
+    # dropped, so memory stays flat however many media entries there are;
+    # only the (still encoded) bootstrapInfo elements are kept. source is
+    # the manifest text or a file-like object.
+    def __init__(self, source):
+        if isinstance(source, basestring):
+            source = StringIO(source)
+        self.source     = source
+        self.base_url   = None
+        self.bootstraps = {}
+        self.first      = None
+
+    # Yields ('bootstrapInfo', BootstrapInfo) and ('media', MediaEntry)
+    # in document order
+    def entries(self):
+        root = None
+        for event, elem in ElementTree.iterparse(self.source, ('start', 'end')):
+            if event == 'start':
+                if root is None:
+                    root = elem
+                continue
+            tag = _local(elem.tag)
+            if tag == 'media':
+                yield 'media', MediaEntry(self, elem.attrib)
+            elif tag == 'bootstrapInfo':
+                info = BootstrapInfo(elem.get('id'), elem.get('profile'), elem.get('url'),
+                                     (elem.text or '').strip() or None)
+                self.bootstraps[info.id] = info
+                if self.first is None:
+                    self.first = info
+                yield 'bootstrapInfo', info
+            elif tag == 'baseURL':
+                self.base_url = (elem.text or '').strip()
+            else:
+                continue
+            # Top level element done with, free it and anything before it
+            elem.clear()
+            root.clear()
+
+    def media(self):
+        for kind, entry in self.entries():
+            if kind == 'media':
+                yield entry
+
+    def bootstrap_infos(self):
+        for kind, entry in self.entries():
+            if kind == 'bootstrapInfo':
+                yield entry
+
+    # A media entry without bootstrapInfoId uses the manifest's only (or
+    # first) bootstrapInfo
+    def bootstrap_info(self, id):
+        if id is None:
+            return self.first
+        return self.bootstraps.get(id)
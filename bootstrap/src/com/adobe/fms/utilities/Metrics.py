@@ -0,0 +1,174 @@
+'''
+Created on 18 Oct 2026
+
+@author: wallace
+'''
+import json
+import threading
+import time
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from SocketServer import ThreadingMixIn
+from com.adobe.fms.utilities.statistics import PERCENTILES
+
+# Prefix of every exported metric name
+PREFIX = 'hds_'
+
+class Metrics(object):
+
+    # In-memory counters, gauges and latency summaries of a running test.
+    # inc() is the hot path: each thread counts into its own dict without
+    # taking a lock and snapshot() adds them up. Everything else is read
+    # at scrape time from functions registered with register(), which
+    # return a number or {stream: number} (for a 'summary', {stream:
+    # LatencyHistogram}). Snapshots of other processes are merged in
+    # with update() and exported with a source label.
+    def __init__(self):
+        self.local      = threading.local()
+        self.threads    = []
+        self.lock       = threading.Lock()
+        self.collectors = []
+        self.sources    = {}
+        self.started    = time.time()
+
+    def _counters(self):
+        counters = getattr(self.local, 'counters', None)
+        if counters is None:
+            counters = self.local.counters = {}
+            with self.lock:
+                self.threads.append(counters)
+        return counters
+
+    def inc(self, name, stream='', amount=1):
+        counters = self._counters()
+        key = (name, stream)
+        counters[key] = counters.get(key, 0) + amount
+
+    # kind is 'counter', 'gauge' or 'summary'
+    def register(self, name, kind, function):
+        with self.lock:
+            self.collectors.append((name, kind, function))
+
+    # Latest snapshot of another process, e.g. a worker or an agent
+    def update(self, source, snapshot):
+        with self.lock:
+            self.sources[source] = snapshot
+
+    # Returns {'counter': {name: {stream: value}}, 'gauge': {...}} and,
+    # with summaries, {'summary': {name: {stream: histogram}}}. Without
+    # summaries the snapshot is plain data that can be sent to another
+    # process
+    def snapshot(self, summaries=True):
+        with self.lock:
+            threads = list(self.threads)
+            collectors = list(self.collectors)
+        result = {'counter': {}, 'gauge': {}}
+        if summaries:
+            result['summary'] = {}
+        for counters in threads:
+            for (name, stream), value in counters.items():
+                series = result['counter'].setdefault(name, {})
+                series[stream] = series.get(stream, 0) + value
+        for name, kind, function in collectors:
+            if kind not in result:
+                continue
+            value = function()
+            if not isinstance(value, dict):
+                value = {'': value}
+            result[kind][name] = value
+        return result
+
+    # Prometheus text exposition format
+    def prometheus(self):
+        local = self.snapshot()
+        with self.lock:
+            sources = sorted(self.sources.items())
+        lines = []
+        for kind in ('counter', 'gauge'):
+            names = set(local[kind])
+            for source, snapshot in sources:
+                names.update(snapshot.get(kind, {}))
+            for name in sorted(names):
+                metric = PREFIX + name + (kind == 'counter' and '_total' or '')
+                lines.append('# TYPE %s %s\n' % (metric, kind))
+                for stream, value in sorted(local[kind].get(name, {}).iteritems()):
+                    lines.append('%s%s %s\n' % (metric, _labels(stream), _number(value)))
+                for source, snapshot in sources:
+                    for stream, value in sorted(snapshot.get(kind, {}).get(name, {}).iteritems()):
+                        lines.append('%s%s %s\n' % (metric, _labels(stream, source), _number(value)))
+        for name in sorted(local['summary']):
+            metric = PREFIX + name
+            lines.append('# TYPE %s summary\n' % metric)
+            for stream, histogram in sorted(local['summary'][name].iteritems()):
+                summary = histogram.summary()
+                for label, pct in PERCENTILES:
+                    lines.append('%s%s %s\n' % (metric, _labels(stream, quantile=pct / 100.0), _number(summary[label])))
+                lines.append('%s_sum%s %s\n' % (metric, _labels(stream), _number(summary['mean'] * summary['count'])))
+                lines.append('%s_count%s %d\n' % (metric, _labels(stream), summary['count']))
+        return ''.join(lines)
+
+    # Compact JSON: the local snapshot with summaries reduced to their
+    # percentiles, and the other processes by source
+    def json(self):
+        local = self.snapshot()
+        local['summary'] = dict((name, dict((stream, histogram.summary()) for stream, histogram in series.iteritems()))
+                                for name, series in local['summary'].iteritems())
+        local['time'] = time.time()
+        local['uptime'] = local['time'] - self.started
+        with self.lock:
+            local['sources'] = dict(self.sources)
+        return json.dumps(local, separators=(',', ':'), sort_keys=True)
+
+def _labels(stream, source=None, quantile=None):
+    labels = []
+    if stream:
+        labels.append('stream="%s"' % _escape(stream))
+    if source is not None:
+        labels.append('source="%s"' % _escape(str(source)))
+    if quantile is not None:
+        labels.append('quantile="%s"' % quantile)
+    return labels and '{' + ','.join(labels) + '}' or ''
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+class MetricsHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+        if path == '/metrics':
+            self.reply(self.server.metrics.prometheus(), 'text/plain; version=0.0.4')
+        elif path == '/metrics.json':
+            self.reply(self.server.metrics.json(), 'application/json')
+        else:
+            self.send_error(404)
+
+    def reply(self, body, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    # Scrapes are not logged
+    def log_message(self, format, *args):
+        pass
+
+class MetricsServer(ThreadingMixIn, HTTPServer):
+
+    # Serves /metrics (Prometheus) and /metrics.json on its own thread
+    daemon_threads = True
+
+    def __init__(self, metrics, address):
+        HTTPServer.__init__(self, address, MetricsHandler)
+        self.metrics = metrics
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self
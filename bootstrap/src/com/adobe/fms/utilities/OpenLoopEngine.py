@@ -0,0 +1,189 @@
+'''
+Created on 18 Oct 2026
+
+@author: wallace
+'''
+import random
+import threading
+import time
+from array import array
+from collections import deque
+from urlparse import urlsplit
+from com.adobe.fms.utilities.LoadEngine import LoadEngine, MAX_ERRORS, _SEGMENT
+from com.adobe.fms.utilities.FragmentValidator import FragmentValidator
+from com.adobe.fms.utilities.WorkerPool import Batch
+from com.adobe.fms.settings import settings
+
+class OpenLoopEngine(LoadEngine):
+
+    # Open-loop alternative to LoadEngine.run: the requests for a fragment
+    # are sent on a schedule fixed up front, settings.open_loop_rate per
+    # second over the fragment's duration with 'poisson' or 'uniform'
+    # arrivals, whether or not earlier requests have been answered. A
+    # slow origin therefore sees the same offered load instead of fewer
+    # requests. The schedule starts at due, the time the test was
+    # scheduled for, so time the task spent queued behind other tests
+    # counts against it. Latency is measured from the intended send time
+    # (corrected for coordinated omission) as well as from the actual one
+    # (raw); a request sent more than settings.open_loop_late_ms after its
+    # intended time fell behind schedule, because the task started late or
+    # open_loop_max_outstanding requests of the fragment were waiting on
+    # a response. The requests run on the LoadEngine worker threads.
+    #
+    # start() only sets the requests up: a Scheduler releases each at its
+    # time and the callback gets the result once the last has answered,
+    # so a test holds no thread while it waits for its schedule. run() is
+    # the blocking form, for the engine interface.
+
+    # Send times in seconds from the start of a run, rate a second over
+    # period seconds
+    @staticmethod
+    def schedule(rate, period, arrivals='poisson'):
+        offsets = array('d')
+        if rate <= 0:
+            return offsets
+        if arrivals == 'uniform':
+            count = max(int(round(rate * period)), 1)
+            for i in xrange(count):
+                offsets.append(i / float(rate))
+            return offsets
+        offset = random.expovariate(rate)
+        while offset < period:
+            offsets.append(offset)
+            offset += random.expovariate(rate)
+        return offsets
+
+    @staticmethod
+    def run(frag, frag_dur, num_req, concurrency, stream_url, due=None):
+        results = []
+        finished = threading.Event()
+        def callback(result):
+            results.append(result)
+            finished.set()
+        OpenLoopEngine.start(frag, frag_dur, stream_url, due, None, callback)
+        while not finished.is_set():
+            finished.wait(1)
+        return results[0]
+
+    # Sends the requests of a fragment on the schedule from due (now if
+    # None), released by scheduler or, without one, by sleeping in the
+    # calling thread, and calls callback(result) when all have answered.
+    # Requests past open_loop_max_outstanding wait for one to answer
+    @staticmethod
+    def start(frag, frag_dur, stream_url, due, scheduler, callback):
+        rate = settings.open_loop_rate
+        period = frag_dur and int(frag_dur) / 1000.0 or 1.0
+        offsets = OpenLoopEngine.schedule(rate, period, settings.open_loop_arrivals)
+        late_after = settings.open_loop_late_ms / 1000.0
+        max_outstanding = max(settings.open_loop_max_outstanding, 1)
+
+        pool = LoadEngine.get_pool(stream_url, max_outstanding)
+        parts = urlsplit(stream_url)
+        path = parts.path + (parts.query and '?' + parts.query or '')
+        validate = settings.validate_fragments
+        segment = _SEGMENT.search(parts.path)
+        segment = segment and int(segment.group(1))
+
+        result = {'url':      stream_url,
+                  'intended': array('d'),
+                  'sent':     array('d'),
+                  'connect':  array('d'),
+                  'ttfb':     array('d'),
+                  'total':    array('d'),
+                  'bytes':    array('L'),
+                  'status':   array('H'),
+                  'invalid':  array('B'),
+                  'errors':   [],
+                  'late':     0}
+        lock = threading.Lock()
+        outstanding = [0]
+        waiting = deque()
+        start = due or time.time()
+
+        def finished():
+            result['time_taken'] = time.time() - start
+            callback(result)
+        batch = Batch(len(offsets), finished)
+
+        def send(intended):
+            try:
+                sent = time.time()
+                validator = validate and FragmentValidator(frag and int(frag), frag_dur and int(frag_dur), segment) or None
+                connect, ttfb, total, nbytes, status, errors = LoadEngine.fetch(pool, path, validator)
+                with lock:
+                    result['intended'].append(intended)
+                    result['sent'].append(sent)
+                    result['connect'].append(connect)
+                    result['ttfb'].append(ttfb)
+                    result['total'].append(total)
+                    result['bytes'].append(nbytes)
+                    result['status'].append(status)
+                    result['invalid'].append(errors and 1 or 0)
+                    if sent - intended > late_after:
+                        result['late'] += 1
+                    for error in errors or ():
+                        if error not in result['errors'] and len(result['errors']) < MAX_ERRORS:
+                            result['errors'].append(error)
+            finally:
+                # The slot goes to the oldest request waiting for one
+                with lock:
+                    following = waiting and waiting.popleft()
+                    if not following:
+                        outstanding[0] -= 1
+                if following:
+                    LoadEngine.workers.submit(send, following)
+                batch.done()
+
+        # A request already due goes out at once, one finding every slot
+        # taken waits for a response; either way it is sent late
+        def release(intended):
+            with lock:
+                if outstanding[0] >= max_outstanding:
+                    waiting.append(intended)
+                    return
+                outstanding[0] += 1
+            LoadEngine.workers.submit(send, intended)
+
+        if not offsets:
+            finished()
+            return
+        for offset in offsets:
+            if scheduler is not None:
+                scheduler.call_at(start + offset, release, start + offset)
+                continue
+            delay = start + offset - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            release(start + offset)
+
+    # Latency in msec of every completed request, from its intended send
+    # time
+    @staticmethod
+    def get_latencies(result):
+        return [(sent - intended + total) * 1000
+                for intended, sent, total, status in zip(result['intended'], result['sent'], result['total'], result['status'])
+                if status != 0]
+
+    # Mean latency in msec from the intended send time
+    @staticmethod
+    def get_latency(result, debug = False):
+        latencies = OpenLoopEngine.get_latencies(result)
+        if not latencies:
+            return 0
+        latency = sum(latencies) / len(latencies)
+        if debug is True:
+            print 'Time per request: %.3f [ms] (mean, from intended send time)' % latency
+        return latency
+
+    # Latency in msec from the actual send time, what a closed-loop
+    # client would have reported
+    @staticmethod
+    def get_raw_latencies(result):
+        return LoadEngine.get_latencies(result)
+
+    # Requests sent behind schedule
+    @staticmethod
+    def get_late_requests(result, debug = False):
+        if debug is True:
+            print 'Requests behind schedule: %d' % result['late']
+        return result['late']
@@ -0,0 +1,121 @@
+'''
+Created on 18 Oct 2026
+
+@author: wallace
+'''
+import hashlib
+import httplib
+import threading
+from urlparse import urlsplit
+from com.adobe.fms.utilities.LoadEngine import ConnectionPool
+
+class PollingClient(object):
+
+    # Polls bootstraps and manifests over persistent per-host connections,
+    # revalidating with If-None-Match / If-Modified-Since. poll() returns
+    # the body when it has changed, None when the origin answered 304 or
+    # sent back the same bytes as last time, and False on error. Only a
+    # digest and the size of the last body are kept per URL.
+    def __init__(self, timeout=10, max_idle=4):
+        self.timeout        = timeout
+        self.max_idle       = max_idle
+        self.pools          = {}
+        self.validators     = {}
+        self.lock           = threading.Lock()
+
+        self.polls          = 0
+        self.not_modified   = 0
+        self.unchanged      = 0
+        self.errors         = 0
+        self.bytes_received = 0
+        self.bytes_saved    = 0
+
+    def _pool(self, parts):
+        key = (parts.scheme, parts.netloc)
+        with self.lock:
+            pool = self.pools.get(key)
+            if pool is None:
+                pool = self.pools[key] = ConnectionPool(parts.scheme, parts.hostname, parts.port,
+                                                        self.max_idle, self.timeout)
+        return pool
+
+    def _request(self, pool, path, headers):
+        # A pooled connection may have been closed by the server while
+        # idle, so retry once on a fresh connection
+        for attempt in (0, 1):
+            conn = pool.acquire()
+            reused = conn.sock is not None
+            try:
+                conn.request('GET', path, headers=headers)
+                response = conn.getresponse()
+                body = response.read()
+            except (httplib.HTTPException, IOError):
+                conn.close()
+                if reused and attempt == 0:
+                    continue
+                raise
+            if response.will_close:
+                conn.close()
+            else:
+                pool.release(conn)
+            return response, body
+
+    def poll(self, url):
+        parts = urlsplit(url)
+        path = parts.path + (parts.query and '?' + parts.query or '')
+
+        with self.lock:
+            self.polls += 1
+            etag, last_modified, last_digest, last_size = self.validators.get(url, (None, None, None, 0))
+
+        headers = {}
+        if last_digest is not None:
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+
+        try:
+            response, body = self._request(self._pool(parts), path, headers)
+        except (httplib.HTTPException, IOError):
+            with self.lock:
+                self.errors += 1
+            return False
+
+        if response.status == 304 and last_digest is not None:
+            with self.lock:
+                self.not_modified += 1
+                self.bytes_saved += last_size
+            return None
+
+        if response.status != 200:
+            with self.lock:
+                self.errors += 1
+            return False
+
+        digest = hashlib.sha1(body).digest()
+        with self.lock:
+            self.bytes_received += len(body)
+            self.validators[url] = (response.getheader('etag'), response.getheader('last-modified'), digest, len(body))
+            if digest == last_digest:
+                self.unchanged += 1
+                return None
+        return body
+
+    # Drop the cached validators so the next poll returns the full body
+    def forget(self, url):
+        with self.lock:
+            self.validators.pop(url, None)
+
+    def stats(self):
+        with self.lock:
+            return {'polls': self.polls,
+                    'not_modified': self.not_modified,
+                    'unchanged': self.unchanged,
+                    'errors': self.errors,
+                    'bytes_received': self.bytes_received,
+                    'bytes_saved': self.bytes_saved}
+
+    def summary(self):
+        return ('Polls: %(polls)d, 304s: %(not_modified)d, unchanged: %(unchanged)d, '
+                'errors: %(errors)d, bytes received: %(bytes_received)d, bytes saved: %(bytes_saved)d' % self.stats())
@@ -0,0 +1,162 @@
+'''
+Created on 18 Oct 2026
+
+@author: wallace
+'''
+import os
+import struct
+import threading
+import time
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Result log: MAGIC, then one fixed-width RECORD per fragment test
+#   RECORD   time, stream id, fragment, mean latency (msec),
+#            requests/sec, requests, errors, bytes
+# Stream names file (log + '.streams'): one name per line, the stream id
+# is its line number from 0
+# Runs file (log + '.runs'): one 'first record, start time' line per run
+# that appended to the log
+MAGIC   = 'HDSRES01'
+RECORD  = struct.Struct('<dIIffIIQ')
+
+# numpy layout of RECORD, for ResultReader
+FIELDS  = [('time', '<f8'), ('stream', '<u4'), ('fragment', '<u4'), ('latency', '<f4'),
+           ('rps', '<f4'), ('requests', '<u4'), ('errors', '<u4'), ('bytes', '<u8')]
+
+class ResultLog(object):
+
+    # Append-only binary log of fragment test results, written through
+    # the BatchWriter: pack() returns the bytes of one record. Stream ids
+    # are handed out on first use and the name is on disk before any
+    # record that uses it. An existing log is appended to as a new run,
+    # after dropping a record left half written by the previous one; a
+    # file that is not a result log of this format raises ValueError.
+    def __init__(self, file_name):
+        self.file_name  = file_name
+        self.lock       = threading.Lock()
+        self.ids        = {}
+        self.started    = time.time()
+
+        if os.path.exists(file_name):
+            FILE = open(file_name, 'rb')
+            try:
+                head = FILE.read(len(MAGIC))
+            finally:
+                FILE.close()
+            if head != MAGIC[:len(head)]:
+                raise ValueError('%s is not a %s result log' % (file_name, MAGIC))
+
+        FILE = open(file_name, 'ab')
+        FILE.seek(0, os.SEEK_END)
+        size = FILE.tell()
+        if size < len(MAGIC):
+            FILE.truncate(0)
+            FILE.write(MAGIC)
+            size = len(MAGIC)
+        self.first      = (size - len(MAGIC)) / RECORD.size
+        if len(MAGIC) + self.first * RECORD.size < size:
+            FILE.truncate(len(MAGIC) + self.first * RECORD.size)
+        FILE.close()
+
+        runs = open(file_name + '.runs', 'ab')
+        runs.write('%d %.6f\n' % (self.first, self.started))
+        runs.close()
+
+        if os.path.exists(file_name + '.streams'):
+            names = open(file_name + '.streams', 'rb')
+            try:
+                for line in names:
+                    self.ids[line.rstrip('\n')] = len(self.ids)
+            finally:
+                names.close()
+        self.names      = open(file_name + '.streams', 'ab')
+
+    def stream_id(self, stream_name):
+        if isinstance(stream_name, unicode):
+            stream_name = stream_name.encode('utf-8')
+        stream = self.ids.get(stream_name)
+        if stream is None:
+            with self.lock:
+                stream = self.ids.get(stream_name)
+                if stream is None:
+                    self.names.write(stream_name + '\n')
+                    self.names.flush()
+                    stream = self.ids[stream_name] = len(self.ids)
+        return stream
+
+    def pack(self, when, stream_name, fragment, latency, rps, requests, errors, nbytes):
+        return RECORD.pack(when, self.stream_id(stream_name), int(fragment), latency, rps,
+                           int(requests), int(errors), int(nbytes))
+
+    def close(self):
+        with self.lock:
+            self.names.close()
+
+class ResultReader(object):
+
+    # A result log mapped read-only as a numpy record array, so a run of
+    # millions of fragment tests is aggregated without parsing. A record
+    # still being written at the end of the file is ignored. runs holds
+    # the (first record, start time) of each run in the log.
+    def __init__(self, file_name):
+        if numpy is None:
+            raise ImportError('numpy is needed to read result logs')
+        self.file_name  = file_name
+        FILE = open(file_name, 'rb')
+        try:
+            if FILE.read(len(MAGIC)) != MAGIC:
+                raise ValueError('%s is not a result log' % file_name)
+        finally:
+            FILE.close()
+
+        self.names      = []
+        if os.path.exists(file_name + '.streams'):
+            names = open(file_name + '.streams', 'rb')
+            try:
+                self.names = [line.rstrip('\n') for line in names]
+            finally:
+                names.close()
+
+        count = (os.path.getsize(file_name) - len(MAGIC)) / RECORD.size
+        if count:
+            self.records = numpy.memmap(file_name, dtype=numpy.dtype(FIELDS), mode='r',
+                                        offset=len(MAGIC), shape=(count,))
+        else:
+            self.records = numpy.zeros(0, dtype=numpy.dtype(FIELDS))
+
+        # A log written before runs were recorded is one run
+        self.runs       = []
+        if os.path.exists(file_name + '.runs'):
+            runs = open(file_name + '.runs', 'rb')
+            try:
+                for line in runs:
+                    first, started = line.split()
+                    self.runs.append((min(int(first), count), float(started)))
+            finally:
+                runs.close()
+        if not self.runs:
+            self.runs.append((0, count and float(self.records['time'].min()) or 0.0))
+
+    def __len__(self):
+        return len(self.records)
+
+    # Name of a stream id, or the id itself for a name not yet written
+    def stream_name(self, stream):
+        if stream < len(self.names):
+            return self.names[stream]
+        return str(stream)
+
+    # (records, start time) of run number index, from 0; negative counts
+    # back from the last run
+    def run(self, index):
+        first, started = self.runs[index]
+        index = index % len(self.runs)
+        if index + 1 < len(self.runs):
+            return self.records[first:self.runs[index + 1][0]], started
+        return self.records[first:], started
+
+    def close(self):
+        self.records = None
@@ -0,0 +1,204 @@
+'''
+Created on 18 Oct 2026
+
+@author: wallace
+'''
+from array import array
+from bisect import bisect_right
+
+class RunTable(object):
+
+    # The segment and fragment run tables of a bootstrap, kept run length
+    # encoded in parallel arrays: a few dozen bytes per run however many
+    # fragments it covers. Lookups by fragment number, by timestamp and
+    # by position (the n-th fragment, gaps skipped) are binary searches
+    # over the runs. A zero duration entry marks a gap in the numbering
+    # (discontinuity 1), a timestamp jump (2) or the end of the
+    # presentation (0); the fragments a gap skips are looked up as the
+    # marker. The last run is open ended up to 'last', worked out from
+    # the segment run table: for a live bootstrap as
+    # hds.extract_fragments does, for VOD one segment per final run.
+    # Live bootstraps are folded in with append() as they advance.
+    def __init__(self, bootstrap=None):
+        self.first          = array('I')
+        self.timestamp      = array('d')
+        self.duration       = array('I')
+        self.discontinuity  = array('B')
+        # Fragments before each run, gaps excluded
+        self.position       = array('L')
+
+        self.segment_from   = array('L')
+        self.segment_first  = array('I')
+        self.segment_frags  = array('I')
+
+        self.time_scale     = 1000
+        self.last           = None
+        if bootstrap is not None:
+            self.append(bootstrap)
+
+    def __len__(self):
+        if not self.first:
+            return 0
+        return self.position[-1] + self._frags(len(self.first) - 1)
+
+    # Fragments covered by run i
+    def _frags(self, i):
+        if self.duration[i] == 0:
+            return 0
+        if i + 1 < len(self.first):
+            end = self.first[i + 1]
+        else:
+            end = self.last + 1
+        return max(end - self.first[i], 0)
+
+    # Merges the run tables of a newer bootstrap of the same stream. Runs
+    # already known are kept, a changed last run is replaced and newer
+    # runs are appended; the segment table is taken as it now is
+    def append(self, bootstrap):
+        table = bootstrap['fragment_run_tables'][0]
+        self.time_scale = table.get('timescale') or bootstrap.get('time_scale') or self.time_scale
+        runs = table['runs']
+        segments = bootstrap['segment_run_tables'][0]['runs']
+        if not runs or not segments:
+            return
+
+        base = runs[0][0]
+        if bootstrap.get('live'):
+            total = 0
+            for first, frags in segments:
+                total += frags
+        else:
+            total = 0
+            for i, (first, frags) in enumerate(segments):
+                following = i + 1 < len(segments) and segments[i + 1][0] or first + 1
+                total += (following - first) * frags
+        self.last = base + total - 1
+
+        del self.segment_from[:], self.segment_first[:], self.segment_frags[:]
+        ordinal = 0
+        for i, (first, frags) in enumerate(segments):
+            self.segment_from.append(base + ordinal)
+            self.segment_first.append(first)
+            self.segment_frags.append(max(frags, 1))
+            if i + 1 < len(segments):
+                ordinal += (segments[i + 1][0] - first) * frags
+
+        # Runs after the last one known, found from the end as a newer
+        # bootstrap of a live stream only adds a few. Markers sort before
+        # a run starting on the same number; an end of presentation marker
+        # numbered 0 after the runs is passed over
+        start = len(runs)
+        if self.first:
+            last_key = (self.first[-1], self.duration[-1] != 0)
+            while start > 1 and (runs[start - 1][0], runs[start - 1][2] != 0) < (runs[start - 2][0], runs[start - 2][2] != 0):
+                start -= 1
+            while start > 0 and (runs[start - 1][0], runs[start - 1][2] != 0) > last_key:
+                start -= 1
+            if start > 0 and (runs[start - 1][0], runs[start - 1][2] != 0) == last_key:
+                self.timestamp[-1], self.duration[-1], self.discontinuity[-1] = runs[start - 1][1:4]
+        else:
+            start = 0
+        self._extend(runs, start)
+
+    # Appends runs[start:], skipping any out of order (an end of
+    # presentation marker numbered 0). A marker may also carry a zero
+    # timestamp, markers are kept no earlier than the end of the run
+    # before so timestamps stay sorted for find()
+    def _extend(self, runs, start):
+        firsts, timestamps, durations = self.first, self.timestamp, self.duration
+        discontinuities, positions = self.discontinuity, self.position
+        if firsts:
+            previous, previous_ts, previous_duration, position = firsts[-1], timestamps[-1], durations[-1], positions[-1]
+        else:
+            previous, previous_ts, previous_duration, position = None, 0, 0, 0
+        for i in xrange(start, len(runs)):
+            first, timestamp, duration, discontinuity = runs[i]
+            if previous is not None:
+                if first < previous or (first == previous and previous_duration and not duration):
+                    continue
+                if previous_duration:
+                    position += max(first - previous, 0)
+                if duration == 0:
+                    timestamp = max(timestamp, previous_ts + previous_duration * max(first - previous, 0))
+            firsts.append(first)
+            timestamps.append(timestamp)
+            durations.append(duration)
+            discontinuities.append(discontinuity)
+            positions.append(position)
+            previous, previous_ts, previous_duration = first, timestamp, duration
+
+    # Forget the runs wholly before fragment number, e.g. once they have
+    # left a live stream's DVR window
+    def trim(self, number):
+        keep = bisect_right(self.first, number) - 1
+        if keep <= 0:
+            return
+        for column in (self.first, self.timestamp, self.duration, self.discontinuity, self.position):
+            del column[:keep]
+        offset = self.position[0]
+        for i in xrange(len(self.position)):
+            self.position[i] -= offset
+
+    # Segment holding fragment number
+    def segment(self, number):
+        i = bisect_right(self.segment_from, number) - 1
+        if i < 0:
+            return self.segment_first[0]
+        return self.segment_first[i] + (number - self.segment_from[i]) / self.segment_frags[i]
+
+    # First fragment number after the run holding number, number itself
+    # if it falls in a gap or outside the table
+    def run_end(self, number):
+        i = bisect_right(self.first, number) - 1
+        if i < 0 or self.last is None or number > self.last or self.duration[i] == 0:
+            return number
+        if i + 1 < len(self.first):
+            return self.first[i + 1]
+        return self.last + 1
+
+    # (segment, timestamp, duration, discontinuity) of fragment number,
+    # in the run table's timescale, None outside the table. A fragment
+    # in a gap comes back with the marker's zero duration and indicator
+    def lookup(self, number):
+        i = bisect_right(self.first, number) - 1
+        if i < 0 or self.last is None or number > self.last:
+            return None
+        duration = self.duration[i]
+        if duration == 0:
+            if self.discontinuity[i] == 0:
+                return None
+            return self.segment(number), self.timestamp[i], 0, self.discontinuity[i]
+        return (self.segment(number), self.timestamp[i] + (number - self.first[i]) * duration,
+                duration, self.discontinuity[i])
+
+    # Fragment number playing at timestamp, None before the first or
+    # after the last fragment, or in a gap
+    def find(self, timestamp):
+        i = bisect_right(self.timestamp, timestamp) - 1
+        if i < 0 or self.duration[i] == 0:
+            return None
+        number = self.first[i] + int((timestamp - self.timestamp[i]) / self.duration[i])
+        if number - self.first[i] >= self._frags(i):
+            return None
+        return number
+
+    # Fragment number of the fragment at position (0 .. len - 1)
+    def number(self, position):
+        i = bisect_right(self.position, position) - 1
+        # Markers hold no fragments, take the last run starting here
+        while i >= 0 and self.duration[i] == 0:
+            i -= 1
+        if i < 0 or position - self.position[i] >= self._frags(i):
+            return None
+        return self.first[i] + position - self.position[i]
+
+    # (segment, fragment number, duration, discontinuity) for every
+    # fragment in order, gaps skipped
+    def fragments(self):
+        for i in xrange(len(self.first)):
+            duration = self.duration[i]
+            if duration == 0:
+                continue
+            first = self.first[i]
+            for number in xrange(first, first + self._frags(i)):
+                yield self.segment(number), number, duration, self.discontinuity[i]
@@ -0,0 +1,95 @@
+'''
+Created on 18 Oct 2026
+
+@author: wallace
+'''
+import os
+import signal
+import sys
+import threading
+import time
+
+class SamplingProfiler(threading.Thread):
+
+    # Samples the stack of every other thread each 'interval' seconds for
+    # 'duration' seconds, then writes them in the collapsed format of
+    # flamegraph.pl: one 'thread;outer;...;inner count' line per distinct
+    # stack. Nothing runs between captures.
+    def __init__(self, file_name, duration=30, interval=0.005):
+        threading.Thread.__init__(self)
+        self.daemon     = True
+        self.file_name  = file_name
+        self.duration   = duration
+        self.interval   = interval
+        self.stacks     = {}
+        self.samples    = 0
+
+    def run(self):
+        me = threading.current_thread().ident
+        deadline = time.time() + self.duration
+        while time.time() < deadline:
+            names = dict((thread.ident, thread.name) for thread in threading.enumerate())
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append('%s:%s' % (os.path.basename(code.co_filename), code.co_name))
+                    frame = frame.f_back
+                stack.append(names.get(ident, 'thread-%d' % ident).replace(' ', '_'))
+                key = ';'.join(reversed(stack))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+            self.samples += 1
+            time.sleep(self.interval)
+        self.write()
+
+    def write(self):
+        FILE = open(self.file_name, 'wb')
+        for stack, count in sorted(self.stacks.iteritems()):
+            FILE.write('%s %d\n' % (stack, count))
+        FILE.close()
+
+# One capture at a time per process
+_running = None
+_lock = threading.Lock()
+
+# Starts a capture into directory unless one is running. Returns the
+# profiler, or None
+def capture(directory, duration=30, interval=0.005):
+    global _running
+    with _lock:
+        if _running is not None and _running.is_alive():
+            return None
+        file_name = os.path.join(directory, 'profile.%d.%d.folded' % (os.getpid(), time.time()))
+        _running = SamplingProfiler(file_name, duration, interval)
+        _running.start()
+        return _running
+
+# Starts a capture whenever the process gets signum (SIGUSR2 by
+# default). Only possible from the main thread, and not on Windows
+def install(directory, duration=30, interval=0.005, signum=None):
+    if signum is None:
+        signum = getattr(signal, 'SIGUSR2', None)
+    if signum is None:
+        return False
+    signal.signal(signum, lambda number, frame: capture(directory, duration, interval))
+    return True
+
+# Passes signum (SIGUSR2 by default) on to the processes, each capturing
+# its own profile, instead of the default action of ending this process.
+# For a parent whose workers install()ed, from the main thread
+def forward(processes, signum=None):
+    if signum is None:
+        signum = getattr(signal, 'SIGUSR2', None)
+    if signum is None:
+        return False
+    def relay(number, frame):
+        for process in processes:
+            if process.is_alive():
+                try:
+                    os.kill(process.pid, number)
+                except OSError:
+                    pass
+    signal.signal(signum, relay)
+    return True
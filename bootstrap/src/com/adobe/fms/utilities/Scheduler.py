@@ -0,0 +1,73 @@
+'''
+Created on 18 Oct 2026
+
+@author: wallace
+'''
+import heapq
+import threading
+import time
+import traceback
+from com.adobe.fms.utilities.statistics import LatencyHistogram
+
+class Scheduler(threading.Thread):
+
+    # One timer thread for every stream. Callbacks are kept on a heap by
+    # deadline and run on the scheduler thread when due, so they must be
+    # cheap, typically handing a task to a worker queue. How late each
+    # callback ran (the schedule lag) is kept in a latency histogram. A
+    # callback that raises is reported and counted, the others still run.
+    def __init__(self):
+        threading.Thread.__init__(self)
+        self.daemon     = True
+        self.heap       = []
+        self.seq        = 0
+        self.lock       = threading.Lock()
+        self.wakeup     = threading.Condition(self.lock)
+        self.stopping   = False
+        self.lag        = LatencyHistogram()
+        self.fired      = 0
+        self.errors     = 0
+
+    def call_at(self, deadline, callback, *args):
+        with self.lock:
+            self.seq += 1
+            heapq.heappush(self.heap, (deadline, self.seq, callback, args))
+            # Only wake the thread if this is now the earliest deadline
+            if self.heap[0][1] == self.seq:
+                self.wakeup.notify()
+
+    def call_later(self, delay, callback, *args):
+        self.call_at(time.time() + delay, callback, *args)
+
+    def __len__(self):
+        return len(self.heap)
+
+    def run(self):
+        while True:
+            with self.lock:
+                while not self.stopping:
+                    now = time.time()
+                    if self.heap and self.heap[0][0] <= now:
+                        break
+                    self.wakeup.wait(self.heap and self.heap[0][0] - now or None)
+                if self.stopping:
+                    return
+                deadline, seq, callback, args = heapq.heappop(self.heap)
+            self.lag.record((time.time() - deadline) * 1000)
+            self.fired += 1
+            try:
+                callback(*args)
+            except Exception:
+                self.errors += 1
+                print 'Scheduler: %r failed' % (callback,)
+                traceback.print_exc()
+
+    def stop(self):
+        with self.lock:
+            self.stopping = True
+            self.wakeup.notify()
+
+    def summary(self):
+        lag = self.lag.copy().summary()
+        return ('Scheduled: %d, pending: %d, failed: %d, lag p50 %.1f ms, p99 %.1f ms, max %.1f ms'
+                % (self.fired, len(self.heap), self.errors, lag['p50'], lag['p99'], lag['max']))
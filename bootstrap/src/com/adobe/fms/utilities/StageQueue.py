@@ -0,0 +1,92 @@
+'''
+Created on 18 Oct 2026
+
+@author: wallace
+'''
+import threading
+import time
+from collections import deque
+
+POLICIES = ('block', 'drop-oldest', 'live-edge')
+
+class StageQueue(object):
+
+    # Bounded queue between two pipeline stages. When maxsize tasks are
+    # waiting put() follows the overflow policy:
+    #   'block'        the producer waits for space
+    #   'drop-oldest'  the oldest waiting task is dropped
+    #   'live-edge'    the waiting tasks of the new task's stream (by key)
+    #                  are dropped, so the stream skips to its newest
+    #                  task; the oldest task if the stream has none
+    # A task that waited longer than max_age seconds is shed by get()
+    # instead of being run, 0 keeps every task however late. timing, if
+    # given, is called with the msec each task that is run waited.
+    def __init__(self, maxsize, policy='block', key=None, max_age=0, timing=None):
+        if policy not in POLICIES:
+            raise ValueError('Unknown queue overflow policy %r, expected one of %s' % (policy, ', '.join(POLICIES)))
+        self.maxsize    = maxsize
+        self.policy     = policy
+        self.key        = key
+        self.max_age    = max_age
+        self.timing     = timing
+
+        self.tasks      = deque()
+        self.lock       = threading.Lock()
+        self.ready      = threading.Condition(self.lock)
+        self.space      = threading.Condition(self.lock)
+
+        self.put_count  = 0
+        self.dropped    = 0
+        self.shed       = 0
+        self.blocked    = 0
+        self.high_water = 0
+
+    def put(self, task):
+        with self.lock:
+            if len(self.tasks) >= self.maxsize:
+                if self.policy == 'block':
+                    self.blocked += 1
+                    while len(self.tasks) >= self.maxsize:
+                        self.space.wait()
+                elif self.policy == 'live-edge' and self.key is not None:
+                    self._skip(self.key(task))
+                else:
+                    self.tasks.popleft()
+                    self.dropped += 1
+            self.tasks.append((time.time(), task))
+            self.put_count += 1
+            if len(self.tasks) > self.high_water:
+                self.high_water = len(self.tasks)
+            self.ready.notify()
+
+    # Drops the waiting tasks of a stream, or the oldest task
+    def _skip(self, stream):
+        kept = deque(entry for entry in self.tasks if self.key(entry[1]) != stream)
+        if len(kept) == len(self.tasks):
+            kept.popleft()
+        self.dropped += len(self.tasks) - len(kept)
+        self.tasks = kept
+
+    def get(self):
+        with self.lock:
+            while True:
+                while not self.tasks:
+                    self.ready.wait()
+                queued, task = self.tasks.popleft()
+                self.space.notify()
+                waited = time.time() - queued
+                if self.max_age and waited > self.max_age:
+                    self.shed += 1
+                    continue
+                break
+        if self.timing is not None:
+            self.timing(waited * 1000)
+        return task
+
+    def qsize(self):
+        return len(self.tasks)
+
+    def summary(self):
+        return ('Queued: %d, waiting: %d (max %d of %d), dropped: %d, shed: %d, blocked puts: %d'
+                % (self.put_count, len(self.tasks), self.high_water, self.maxsize,
+                   self.dropped, self.shed, self.blocked))
@@ -0,0 +1,56 @@
+'''
+Created on 18 Oct 2026
+
+@author: wallace
+'''
+import time
+from com.adobe.fms.utilities.statistics import LatencyRecorder
+
+class _Span(object):
+
+    def __init__(self, recorder, stage):
+        self.recorder   = recorder
+        self.stage      = stage
+
+    def __enter__(self):
+        self.started = time.time()
+        return self
+
+    def __exit__(self, kind, value, traceback):
+        self.recorder.record(self.stage, (time.time() - self.started) * 1000)
+        return False
+
+class _NoSpan(object):
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, kind, value, traceback):
+        return False
+
+NO_SPAN = _NoSpan()
+
+class StageTimer(object):
+
+    # Time spent per pipeline stage, one latency histogram per stage:
+    #     with stages.span('bootstrap_fetch'):
+    #         ...
+    # Recording goes through a LatencyRecorder, one histogram per stage,
+    # and snapshot() can stand in for one in the HistogramReporter.
+    # Disabled, span() returns a shared no-op.
+    def __init__(self, enabled=True):
+        self.enabled    = enabled
+        self.recorder   = LatencyRecorder()
+
+    def span(self, stage):
+        if not self.enabled:
+            return NO_SPAN
+        return _Span(self.recorder, stage)
+
+    def record(self, stage, msec):
+        if self.enabled:
+            self.recorder.record(stage, msec)
+
+    # Returns ({stage: histogram}, global histogram)
+    def snapshot(self):
+        return self.recorder.snapshot()
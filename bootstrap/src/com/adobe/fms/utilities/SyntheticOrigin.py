@@ -0,0 +1,313 @@
+'''
+Created on 18 Oct 2026
+
+@author: wallace
+'''
+import random
+import re
+from base64 import encodestring
+import struct
+import threading
+import time
+from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+from SocketServer import ThreadingMixIn
+from com.adobe.fms.utilities.BootstrapWriter import BootstrapWriter
+
+STREAM_PATH = '/hds-live/streams/livepkgr/streams/_definst_/'
+EVENT_PATH  = '/hds-live/streams/livepkgr/events/_definst_/liveevent/'
+VOD_PATH    = '/hds-vod/'
+
+_FRAGMENT_NAME = re.compile(r'^Seg(\d+)-Frag(\d+)$')
+_VOD_FRAGMENT_NAME = re.compile(r'^(.+?)Seg(\d+)-Frag(\d+)$')
+
+class LiveStream(object):
+
+    # One rendition of a synthetic live event. Fragments are produced
+    # every duration msec from start; a bootstrap lists the last window of
+    # them, as FMS does with its DVR window. Optional defects:
+    #   gap_every/gap_size:  after every gap_every fragments skip gap_size
+    #                        fragment numbers (afrt discontinuity 1)
+    #   discontinuity_every: jump the timestamps every discontinuity_every
+    #                        fragments (afrt discontinuity 2)
+    #   publish_delay:       fragments 404 for this many msec after they
+    #                        appear in the bootstrap, like a lagging edge
+    def __init__(self, name, bitrate, duration=4000, fragment_size=None, window=30,
+                 gap_every=0, gap_size=1, discontinuity_every=0, start=None, publish_delay=0):
+        self.name                   = name
+        self.bitrate                = bitrate
+        self.duration               = duration
+        self.window                 = window
+        self.gap_every              = gap_every
+        self.gap_size               = gap_size
+        self.discontinuity_every    = discontinuity_every
+        self.publish_delay          = publish_delay
+        # Start a window back so the first bootstrap is already full
+        if start is None:
+            start = time.time() - window * duration / 1000.0
+        self.start                  = start
+        if fragment_size is None:
+            fragment_size = bitrate * duration / 8
+        # Media data shared by every fragment of the stream
+        self.payload                = BootstrapWriter.box('mdat', '\x00' * max(fragment_size - 8, 0))
+
+        self.lock                   = threading.Lock()
+        self.cached                 = (None, None)
+
+    # Fragments completed by time now
+    def produced(self, now):
+        return max(int((now - self.start) * 1000 / self.duration), 0)
+
+    # Fragment number of the index-th fragment produced
+    def number(self, index):
+        if self.gap_every:
+            return 1 + index + (index / self.gap_every) * self.gap_size
+        return 1 + index
+
+    # Index of a fragment number, None if the number falls in a gap
+    def index(self, number):
+        offset = number - 1
+        if offset < 0:
+            return None
+        if self.gap_every:
+            block = self.gap_every + self.gap_size
+            if offset % block >= self.gap_every:
+                return None
+            return (offset / block) * self.gap_every + offset % block
+        return offset
+
+    def timestamp(self, index):
+        if self.discontinuity_every:
+            return index * self.duration + (index / self.discontinuity_every) * self.duration * 10
+        return index * self.duration
+
+    # The boxes in front of the media data of fragment number, laid out
+    # as FMS does: afra, an abst describing just this fragment, moof
+    def fragment_header(self, number):
+        index = self.index(number)
+        timestamp = self.timestamp(index)
+        abst = BootstrapWriter.write({'live': True,
+                                      'time_scale': 1000,
+                                      'current_media_time': timestamp + self.duration,
+                                      'segment_run_tables': [{'runs': [(1, 1)]}],
+                                      'fragment_run_tables': [{'timescale': 1000,
+                                                               'runs': [(number, timestamp, self.duration, 0)]}]})
+        afra = BootstrapWriter.box('afra', struct.pack('>I B I I', 0, 0xc0, 1000, 0))
+        moof = BootstrapWriter.box('moof', BootstrapWriter.box('mfhd', struct.pack('>II', 0, index + 1)))
+        return afra + abst + moof
+
+    def available(self, number, now):
+        index = self.index(number)
+        produced = self.produced(now - self.publish_delay / 1000.0)
+        return index is not None and produced - self.window <= index < produced
+
+    def bootstrap(self, now):
+        produced = self.produced(now)
+        with self.lock:
+            if self.cached[0] == produced:
+                return produced, self.cached[1]
+        data = BootstrapWriter.write(self.run_tables(produced))
+        with self.lock:
+            self.cached = (produced, data)
+        return produced, data
+
+    def run_tables(self, produced):
+        low = max(produced - self.window, 0)
+        runs = []
+        if produced > 0:
+            runs.append((self.number(low), self.timestamp(low), self.duration, 0))
+        for index in xrange(low + 1, produced):
+            indicator = 0
+            if self.gap_every and index % self.gap_every == 0:
+                indicator |= 1
+            if self.discontinuity_every and index % self.discontinuity_every == 0:
+                indicator |= 2
+            if indicator:
+                runs.append((self.number(index - 1) + 1, self.timestamp(index - 1) + self.duration, 0, indicator))
+                runs.append((self.number(index), self.timestamp(index), self.duration, 0))
+
+        # One segment holding every fragment number in the window, so the
+        # newest fragment is first + frags - 1 of the first run
+        frags = produced and self.number(produced - 1) - self.number(low) + 1 or 0
+        return {'live': True,
+                'time_scale': 1000,
+                'current_media_time': produced and self.timestamp(produced - 1) + self.duration or 0,
+                'segment_run_tables': [{'runs': [(1, frags)]}],
+                'fragment_run_tables': [{'timescale': 1000, 'runs': runs}]}
+
+class VodAsset(object):
+
+    # A synthetic VOD title of 'fragments' fragments, all in segment 1.
+    # The first request for a fragment takes miss_latency msec more, as
+    # a cache fill from storage would
+    def __init__(self, name, bitrate, fragments, duration=4000, fragment_size=None, miss_latency=0):
+        self.name           = name
+        self.bitrate        = bitrate
+        self.fragments      = fragments
+        self.duration       = duration
+        self.miss_latency   = miss_latency
+        if fragment_size is None:
+            fragment_size = bitrate * duration / 8
+        self.payload        = BootstrapWriter.box('mdat', '\x00' * max(fragment_size - 8, 0))
+        self.cached         = bytearray(fragments + 1)
+        self.data           = BootstrapWriter.write({'time_scale': 1000,
+                                                     'current_media_time': fragments * duration,
+                                                     'segment_run_tables': [{'runs': [(1, fragments)]}],
+                                                     'fragment_run_tables': [{'timescale': 1000,
+                                                                              'runs': [(1, 0, duration, 0)]}]})
+
+    def manifest(self):
+        return ('<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<manifest xmlns="http://ns.adobe.com/f4m/1.0">\n'
+                '\t<id>%(name)s</id>\n'
+                '\t<streamType>recorded</streamType>\n'
+                '\t<duration>%(seconds).3f</duration>\n'
+                '\t<bootstrapInfo profile="named" id="bootstrap0">%(bootstrap)s</bootstrapInfo>\n'
+                '\t<media streamId="%(name)s" url="%(name)s" bitrate="%(bitrate)d" bootstrapInfoId="bootstrap0"/>\n'
+                '</manifest>\n' % {'name': self.name, 'seconds': self.fragments * self.duration / 1000.0,
+                                    'bootstrap': encodestring(self.data).replace('\n', ''),
+                                    'bitrate': self.bitrate})
+
+    # Delay for a request of fragment number, the first one pays the miss
+    def fill(self, number):
+        if self.cached[number]:
+            return 0
+        self.cached[number] = 1
+        return self.miss_latency
+
+class OriginHandler(BaseHTTPRequestHandler):
+
+    protocol_version        = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    wbufsize                = -1
+
+    def do_GET(self):
+        origin = self.server
+        origin.count('requests')
+        if origin.latency or origin.jitter:
+            time.sleep((origin.latency + random.random() * origin.jitter) / 1000.0)
+        if origin.error_rate and random.random() < origin.error_rate:
+            origin.count('errors')
+            return self.reply(503, 'Injected error\n', 'text/plain')
+
+        path = self.path.split('?', 1)[0]
+        now = time.time()
+        if path.startswith(VOD_PATH):
+            return self.vod(path[len(VOD_PATH):])
+        if path.endswith('.f4m'):
+            name = path.rsplit('/', 1)[-1][:-4]
+            stream = origin.streams.get(name)
+            if stream is None:
+                return self.reply(200, origin.mlm(self.headers.get('host')), 'video/f4m')
+            return self.reply(200, origin.manifest(stream), 'video/f4m')
+
+        if path.startswith(STREAM_PATH):
+            parts = path[len(STREAM_PATH):].split('/')
+            stream = origin.streams.get(parts[0])
+            if stream is not None and len(parts) == 2 and parts[1].startswith(stream.name):
+                resource = parts[1][len(stream.name):]
+                if resource == '.bootstrap':
+                    produced, data = stream.bootstrap(now)
+                    etag = '"%s-%d"' % (stream.name, produced)
+                    if self.headers.get('if-none-match') == etag:
+                        origin.count('not_modified')
+                        return self.reply(304, '', None, etag)
+                    origin.count('bootstraps')
+                    return self.reply(200, data, 'application/octet-stream', etag)
+                match = _FRAGMENT_NAME.match(resource)
+                if match and stream.available(int(match.group(2)), now):
+                    origin.count('fragments')
+                    return self.reply(200, (stream.fragment_header(int(match.group(2))), stream.payload), 'video/f4f')
+
+        origin.count('not_found')
+        return self.reply(404, 'Not found\n', 'text/plain')
+
+    def vod(self, resource):
+        origin = self.server
+        if resource.endswith('.f4m'):
+            asset = origin.assets.get(resource[:-4])
+            if asset is not None:
+                return self.reply(200, asset.manifest(), 'video/f4m')
+        else:
+            match = _VOD_FRAGMENT_NAME.match(resource)
+            asset = match and origin.assets.get(match.group(1))
+            if asset is not None and int(match.group(2)) == 1 and 1 <= int(match.group(3)) <= asset.fragments:
+                delay = asset.fill(int(match.group(3)))
+                if delay:
+                    origin.count('misses')
+                    time.sleep(delay / 1000.0)
+                origin.count('fragments')
+                return self.reply(200, asset.payload, 'video/f4f')
+        origin.count('not_found')
+        return self.reply(404, 'Not found\n', 'text/plain')
+
+    # body is a string or a tuple of strings sent one after the other
+    def reply(self, status, body, content_type, etag=None):
+        if isinstance(body, str):
+            body = (body,)
+        self.send_response(status)
+        if content_type:
+            self.send_header('Content-Type', content_type)
+        if etag:
+            self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Content-Length', str(sum(len(part) for part in body)))
+        self.end_headers()
+        for part in body:
+            self.wfile.write(part)
+
+    def log_message(self, format, *args):
+        return
+
+class SyntheticOrigin(ThreadingMixIn, HTTPServer):
+
+    # A stand-in live HDS origin: serves the multi-level manifest (any
+    # .f4m that is not a stream name), per stream manifests, advancing
+    # bootstraps with ETag revalidation and SegN-FragM payloads on the
+    # URLs threaded_hds_live.py requests. Every request can be delayed by
+    # latency + up to jitter msec and fails with a 503 at error_rate.
+    # VodAssets are served under VOD_PATH as <name>.f4m with an embedded
+    # bootstrap and <name>SegN-FragM.
+    daemon_threads          = True
+    allow_reuse_address     = True
+    request_queue_size      = 1024
+
+    def __init__(self, address, streams, latency=0, jitter=0, error_rate=0.0, assets=()):
+        HTTPServer.__init__(self, address, OriginHandler)
+        self.streams    = dict((stream.name, stream) for stream in streams)
+        self.assets     = dict((asset.name, asset) for asset in assets)
+        self.latency    = latency
+        self.jitter     = jitter
+        self.error_rate = error_rate
+        self.lock       = threading.Lock()
+        self.counters   = dict.fromkeys(('requests', 'bootstraps', 'not_modified', 'fragments',
+                                         'not_found', 'errors', 'misses'), 0)
+
+    def count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def mlm(self, host):
+        media = ''.join('\t<media href="%s.f4m" bitrate="%d"/>\n' % (stream.name, stream.bitrate)
+                        for stream in sorted(self.streams.itervalues(), key=lambda s: s.name))
+        return ('<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<manifest xmlns="http://ns.adobe.com/f4m/2.0">\n'
+                '\t<baseURL>http://%s%s</baseURL>\n%s</manifest>\n' % (host, EVENT_PATH, media))
+
+    def manifest(self, stream):
+        return ('<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<manifest xmlns="http://ns.adobe.com/f4m/1.0">\n'
+                '\t<id>livepkgr/events/_definst_/liveevent</id>\n'
+                '\t<streamType>live</streamType>\n'
+                '\t<duration>0</duration>\n'
+                '\t<bootstrapInfo profile="named" url="../../../streams/livepkgr/streams/_definst_/%(name)s/%(name)s.bootstrap" id="bootstrap0"/>\n'
+                '\t<media streamId="%(name)s" url="../../../streams/livepkgr/streams/_definst_/%(name)s/%(name)s" bootstrapInfoId="bootstrap0"/>\n'
+                '</manifest>\n' % {'name': stream.name})
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters)
+
+    def summary(self):
+        return ('Requests: %(requests)d, bootstraps: %(bootstraps)d, 304s: %(not_modified)d, '
+                'fragments: %(fragments)d, VOD misses: %(misses)d, 404s: %(not_found)d, '
+                'injected errors: %(errors)d' % self.stats())
@@ -0,0 +1,98 @@
+'''
+Created on 18 Oct 2026
+
+@author: wallace
+'''
+
+# Weight of the previous estimate in the throughput moving average
+ESTIMATE_WEIGHT = 0.7
+
+class VirtualPlayer(object):
+
+    # The state of one emulated HDS player: the rendition it is on, the
+    # next fragment it wants, a modelled playback buffer and what happened
+    # to it. Buffer levels and durations are in seconds, bitrates in kbps.
+    # Playback starts once startup seconds are buffered; after that the
+    # buffer drains in real time and running dry is a rebuffer event.
+    # Players hold no threads or sockets, a driver moves them along.
+    __slots__ = ('id', 'rendition', 'fragment', 'buffer', 'buffer_at', 'playing', 'startup',
+                 'estimate', 'fragments', 'switches', 'rebuffers', 'stall', 'bytes', 'errors',
+                 'media_time', 'bitrate_time', 'joined')
+
+    def __init__(self, id, rendition, fragment, now, startup=0.0):
+        self.id             = id
+        self.rendition      = rendition
+        self.fragment       = fragment
+        self.buffer         = 0.0
+        self.buffer_at      = now
+        self.playing        = False
+        self.startup        = startup
+        # Measured download rate, bytes/sec
+        self.estimate       = 0.0
+        self.fragments      = 0
+        self.switches       = 0
+        self.rebuffers      = 0
+        self.stall          = 0.0
+        self.bytes          = 0
+        self.errors         = 0
+        self.media_time     = 0.0
+        self.bitrate_time   = 0.0
+        self.joined         = now
+
+    # Seconds of media buffered at time now
+    def level(self, now):
+        if not self.playing:
+            return self.buffer
+        return max(self.buffer - (now - self.buffer_at), 0.0)
+
+    # A fragment of duration seconds at bitrate arrived at now, nbytes
+    # downloaded in `seconds`
+    def add_fragment(self, now, nbytes, seconds, duration, bitrate):
+        self.fragments += 1
+        self.bytes += nbytes
+        self.media_time += duration
+        self.bitrate_time += bitrate * duration
+
+        rate = nbytes / max(seconds, 0.001)
+        if self.estimate:
+            self.estimate = ESTIMATE_WEIGHT * self.estimate + (1 - ESTIMATE_WEIGHT) * rate
+        else:
+            self.estimate = rate
+
+        if self.playing:
+            drained = now - self.buffer_at
+            if drained > self.buffer:
+                # Ran dry before this fragment came in
+                self.rebuffers += 1
+                self.stall += drained - self.buffer
+                self.buffer = 0.0
+            else:
+                self.buffer -= drained
+        self.buffer += duration
+        self.buffer_at = now
+        if not self.playing and self.buffer >= self.startup:
+            self.playing = True
+
+    # Throughput based choice of the next rendition from bitrates
+    # (ascending). Steps down straight to what the measured rate can
+    # carry, steps up one rendition at a time and only with up_buffer
+    # seconds buffered. Returns the new rendition index
+    def choose(self, bitrates, now, safety=0.8, up_buffer=8.0):
+        budget = self.estimate * 8 / 1000 * safety
+        target = 0
+        for index in xrange(len(bitrates)):
+            if bitrates[index] <= budget:
+                target = index
+        rendition = self.rendition
+        if target < rendition:
+            rendition = target
+        elif target > rendition and self.level(now) >= up_buffer:
+            rendition += 1
+        if rendition != self.rendition:
+            self.switches += 1
+            self.rendition = rendition
+        return rendition
+
+    # Mean bitrate of the media fetched so far
+    def mean_bitrate(self):
+        return self.media_time and self.bitrate_time / self.media_time or 0.0
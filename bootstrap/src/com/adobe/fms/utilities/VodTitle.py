@@ -0,0 +1,78 @@
+'''
+Created on 18 Oct 2026
+
+@author: wallace
+'''
+import threading
+from com.adobe.fms.utilities.RunTable import RunTable
+
+class VodTitle(object):
+
+    # One VOD asset of a catalogue: the fragment URL prefix and the run
+    # tables of its bootstrap as a RunTable. Fragments are numbered by
+    # position (0 .. count - 1) and only expanded to (segment, fragment,
+    # duration) when asked for, so a catalogue of millions of fragments
+    # costs a few bytes per run rather than a dict per fragment. Fragments
+    # requested during the run are marked in a bitmap allocated on first
+    # use, to tell first (cache missing) requests from repeats.
+    __slots__ = ('name', 'url', 'rank', 'count', 'runs', 'seen',
+                 'requests', 'cold', 'cold_ms', 'warm_ms', 'max_ms', 'errors', 'lock')
+
+    def __init__(self, name, url, bootstrap, rank=0):
+        self.name       = name
+        self.url        = url
+        self.rank       = rank
+        self.runs       = RunTable(bootstrap)
+        self.count      = len(self.runs)
+        self.seen       = None
+
+        self.requests   = 0
+        self.cold       = 0
+        self.cold_ms    = 0.0
+        self.warm_ms    = 0.0
+        self.max_ms     = 0.0
+        self.errors     = 0
+        self.lock       = threading.Lock()
+
+    # (segment, fragment number, duration in msec) of the fragment at
+    # position, None past the end
+    def fragment(self, position):
+        if position < 0 or position >= self.count:
+            return None
+        number = self.runs.number(position)
+        segment, timestamp, duration, discontinuity = self.runs.lookup(number)
+        return segment, number, duration * 1000 / self.runs.time_scale
+
+    # Every fragment in order, one at a time
+    def fragments(self):
+        scale = self.runs.time_scale
+        for segment, number, duration, discontinuity in self.runs.fragments():
+            yield segment, number, duration * 1000 / scale
+
+    # Marks the fragment at position requested, returns True the first
+    # time. Sessions share the bitmap, so the read-modify-write of a byte
+    # is done under the lock or a concurrent mark of a neighbouring
+    # fragment could be lost
+    def first_request(self, position):
+        byte, bit = position >> 3, 1 << (position & 7)
+        with self.lock:
+            if self.seen is None:
+                self.seen = bytearray((self.count + 7) / 8)
+            if self.seen[byte] & bit:
+                return False
+            self.seen[byte] |= bit
+            return True
+
+    def record(self, msec, cold, failed=False):
+        with self.lock:
+            self.requests += 1
+            if failed:
+                self.errors += 1
+                return
+            if cold:
+                self.cold += 1
+                self.cold_ms += msec
+            else:
+                self.warm_ms += msec
+            if msec > self.max_ms:
+                self.max_ms = msec
@@ -0,0 +1,86 @@
+'''
+Created on 18 Oct 2026
+
+@author: wallace
+'''
+import Queue
+import threading
+import traceback
+
+class Batch(object):
+
+    # The jobs started together by WorkerPool.start(). callback, if given,
+    # is called once by the job that finishes last
+    def __init__(self, count, callback=None):
+        self.remaining  = count
+        self.callback   = callback
+        self.finished   = threading.Condition(threading.Lock())
+
+    def done(self):
+        with self.finished:
+            self.remaining -= 1
+            last = self.remaining == 0
+            if self.remaining <= 0:
+                self.finished.notify_all()
+        if last and self.callback is not None:
+            self.callback()
+
+    def wait(self):
+        with self.finished:
+            while self.remaining > 0:
+                self.finished.wait()
+
+class WorkerPool(object):
+
+    # Persistent threads shared by every fragment run. A thread is only
+    # started when a job is submitted and none is idle, so the pool grows
+    # to the peak number of jobs running at once and its threads are then
+    # reused. Past max_threads jobs wait for a free thread.
+    def __init__(self, max_threads=2000):
+        self.max_threads    = max_threads
+        self.jobs           = Queue.Queue()
+        self.lock           = threading.Lock()
+        self.threads        = 0
+        self.idle           = 0
+        self.pending        = 0
+
+    def submit(self, function, *args):
+        with self.lock:
+            self.pending += 1
+            spawn = self.pending > self.idle and self.threads < self.max_threads
+            if spawn:
+                self.threads += 1
+        if spawn:
+            thread = threading.Thread(target=self._run)
+            thread.daemon = True
+            thread.start()
+        self.jobs.put((function, args))
+
+    def _run(self):
+        while True:
+            with self.lock:
+                self.idle += 1
+            function, args = self.jobs.get()
+            with self.lock:
+                self.idle -= 1
+                self.pending -= 1
+            try:
+                function(*args)
+            except Exception:
+                traceback.print_exc()
+
+    # Runs function on count pool threads. Returns the Batch to wait on
+    def start(self, function, count):
+        batch = Batch(count)
+        def job():
+            try:
+                function()
+            finally:
+                batch.done()
+        for i in xrange(count):
+            self.submit(job)
+        return batch
+
+    # As start(), and waits until every job has returned
+    def run(self, function, count):
+        self.start(function, count).wait()
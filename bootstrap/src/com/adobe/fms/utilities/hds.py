@@ -6,9 +6,11 @@ Created on 17 Sep 2011
 
 import subprocess
 import urllib2
-from xml.dom import minidom as md
-from base64 import decodestring
 import os
+from com.adobe.fms.utilities.BootstrapParser import BootstrapParser
+from com.adobe.fms.utilities.ManifestReader import ManifestReader
+from com.adobe.fms.utilities.RunTable import RunTable
+from com.adobe.fms.utilities.BootstrapMerger import BootstrapMerger
 
 class hds(object):
 
@@ -44,39 +46,37 @@ class hds(object):
             #content = str(error.read())
             return False
         
-    # Parse the live multi-level manifest
+    # Poll the live bootstrap through a PollingClient, which keeps the
+    # connection open and revalidates with the origin. Returns the
+    # bootstrap, None if it has not changed since the last poll or False
     @staticmethod
-    def parse_live_mlm(content):
-        elements = []
-        
-        dom = md.parseString(content)
-        baseURLTag = dom.getElementsByTagName('baseURL')[0]
-        elements.append((baseURLTag.childNodes[0].data).strip())
-        
-        mediaTag = dom.getElementsByTagName('media')
+    def poll_live_bootstrap(client, url):
+        return client.poll(url + '.bootstrap')
 
-        for mediaElement in mediaTag:
-            
-            bitrate = mediaElement.getAttribute('bitrate')
-            #print bitrate
-            href = mediaElement.getAttribute('href')
-            #print href
-             
-            temp = {'bitrate': bitrate,
-                    'href': href}  
-                                              
-            elements.append(temp)
+    # As poll_live_bootstrap, for manifests
+    @staticmethod
+    def poll_manifest(client, url):
+        return client.poll(url + '.f4m')
 
+    # Parse the live multi-level manifest: the baseURL followed by a
+    # {'bitrate', 'href'} dict per media entry
+    @staticmethod
+    def parse_live_mlm(content):
+        elements = []
+        reader = ManifestReader(content)
+        for media in reader.media():
+            elements.append({'bitrate': media.bitrate or '',
+                             'href': media.href or ''})
+        elements.insert(0, reader.base_url)
         return elements
-        
-    # Parses the manifest and extracts and converts the bootstrap data to binary        
+
+    # Extracts and decodes the first embedded bootstrap of the manifest,
+    # parsing stops once it has been read
     @staticmethod    
     def parse_manifest(content):
-        dom = md.parseString(content)
-        bootstrapInfoTags = dom.getElementsByTagName('bootstrapInfo')[0]
-        bootstrapInfoData = (bootstrapInfoTags.childNodes[0].data).strip()
-        clean = decodestring(bootstrapInfoData)
-        return clean
+        for info in ManifestReader(content).bootstrap_infos():
+            return info.data
+        return None
     
     # Create a local bootstrap file with the binary data       
     @staticmethod   
@@ -138,150 +138,119 @@ class hds(object):
             fragment_run_table.append(bootstrap.pop(i))
         return fragment_run_table  
     
+    # Parse a binary bootstrap in-process, see BootstrapParser for the
+    # layout of the returned run tables
     @staticmethod
-    def check_for_dups(frag, arr):
-        for i in arr:
-            if i.__getitem__('fragment') == frag:
-                return True
-        return False
-    
+    def parse_bootstrap(data):
+        return BootstrapParser.parse(data)
+
+    # Convert the f4fpackager --inspect-bootstrap output into the same
+    # structure parse_bootstrap returns so the two can be cross-checked
     @staticmethod
-    def is_in_fragment_run_table(frag, arr):
-        j=0
-        for i in arr:
-            temp_frag = i.split(',') 
-            temp_fragment_num  = temp_frag[0].split('=')
-            if int(temp_fragment_num[1]) == frag:
-                return j
-            j+=1
-        return False
-            
+    def parse_inspect_output(lines):
+        lines = list(lines)
+        segment_runs = []
+        for line in hds.extract_segment_section(lines):
+            temp = line.split(',')
+            if len(temp) < 2:
+                continue
+            segment_runs.append((int(temp[0].split('=')[1]), int(temp[1].split('=')[1])))
+
+        fragment_runs = []
+        for line in hds.extract_fragment_section(lines):
+            temp = line.split(',')
+            if len(temp) < 3:
+                continue
+            discontinuity = 0
+            if len(temp) == 4:
+                discontinuity = int(temp[3].split('=')[1])
+            fragment_runs.append((int(temp[0].split('=')[1]),
+                                  int(temp[1].split('=')[1]),
+                                  int(temp[2].split('=')[1]),
+                                  discontinuity))
+
+        return {'segment_run_tables': [{'runs': segment_runs}],
+                'fragment_run_tables': [{'runs': fragment_runs}]}
+
+    # Check two parsed bootstraps carry the same run tables
+    @staticmethod
+    def compare_run_tables(lhs, rhs):
+        for key in ('segment_run_tables', 'fragment_run_tables'):
+            if [table['runs'] for table in lhs[key]] != [table['runs'] for table in rhs[key]]:
+                return False
+        return True
+
+    # Union of parsed bootstraps of the same rendition, as tools/merge.pl
+    # makes it. Raises BootstrapMergeError if they disagree
+    @staticmethod
+    def merge_bootstraps(bootstraps):
+        return BootstrapMerger.merge(bootstraps)
+
     # This method checks the integrity of the bootstrap
     # and inserts/fixes fragments that are missing or 
-    # are discontinuous
+    # are discontinuous. The run table is a bootstrap parsed by
+    # parse_bootstrap (or the raw f4fpackager output). For live streams
+    # check_frag is a FragmentTracker, for VOD a list
     @staticmethod          
     def extract_fragments(file_name, run_table, check_frag, live=False):
         durations = []
-        i = 0
-        frag_num_check = 0
         discon = 0
+        if isinstance(run_table, list):
+            run_table = hds.parse_inspect_output(run_table)
+
+        segments  = run_table['segment_run_tables'][0]['runs']
+        fragments = run_table['fragment_run_tables'][0]['runs']
+
         if live is True:      
             # Extract the increasing number 
             # of fragments from the segment run table
-            segments = hds.extract_segment_section(run_table)
             total_num_of_frag_in_seg = 0
+            for segment in segments:
+                total_num_of_frag_in_seg += segment[1]
             #Get last entry in segment run table i.e. the most recent           
-            if len(segments) > 1:
-                for segment in segments:
-                    temp = segment.split(',')        
-                    total_num_of_frag_in_seg += int(temp[1].split('=')[1])
-                    segment_num = temp[0].split('=')
-            else:
-                temp = segments[len(segments)-1].split(',') 
-                total_num_of_frag_in_seg += int(temp[1].split('=')[1])
-                segment_num = temp[0].split('=')
-            
+            segment_num = segments[-1][0]
                 
-            # Extract fragment number and duration
-            # from fragment run table
-            fragments = hds.extract_fragment_section(run_table)
-           
             #Get last entry in fragment run table i.e. the most recent
-            temp         = fragments[len(fragments)-1].split(',') 
-            duration      = temp[2].split('=') 
-            fragment_num  = temp[0].split('=')
+            fragment_num, timestamp, duration, discontinuity = fragments[-1]
             
             # Check for fragment discontinuity
-            discontinuity = 0
-            if len(temp) == 4:
-                discontinuity_check = temp[3].split('=')
-                discontinuity = discontinuity_check[1]
+            if discontinuity:
                 discon = discontinuity
-            if len(run_table) > 1:
-                # Calc distance between oldest and newest fragments in run table
-                inital_frag_line = fragments[0].split(',')
-                inital_frag      = inital_frag_line[0].split('=') 
-                frag_diff        = int(fragment_num[1]) - int(inital_frag[1])
-                # Calc distance between oldest fragment in run table and newest fragment (not necessarily in run table)
-                current_frag = (int(total_num_of_frag_in_seg) - frag_diff) + int(fragment_num[1])-1
-            else:
-                # Use the incrementor
-                current_frag = int(total_num_of_frag_in_seg)+ int(fragment_num[1])-1
+
+            # Calc distance between oldest and newest fragments in run table
+            frag_diff = fragment_num - fragments[0][0]
+            # Calc distance between oldest fragment in run table and newest fragment (not necessarily in run table)
+            current_frag = (total_num_of_frag_in_seg - frag_diff) + fragment_num - 1
             
-            # First run
-            if len(check_frag) == 1:
-                check_frag.append({'segment':segment_num[1], 'fragment': current_frag, 'duration': int(duration[1]), 'discontinuity': int(discontinuity), 'pulled':False})
+            # First run, or the stream has restarted below the tracked window
+            if check_frag.last_fragment is None or current_frag < check_frag.first:
+                check_frag.reset()
+                check_frag.add(segment_num, current_frag, duration, discontinuity)
             else: 
-                frag_gap = current_frag - check_frag[len(check_frag)-1].__getitem__('fragment')
-                
-                miss_frag = int(current_frag)
-                missing_frag_arr = []
-                if frag_gap != 1:
-                    #Get missing fragments
-                    for i in xrange(len(check_frag)-1, len(check_frag) + (frag_gap-1)):
-                        miss_frag -= 1
-                        if hds.check_for_dups(miss_frag, check_frag) is False:    
-                                
-                            missing_frag_arr.append({'missing': miss_frag})
-                            to_add = {'segment':segment_num[1],'fragment': miss_frag, 'duration': int(duration[1]), 'discontinuity': int(discontinuity), 'pulled':False}
-                            #Check if there is a corresponding fragment in the run table
-                            fragle = hds.is_in_fragment_run_table(miss_frag, fragments)
-                            if fragle is not False:
-                                temp_frag = fragments[fragle].split(',') 
-                                temp_fragment_num  = temp_frag[0].split('=')
-                                temp_duration      = temp_frag[2].split('=') 
-                                    
-                                temp_discontinuity = 0
-                                # Check for fragment discontinuity
-                                if len(temp_frag) == 4:
-                                    temp_discontinuity_check = temp_frag[3].split('=')
-                                    temp_discontinuity = temp_discontinuity_check[1]
-                                    discon = temp_discontinuity
-                                to_add = {'segment':segment_num[1], 'fragment': miss_frag, 'duration': int(temp_duration[1]), 'discontinuity': int(temp_discontinuity), 'pulled':False}
-                                
-                            check_frag.append(to_add)
+                last_frag = check_frag.last_fragment
+                if current_frag - last_frag > 1:
+                    # Fragments the run table covers take their segment,
+                    # duration and discontinuity from their run (those in a
+                    # numbering gap get the marker's zero duration), older
+                    # ones borrow the most recent entry
+                    runs = RunTable(run_table)
+                    #Get missing fragments, at most a retention window of them
+                    for miss_frag in xrange(max(last_frag + 1, current_frag - check_frag.retention), current_frag):
+                        temp_segment, temp_duration, temp_discontinuity = segment_num, duration, discontinuity
+                        run = runs.lookup(miss_frag)
+                        if run is not None:
+                            temp_segment, timestamp, temp_duration, temp_discontinuity = run
+                            if temp_discontinuity:
+                                discon = temp_discontinuity
+                        check_frag.add(temp_segment, miss_frag, temp_duration, temp_discontinuity)
             
-            #sorted(check_frag, key=lambda k: k['fragment'])
-            if len(check_frag) > 20:
-                small_list = check_frag[len(check_frag)-21:len(check_frag)-1]
-#            for all in check_frag:
-#                if all.__getitem__('pulled') is False:
-#                    small_list.append(all)
-            
-            durations.append([segment_num[1], current_frag, int(duration[1]), sorted(check_frag, key=lambda k: k['fragment']), discon])
+            durations.append([segment_num, current_frag, duration, check_frag, discon])
             
             return durations
         
         else:
-        #for line in run_table:
-           
-            # Extract fragment number (for live) and duration
-            # from fragment run table
-            
-            # Extract the increasing number 
-            # of fragments from the segment run table
-            segments = hds.extract_segment_section(run_table)
-            
-            #Get last entry in segment run table i.e. the most recent
-            temp = segments[len(segments)-1].split(',')    
-            total_num_of_frag_in_seg = temp[1].split('=')
-            
             # Extract fragment number and duration
             # from fragment run table
-            fragments = hds.extract_fragment_section(run_table)
-            
-            for fragment in fragments:
-                
-                
-                temp          = fragment.split(',') 
-                duration      = temp[2].split('=') 
-                fragment_num  = temp[0].split('=')
-                
-                # Check for fragment discontinuity
-                temp_discontinuity = 0
-                if len(temp) == 4:
-                    temp_discontinuity_check = temp[3].split('=')
-                    temp_discontinuity = temp_discontinuity_check[1]
-                    
-                check_frag.append({'fragment': int(fragment_num[1]), 'duration': int(duration[1]), 'discontinuity': int(temp_discontinuity), 'pulled':False})
-            return check_frag                  
+            for fragment_num, timestamp, duration, discontinuity in fragments:
+                check_frag.append({'fragment': fragment_num, 'duration': duration, 'discontinuity': discontinuity, 'pulled':False})
+            return check_frag
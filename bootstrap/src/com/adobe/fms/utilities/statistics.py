@@ -3,6 +3,10 @@ Created on 20 Sep 2011
 
 @author: wallace
 '''
+import os
+import threading
+import time
+from array import array
 
 latency = 0
 
@@ -13,3 +17,236 @@ num_non_2xx_requests = 0
 total_num_requests = 0
 
 time_taken = 0
+
+# Latency histograms hold microsecond values in log-linear buckets: each
+# power of two is split into SUB_BUCKETS linear buckets, which keeps the
+# relative error under 1/SUB_BUCKETS whatever the magnitude
+SUB_BUCKET_BITS = 7
+SUB_BUCKETS     = 1 << (SUB_BUCKET_BITS - 1)
+MAX_SHIFT       = 32
+BUCKET_COUNT    = (MAX_SHIFT + 2) * SUB_BUCKETS
+MAX_VALUE       = (1 << (MAX_SHIFT + SUB_BUCKET_BITS)) - 1
+
+PERCENTILES = (('p50', 50.0), ('p90', 90.0), ('p99', 99.0), ('p99.9', 99.9))
+
+def _bucket_index(value):
+    if value < 2 * SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS
+    return shift * SUB_BUCKETS + (value >> shift)
+
+def _bucket_value(index):
+    if index < 2 * SUB_BUCKETS:
+        return index
+    shift = index / SUB_BUCKETS - 1
+    # Report the middle of the bucket
+    return ((index - shift * SUB_BUCKETS) << shift) + (1 << (shift - 1))
+
+class LatencyHistogram(object):
+
+    # Fixed size, mergeable latency histogram. Values are recorded in
+    # msec and stored as microseconds. low and high bound the buckets in
+    # use, so merging and reading only walk that range
+    def __init__(self):
+        self.counts = array('L', [0]) * BUCKET_COUNT
+        self.count  = 0
+        self.total  = 0
+        self.max    = 0
+        self.low    = BUCKET_COUNT
+        self.high   = -1
+
+    def record(self, msec, count=1):
+        value = int(msec * 1000)
+        if value < 0:
+            value = 0
+        elif value > MAX_VALUE:
+            value = MAX_VALUE
+        index = _bucket_index(value)
+        self.counts[index] += count
+        if index < self.low:
+            self.low = index
+        if index > self.high:
+            self.high = index
+        self.count += count
+        self.total += value * count
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        if other.count == 0:
+            return self
+        counts = self.counts
+        other_counts = other.counts
+        for index in xrange(other.low, other.high + 1):
+            count = other_counts[index]
+            if count:
+                counts[index] += count
+        if other.low < self.low:
+            self.low = other.low
+        if other.high > self.high:
+            self.high = other.high
+        self.count += other.count
+        self.total += other.total
+        if other.max > self.max:
+            self.max = other.max
+        return self
+
+    def copy(self):
+        return LatencyHistogram().merge(self)
+
+    def reset(self):
+        self.counts = array('L', [0]) * BUCKET_COUNT
+        self.count  = 0
+        self.total  = 0
+        self.max    = 0
+        self.low    = BUCKET_COUNT
+        self.high   = -1
+
+    # Sparse form of the histogram, small enough to send between hosts
+    def encode(self):
+        return {'counts': [[index, self.counts[index]] for index in xrange(self.low, self.high + 1) if self.counts[index]],
+                'count': self.count,
+                'total': self.total,
+                'max': self.max}
+
+    @staticmethod
+    def decode(data):
+        histogram = LatencyHistogram()
+        for index, count in data['counts']:
+            histogram.counts[index] = count
+            histogram.low = min(histogram.low, index)
+            histogram.high = max(histogram.high, index)
+        histogram.count = data['count']
+        histogram.total = data['total']
+        histogram.max   = data['max']
+        return histogram
+
+    # Latency in msec at the given percentile
+    def percentile(self, pct):
+        if self.count == 0:
+            return 0.0
+        target = max(int(self.count * pct / 100.0 + 0.5), 1)
+        seen = 0
+        counts = self.counts
+        for index in xrange(self.low, self.high + 1):
+            seen += counts[index]
+            if seen >= target:
+                return min(_bucket_value(index), self.max) / 1000.0
+        return self.max / 1000.0
+
+    def mean(self):
+        if self.count == 0:
+            return 0.0
+        return self.total / 1000.0 / self.count
+
+    def summary(self):
+        summary = {'count': self.count,
+                   'mean': self.mean(),
+                   'max': self.max / 1000.0}
+        for name, pct in PERCENTILES:
+            summary[name] = self.percentile(pct)
+        return summary
+
+class LatencyRecorder(object):
+
+    # Per-stream latency histograms, one per stream whichever thread
+    # records, behind a lock. Memory is one histogram per stream and
+    # snapshot() copies each once. Callers with many values per fragment
+    # fill their own histogram and hand it over with record_histogram().
+    def __init__(self):
+        self.streams    = {}
+        self.lock       = threading.Lock()
+
+    def record(self, stream_name, msec, count=1):
+        with self.lock:
+            histogram = self.streams.get(stream_name)
+            if histogram is None:
+                histogram = self.streams[stream_name] = LatencyHistogram()
+            histogram.record(msec, count)
+
+    def record_histogram(self, stream_name, other):
+        with self.lock:
+            histogram = self.streams.get(stream_name)
+            if histogram is None:
+                histogram = self.streams[stream_name] = LatencyHistogram()
+            histogram.merge(other)
+
+    # Returns ({stream name: histogram}, global histogram)
+    def snapshot(self):
+        with self.lock:
+            streams = dict((stream_name, histogram.copy()) for stream_name, histogram in self.streams.iteritems())
+        overall = LatencyHistogram()
+        for histogram in streams.itervalues():
+            overall.merge(histogram)
+        return streams, overall
+
+class HistogramReporter(threading.Thread):
+
+    # Appends the per-stream and global percentiles to a CSV file every
+    # 'interval' seconds, and once more when stopped
+    def __init__(self, recorder, file_name, interval=60):
+        threading.Thread.__init__(self)
+        self.daemon     = True
+        self.recorder   = recorder
+        self.file_name  = file_name
+        self.interval   = interval
+        self.stopping   = threading.Event()
+
+    def run(self):
+        while not self.stopping.wait(self.interval):
+            self.write()
+        return
+
+    # Waits for the thread to finish any write in progress, so the last
+    # line is not written twice or cut off at interpreter exit
+    def stop(self):
+        self.stopping.set()
+        if self.is_alive():
+            self.join()
+        self.write()
+
+    def write(self):
+        streams, overall = self.recorder.snapshot()
+        now = time.time()
+        write_header = not os.path.exists(self.file_name)
+        FILE = open(self.file_name, "ab")
+        if write_header:
+            FILE.write('time,stream,count,mean,' + ','.join(name for name, pct in PERCENTILES) + ',max\n')
+        for stream_name in sorted(streams):
+            FILE.write(HistogramReporter.format_line(now, stream_name, streams[stream_name]))
+        FILE.write(HistogramReporter.format_line(now, 'ALL', overall))
+        FILE.close()
+
+    @staticmethod
+    def format_line(now, stream_name, histogram):
+        summary = histogram.summary()
+        return '%d,%s,%d,%.3f,%s,%.3f\n' % (now, stream_name, summary['count'], summary['mean'],
+                                           ','.join('%.3f' % summary[name] for name, pct in PERCENTILES),
+                                           summary['max'])
+
+class LatencySnapshots(object):
+
+    # Keeps the latest per-stream histograms reported by each worker
+    # process and merges them on snapshot(), so it can stand in for a
+    # LatencyRecorder in the HistogramReporter
+    def __init__(self):
+        self.sources    = {}
+        self.lock       = threading.Lock()
+
+    def update(self, source, streams):
+        with self.lock:
+            self.sources[source] = streams
+
+    def snapshot(self):
+        with self.lock:
+            sources = self.sources.values()
+        streams = {}
+        overall = LatencyHistogram()
+        for source in sources:
+            for stream_name, histogram in source.iteritems():
+                merged = streams.get(stream_name)
+                if merged is None:
+                    merged = streams[stream_name] = LatencyHistogram()
+                merged.merge(histogram)
+                overall.merge(histogram)
+        return streams, overall
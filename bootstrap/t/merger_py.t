@@ -0,0 +1,143 @@
+#!/usr/bin/env python2
+#
+# The merger.t vectors run through the Python BootstrapMerger, the
+# bootstrap groups of ref/ against the unions tools/merge.pl made of them
+# (t/merged/<group>.bootstrap), plus the live cases it adds. Prints TAP,
+# so prove runs it with the perl tests.
+
+import copy
+import os
+import pprint
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'src'))
+from com.adobe.fms.utilities.BootstrapMerger import BootstrapMerger, BootstrapMergeError
+from com.adobe.fms.utilities.hds import hds
+
+REF = os.path.join(HERE, '..', 'ref')
+
+# A bootstrap as BootstrapParser returns it: one segment and one
+# fragment run table
+def bootstrap(current_media_time, segment_runs, fragment_runs, version=1):
+    return {'version': version,
+            'profile': 0,
+            'live': True,
+            'update': False,
+            'time_scale': 1000,
+            'current_media_time': current_media_time,
+            'smpte_timecode_offset': 0,
+            'movie_identifier': '',
+            'servers': [],
+            'quality': [],
+            'drm_data': '',
+            'metadata': '',
+            'segment_run_tables': [{'update': False,
+                                    'quality': [],
+                                    'runs': segment_runs}],
+            'fragment_run_tables': [{'update': False,
+                                     'timescale': 1000,
+                                     'quality': [],
+                                     'runs': fragment_runs}]}
+
+# Bootstraps merged the way merge.pl does
+MERGE_TESTS = (
+    {'name': 'nop',
+     'merge': [bootstrap(752262158, [(18626, 10)], [(186251, 745002164, 4000, 0)]),
+               bootstrap(752262158, [(18626, 10)], [(186251, 745002164, 4000, 0)])],
+     'expect': bootstrap(752262158, [(18626, 10)], [(186251, 745002164, 4000, 0)])},
+    {'name': 'simple',
+     'merge': [bootstrap(752262158, [(18626, 10)], [(186251, 745002164, 4000, 0)]),
+               bootstrap(753497919, [(18627, 10)], [(186252, 745006164, 4000, 0)])],
+     'expect': bootstrap(753497919, [(18626, 10), (18627, 10)],
+                         [(186251, 745002164, 4000, 0), (186252, 745006164, 4000, 0)])},
+)
+
+# Renditions of ref/ by name, files or directories in merge.pl order.
+# proxycap holds successive polls of one stream
+REF_TESTS = (
+    ('abst', ['abst.bootstrap']),
+    ('akamai_bootstrap', ['akamai_bootstrap_0.bootstrap', 'akamai_bootstrap_1.bootstrap']),
+    ('basketball_bootstrap', ['basketball_bootstrap6307.bootstrap']),
+    ('bbc1_hd', ['bbc1_hd_p%d.bootstrap' % n for n in xrange(1, 7)]),
+    ('inlet', ['inlet1.bootstrap', 'inlet2.bootstrap', 'inlet4.bootstrap']),
+    ('later_al_green_hd', ['later_al_green_hd-%d.bootstrap' % n for n in xrange(1, 7)]),
+    ('proxycap', ['proxycap']),
+)
+
+# Renditions merge.pl rejects, with its error
+REF_REJECTED = (
+    ('livestream', ['livestream%d.bootstrap' % n for n in xrange(1, 7)],
+     'Scalar mismatch with no merge rule at /*/version'),
+)
+
+def load(file_name):
+    FILE = open(file_name, 'rb')
+    try:
+        return hds.parse_bootstrap(FILE.read())
+    finally:
+        FILE.close()
+
+def load_ref(names):
+    bootstraps = []
+    for name in names:
+        path = os.path.join(REF, name)
+        if os.path.isdir(path):
+            bootstraps.extend(load(os.path.join(path, entry)) for entry in sorted(os.listdir(path))
+                              if entry.endswith('.bootstrap'))
+        else:
+            bootstraps.append(load(path))
+    return bootstraps
+
+# (source, bootstrap) added in order to a live merger
+LIVE_TESTS = (
+    {'name': 'newer version of a source',
+     'add': [(0, bootstrap(40000, [(1, 10)], [(100, 0, 4000, 0)], version=1)),
+             (0, bootstrap(44000, [(1, 11)], [(101, 4000, 4000, 0)], version=2))],
+     'expect': bootstrap(44000, [(1, 11)], [(101, 4000, 4000, 0)], version=2)},
+    {'name': 'sources at different versions',
+     'add': [(0, bootstrap(40000, [(1, 10)], [(100, 0, 4000, 0)], version=3)),
+             (1, bootstrap(44000, [(1, 11)], [(100, 0, 4000, 0)], version=2))],
+     'expect': bootstrap(44000, [(1, 11)], [(100, 0, 4000, 0)], version=3)},
+)
+
+results = []
+
+def check(got, expect, name):
+    ok = got == expect
+    results.append((ok, name))
+    if not ok:
+        sys.stdout.write(''.join('# %s\n' % line for line in
+                                 ('got:\n' + pprint.pformat(got) + '\nexpected:\n' + pprint.pformat(expect)).splitlines()))
+
+for test in MERGE_TESTS:
+    check(BootstrapMerger.merge(copy.deepcopy(test['merge'])), test['expect'], '%s: merge' % test['name'])
+
+for name, files in REF_TESTS:
+    check(BootstrapMerger.merge(load_ref(files)), load(os.path.join(HERE, 'merged', name + '.bootstrap')),
+          '%s: same union as merge.pl' % name)
+
+for name, files, message in REF_REJECTED:
+    try:
+        BootstrapMerger.merge(load_ref(files))
+        results.append((False, '%s: rejected as by merge.pl' % name))
+    except BootstrapMergeError, error:
+        results.append((str(error) == message, '%s: rejected as by merge.pl' % name))
+
+for test in LIVE_TESTS:
+    merger = BootstrapMerger(live=True)
+    for source, data in copy.deepcopy(test['add']):
+        merger.add(source, data)
+    check(merger.union, test['expect'], '%s: live merge' % test['name'])
+
+# Outside live a version mismatch has no merge rule, as in merge.pl
+try:
+    BootstrapMerger.merge([bootstrap(40000, [(1, 10)], [(100, 0, 4000, 0)], version=1),
+                           bootstrap(40000, [(1, 10)], [(100, 0, 4000, 0)], version=2)])
+    results.append((False, 'version mismatch: rejected'))
+except BootstrapMergeError:
+    results.append((True, 'version mismatch: rejected'))
+
+print '1..%d' % len(results)
+for number, (ok, name) in enumerate(results):
+    print '%s %d - %s' % (ok and 'ok' or 'not ok', number + 1, name)